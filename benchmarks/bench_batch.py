@@ -0,0 +1,99 @@
+"""스칼라 평가 vs NumPy 일괄 평가 처리량 비교.
+
+실행: python -m benchmarks.bench_batch [행 수]
+측정 전에 portfolio.score_chunk가 짝이 없는 freq_i / sev_i 열을 조용히 버리지 않고 ValueError로 거부하는지 확인합니다.
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from risk_engine import SCHEME_FS, Assessment, LaggingInputs, LeadingInputs
+from risk_engine.batch import (
+    CATEGORY_OPTIONS,
+    LAGGING_FIELDS,
+    LEADING_DOMAINS,
+    LEADING_FIELDS,
+    score_batch,
+)
+from risk_engine.portfolio import score_chunk
+from risk_engine.scoring import _evaluate, get_rules
+
+TARGET_ROWS_PER_SEC = 1_000_000
+
+
+def random_matrices(n, k=5, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.empty((n, len(LEADING_FIELDS)), dtype=np.int8)
+    for j, name in enumerate(LEADING_FIELDS):
+        lo, hi = LEADING_DOMAINS[name]
+        X[:, j] = rng.integers(lo, hi + 1, n)
+    L = np.empty((n, len(LAGGING_FIELDS)), dtype=np.int32)
+    for j, name in enumerate(LAGGING_FIELDS):
+        hi = len(CATEGORY_OPTIONS[name]) if name in CATEGORY_OPTIONS else 30
+        L[:, j] = rng.integers(0, hi, n)
+    F = rng.integers(1, 6, (n, k), dtype=np.int8)
+    S = rng.integers(1, 6, (n, k), dtype=np.int8)
+    return X, L, F, S
+
+
+def decode_row(x, l, f, s):
+    lead = {name: CATEGORY_OPTIONS[name][v] if name in CATEGORY_OPTIONS else int(v) for name, v in zip(LEADING_FIELDS, x)}
+    lag = {name: CATEGORY_OPTIONS[name][v] if name in CATEGORY_OPTIONS else int(v) for name, v in zip(LAGGING_FIELDS, l)}
+    lead["jsa_factors"] = tuple((f"요인{i}", "", int(a), int(b)) for i, (a, b) in enumerate(zip(f, s)))
+    return Assessment(LeadingInputs(**lead), LaggingInputs(**lag), SCHEME_FS)
+
+
+def check_fs_pairs():
+    """freq_i만 있거나 sev_i만 있는 CSV는 ValueError, 짝이 맞으면 통과."""
+    paired = pd.DataFrame({"freq_0": [3, 2], "sev_0": [4, 5]})
+    score_chunk(paired)
+    for lone in ({"freq_0": [3, 2], "sev_0": [4, 5], "freq_1": [1, 1]}, {"sev_0": [4, 5]}):
+        try:
+            score_chunk(pd.DataFrame(lone))
+        except ValueError:
+            continue
+        return False
+    return True
+
+
+def bench_scalar(n):
+    X, L, F, S = random_matrices(n, seed=1)
+    records = [decode_row(*row) for row in zip(X, L, F, S)]
+    uncached, rules = _evaluate.__wrapped__, get_rules()
+    t = time.perf_counter()
+    for a in records:
+        uncached(a, rules)
+    return n / (time.perf_counter() - t)
+
+
+def bench_batch(n, repeat=5):
+    X, L, F, S = random_matrices(n)
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        score_batch(X, L, F, S, SCHEME_FS)
+        best = min(best, time.perf_counter() - t)
+    return n / best
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    n = int(argv[0]) if argv else 1_000_000
+    if not check_fs_pairs():
+        print("!! 짝이 없는 freq_i / sev_i 열을 거부하지 않음")
+        return 1
+    print("check  : 짝이 없는 freq_i / sev_i 열은 ValueError")
+    scalar = bench_scalar(min(n, 50_000))
+    batch = bench_batch(n)
+    print(f"scalar : {scalar:>14,.0f} rows/s")
+    print(f"batch  : {batch:>14,.0f} rows/s  ({n:,} rows, x{batch / scalar:,.0f})")
+    if batch < TARGET_ROWS_PER_SEC:
+        print(f"!! 목표 처리량 {TARGET_ROWS_PER_SEC:,} rows/s 미달")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
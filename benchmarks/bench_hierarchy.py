@@ -0,0 +1,74 @@
+"""사업장 계층 트리 증분 집계 성능.
+
+실행: python -m benchmarks.bench_hierarchy [공장 수] [공장별 라인 수]
+기본 공장 50 x 라인 50 x 4대 공정 = 공정 1만 개 트리를 만들고, 공정 F/S 변경 / 라인 재정의 / 공장 재정의 /
+회사 입력 변경의 갱신 시간과 다시 계산한 노드 수를 측정합니다. 증분 집계를 마친 뒤 공정 일부를 evaluate()로
+다시 계산해 점수가 같은지, 회사 집계가 전체 재계산과 같은지 확인합니다.
+"""
+import random
+import sys
+import time
+from dataclasses import replace
+
+from risk_engine.hierarchy import RiskTree
+from risk_engine.scoring import CATEGORY_OPTIONS, LEADING_DOMAINS, LEADING_FIELDS, LeadingInputs, evaluate
+
+LEAF_TARGET_US = 100 # 공정 하나 변경 p99
+EDITS = 5000
+
+
+def _value(rng, name):
+    code = rng.randint(*LEADING_DOMAINS[name])
+    return CATEGORY_OPTIONS[name][code] if name in CATEGORY_OPTIONS else code
+
+
+def _timed(fn, *args, **kwargs):
+    t = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - t
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    plants = int(argv[0]) if argv else 50
+    lines = int(argv[1]) if len(argv) > 1 else 50
+    rng = random.Random(0)
+
+    t = time.perf_counter()
+    tree = RiskTree.generate(plants=plants, lines=lines, seed=0)
+    print(f"build  : 공정 {tree.root.count:,}개 (노드 {len(tree.nodes):,}) in {(time.perf_counter() - t) * 1000:.0f} ms")
+
+    leaves = list(tree.leaves())
+    timings, touched = [], 0
+    for _ in range(EDITS):
+        leaf = rng.choice(leaves)
+        timings.append(_timed(tree.set_fs, leaf, rng.randrange(len(leaf.fs) // 2), rng.randint(1, 5), rng.randint(1, 5)))
+        touched = max(touched, tree.touched)
+    timings.sort()
+    p50, p99 = timings[len(timings) // 2] * 1e6, timings[int(len(timings) * 0.99)] * 1e6
+    print(f"leaf   : F/S 변경 {EDITS:,}회 p50 {p50:.1f} us · p99 {p99:.1f} us (다시 계산한 노드 최대 {touched})")
+
+    plant_nodes = list(tree.root.children.values())
+    line_nodes = [line for plant in plant_nodes for line in plant.children.values()]
+    for label, nodes in (("line", line_nodes), ("plant", plant_nodes)):
+        timings = []
+        for _ in range(200):
+            name = rng.choice(LEADING_FIELDS)
+            timings.append(_timed(tree.set_overrides, rng.choice(nodes), **{name: _value(rng, name)}))
+        print(f"{label:<7}: 재정의 변경 p50 {sorted(timings)[100] * 1000:.2f} ms (마지막 변경 노드 {tree.touched:,})")
+
+    company = replace(LeadingInputs(), worker_skill=_value(rng, "worker_skill"), ptw_compliance=_value(rng, "ptw_compliance"))
+    elapsed = _timed(tree.set_company, company)
+    print(f"company: 회사 입력 변경 {elapsed * 1000:.1f} ms (노드 {tree.touched:,} 전체)")
+
+    for leaf in rng.sample(leaves, 200):
+        assert evaluate(tree.assessment(leaf)).leading_score == leaf.score, tree.path(leaf)
+    incremental = (tree.root.count, tree.root.total, tree.root.worst, list(tree.root.grades))
+    tree._recompute(tree.root)
+    assert incremental == (tree.root.count, tree.root.total, tree.root.worst, list(tree.root.grades))
+    print("check  : 공정 점수 = evaluate(), 회사 집계 = 전체 재계산")
+    return 0 if p99 < LEAF_TARGET_US else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
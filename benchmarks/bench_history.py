@@ -0,0 +1,70 @@
+"""평가 이력 저장소 일괄 삽입 / 인덱스 조회 성능.
+
+실행: python -m benchmarks.bench_history [행 수] [DB 경로]
+기본 1,000만 행을 5년 기간에 걸쳐 삽입한 뒤 "최근 90일 활성화 공정 '높음' 등급" 조회 시간과
+추이 대시보드가 읽는 4개 공정 전체 기간 일/주/월 rollup 조회 시간을 측정합니다.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from risk_engine.history import HistoryStore
+
+PROCESSES = ("전극 공정", "조립 공정", "활성화 공정", "팩 공정")
+DAY = 86400
+QUERY_TARGET_MS = 50
+TREND_TARGET_MS = 1000
+
+
+def synthetic_rows(n, now, span_days=5 * 365, seed=0):
+    rng = random.Random(seed)
+    inputs = "[[3,3,3,4,4,0,3,3,3,1,3,4,0,3,0,0,0,3,3,3,3,3],[[3,3],[3,3],[3,3],[3,3],[3,3]],[0,0,0,0,0,0,0,0,0]]"
+    for _ in range(n):
+        score = rng.randint(60, 390)
+        grade = 0 if score <= 100 else 1 if score <= 150 else 2 if score <= 200 else 3 if score <= 260 else 4
+        yield (now - rng.randrange(span_days * DAY), "fs", rng.choice(PROCESSES), "", score, grade, 45, 0, 0, inputs)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    n = int(argv[0]) if argv else 10_000_000
+    path = argv[1] if len(argv) > 1 else os.path.join(tempfile.mkdtemp(), "bench_history.db")
+    now = int(time.time())
+
+    store = HistoryStore(path)
+    if store.count() < n:
+        t = time.perf_counter()
+        rows = synthetic_rows(n - store.count(), now)
+        while True:
+            chunk = [row for _, row in zip(range(200_000), rows)]
+            if not chunk:
+                break
+            store.add_rows(chunk)
+        elapsed = time.perf_counter() - t
+        print(f"insert : {n:,} rows in {elapsed:.1f}s ({n / elapsed:,.0f} rows/s)")
+    store.analyze()
+
+    since = now - 90 * DAY
+    timings = []
+    for _ in range(5):
+        t = time.perf_counter()
+        found = store.count(process="활성화 공정", grade="높음", since=since)
+        page = store.query(process="활성화 공정", grade="높음", since=since, limit=1000)
+        timings.append((time.perf_counter() - t) * 1000)
+    best = min(timings)
+    print(f"query  : {found:,} matches (first page {len(page)}) in {best:.1f} ms (rows in DB: {store.count():,})")
+
+    trend_ms = {}
+    for period in ("day", "week", "month"):
+        t = time.perf_counter()
+        buckets = store.trend(period, scheme="fs")
+        trend_ms[period] = (time.perf_counter() - t) * 1000
+        print(f"trend  : {period:<5} {len(buckets):,} buckets in {trend_ms[period]:.1f} ms")
+    store.close()
+    return 0 if best < QUERY_TARGET_MS and max(trend_ms.values()) < TREND_TARGET_MS else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
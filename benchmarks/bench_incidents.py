@@ -0,0 +1,68 @@
+"""사고 / 점검 / 과태료 기록 수집 측정: 큰 기록 파일 한 번 훑기와 덧붙인 꼬리만 다시 읽기.
+
+실행: python -m benchmarks.bench_incidents [--rows 5000000] [--append 10000] [--format csv|jsonl]
+- full: 합성 기록 파일(임시 디렉터리)을 처음부터 끝까지 수집하는 시간, MB/s, 레코드/s, 최대 RSS 증가
+- tail: 같은 파일에 레코드를 덧붙인 뒤 상태 파일에서 다시 시작해 꼬리만 읽는 시간 (전체 재수집 대비)
+- noop: 변화가 없을 때 refresh() 시간 (수집 스레드가 주기마다 하는 일)
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from risk_engine.incidents import IncidentLedger
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _generate(path, rows, *extra):
+    # 생성은 별도 프로세스에서 (생성 중 메모리가 이 프로세스의 최대 RSS에 섞이지 않도록)
+    subprocess.run([sys.executable, "-m", "risk_engine.incidents", "generate", path, "--rows", str(rows), *extra], cwd=ROOT, check=True)
+
+
+def _max_rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--append", type=int, default=10_000)
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"records.{args.format}")
+        state = os.path.join(tmp, "state.json")
+        _generate(path, args.rows)
+        size_mb = os.path.getsize(path) / 1e6
+
+        import pandas # noqa: F401 (import 자체의 메모리는 빼고 잼)
+
+        rss0 = _max_rss_mib()
+        ledger = IncidentLedger([path], state)
+        started = time.perf_counter()
+        rows = ledger.refresh()
+        full_s = time.perf_counter() - started
+        ledger.save()
+        print(f"full  {rows:,}건 {size_mb:,.0f} MB  {full_s:.2f}s  → {size_mb / full_s:,.1f} MB/s · {rows / full_s:,.0f}건/s  "
+              f"최대 RSS 증가 {_max_rss_mib() - rss0:,.0f} MiB")
+
+        _generate(path, args.append, "--seed", "1", "--append")
+        ledger = IncidentLedger([path], state) # 새 프로세스처럼 상태 파일에서 다시 시작
+        started = time.perf_counter()
+        rows = ledger.refresh()
+        tail_s = time.perf_counter() - started
+        print(f"tail  덧붙인 {rows:,}건  {tail_s * 1000:,.1f} ms  (전체 재수집의 {tail_s / full_s:.2%})")
+
+        started = time.perf_counter()
+        ledger.refresh()
+        print(f"noop  {(time.perf_counter() - started) * 1e6:,.0f} µs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
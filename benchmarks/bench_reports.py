@@ -0,0 +1,79 @@
+"""평가 보고서 일괄 내보내기 측정: 사업장 수백 곳의 보고서를 작업자 1개 vs. 코어 수만큼 그리기.
+
+실행: python -m benchmarks.bench_reports [--sites 500] [--processes 2] [--format pdf xlsx] [--workers 1 4]
+- 임시 이력 DB에 사업장 x 공정별 무작위 평가를 넣고 jobs_from_history()로 사업장별 작업을 만든 뒤
+  export_portfolio()를 작업자 수별로 실행해 전체 시간, 보고서/s, 보고서 한 부당 시간, 차트 캐시 적중을 잽니다.
+- 작업자 수마다 차트 캐시 디렉터리를 새로 만들어 (캐시가 빈 상태에서) 비교합니다.
+- 작업자 1개는 풀 없이 이 프로세스에서 그리므로 spawn 비용이 없는 직렬 기준선입니다.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from dataclasses import replace
+
+from risk_engine.catalog import FS_PROCESS_CATALOG
+from risk_engine.history import HistoryStore
+from risk_engine.reports import DEFAULT_WORKERS, REPORT_FORMATS, export_portfolio, jobs_from_history, xlsx_available
+from risk_engine.scoring import (
+    CATEGORY_OPTIONS,
+    LAGGING_CATEGORY_FIELDS,
+    LEADING_DOMAINS,
+    LEADING_FIELDS,
+    SCHEME_FS,
+    Assessment,
+    LaggingInputs,
+    LeadingInputs,
+    evaluate,
+)
+
+
+def _random_assessment(rng, process):
+    leading = {field: rng.randint(*LEADING_DOMAINS[field]) for field in LEADING_FIELDS}
+    leading.update((field, CATEGORY_OPTIONS[field][code]) for field, code in leading.items() if field in CATEGORY_OPTIONS)
+    factors = tuple((f.name, f.type, rng.randint(1, 5), rng.randint(1, 5)) for f in FS_PROCESS_CATALOG[process].risk_factors)
+    lagging = {field: rng.choice(CATEGORY_OPTIONS[field]) for field in LAGGING_CATEGORY_FIELDS}
+    return Assessment(
+        leading=replace(LeadingInputs(**leading), jsa_factors=factors),
+        lagging=replace(LaggingInputs(past_fatalities_count=rng.randint(0, 2), past_injuries_count=rng.randint(0, 5)), **lagging),
+        scheme=SCHEME_FS, process=process,
+    )
+
+
+def _fill(store, sites, processes, seed=0):
+    rng = random.Random(seed)
+    names = list(FS_PROCESS_CATALOG)[:processes]
+    for i in range(sites):
+        for process in names:
+            a = _random_assessment(rng, process)
+            store.add(a, evaluate(a), site=f"사업장{i:04d}")
+    store.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sites", type=int, default=500)
+    parser.add_argument("--processes", type=int, default=2, help="사업장당 공정 수 (보고서 한 부의 평가 수)")
+    parser.add_argument("--format", nargs="+", choices=REPORT_FORMATS, default=["pdf", "xlsx"] if xlsx_available() else ["pdf"])
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, DEFAULT_WORKERS}))
+    args = parser.parse_args(argv)
+
+    print(f"CPU 코어 {os.cpu_count()}개 · 사업장 {args.sites} x 공정 {args.processes} · 형식 {', '.join(args.format)}")
+    with tempfile.TemporaryDirectory() as tmp:
+        with HistoryStore(os.path.join(tmp, "history.db")) as store:
+            _fill(store, args.sites, args.processes)
+            jobs = jobs_from_history(store)
+        baseline = None
+        for workers in args.workers:
+            out = os.path.join(tmp, f"out{workers}")
+            r = export_portfolio(jobs, out, tuple(args.format), workers, chart_dir=os.path.join(tmp, f"charts{workers}"))
+            baseline = baseline or r.elapsed
+            print(f"workers {r.workers:>2}  보고서 {r.reports}부 {r.elapsed:,.1f}s  → {r.reports / r.elapsed:,.1f}부/s · "
+                  f"{r.elapsed / r.reports * 1000:,.0f} ms/부  (작업자 1개 대비 x{baseline / r.elapsed:.2f})  "
+                  f"차트 캐시 적중 {r.chart_hits} / 새로 그림 {r.chart_misses}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
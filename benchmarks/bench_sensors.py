@@ -0,0 +1,74 @@
+"""센서 수집 처리량 측정: 센서 수천 개 x 10 Hz를 코어 하나로 받아낼 수 있는지 확인합니다.
+
+실행: python -m benchmarks.bench_sensors [--sensors 5000] [--hz 10] [--seconds 10]
+- ingest: 미리 만든 시뮬레이터 줄을 SensorHub.ingest_text에 넣는 순수 처리 속도 (표본/초, 목표 부하 대비 코어 사용률)
+- tcp: 시뮬레이터를 별도 프로세스로 띄워 로컬 TCP로 보내고, 이 프로세스의 asyncio 수집기가 받는 동안의
+  CPU 사용률(코어 하나 대비)과 받은 표본 수 / 보낸 표본 수
+- snapshot: 페이지 재실행마다 부르는 집계 + 선행지표 수준 계산 시간
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from risk_engine.sensors import SensorHub, Simulator, serve_tcp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def bench_ingest(sensors, hz, ticks=50):
+    hub = SensorHub()
+    sim = Simulator(sensors)
+    chunks = [sim.tick() for _ in range(ticks)]
+    hub.ingest_text(chunks[0]) # 센서 등록(행 확장) 비용 제외
+    started = time.perf_counter()
+    n = sum(hub.ingest_text(chunk) for chunk in chunks[1:])
+    rate = n / (time.perf_counter() - started)
+    return {"samples_per_s": rate, "core_share_at_target": sensors * hz / rate}, hub
+
+
+def bench_snapshot(hub, repeat=20):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        hub.leading_levels(hub.snapshot())
+    return {"ms": (time.perf_counter() - started) / repeat * 1000}
+
+
+async def _bench_tcp(sensors, hz, seconds):
+    hub = SensorHub()
+    server = await serve_tcp(hub, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    producer = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "risk_engine.sensors", "simulate", "--tcp", f"127.0.0.1:{port}",
+        "--sensors", str(sensors), "--hz", str(hz), "--duration", str(seconds), cwd=ROOT,
+    )
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    await producer.wait()
+    await asyncio.sleep(0.2) # 소켓에 남은 줄까지
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+    server.close()
+    await server.wait_closed()
+    expected = sensors * round(seconds * hz)
+    return {"received": hub.samples, "expected": expected, "cpu_percent": cpu / wall * 100, "rejected": hub.rejected}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sensors", type=int, default=5000)
+    parser.add_argument("--hz", type=float, default=10)
+    parser.add_argument("--seconds", type=float, default=10, help="tcp 측정 시간")
+    parser.add_argument("--skip-tcp", action="store_true")
+    args = parser.parse_args(argv)
+
+    ingest, hub = bench_ingest(args.sensors, args.hz)
+    print(f"ingest   {ingest['samples_per_s']:>12,.0f} 표본/s  → {args.sensors:,}개 x {args.hz:g} Hz 에 코어 {ingest['core_share_at_target']:.1%} 사용")
+    print(f"snapshot {bench_snapshot(hub)['ms']:>12.2f} ms  (센서 {args.sensors:,}개 집계 + 선행지표 수준)")
+    if not args.skip_tcp:
+        tcp = asyncio.run(_bench_tcp(args.sensors, args.hz, args.seconds))
+        print(f"tcp      수신 {tcp['received']:,} / 전송 {tcp['expected']:,} 표본 (버림 {tcp['rejected']})  수집 프로세스 CPU {tcp['cpu_percent']:.1f}% (코어 하나 기준)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""동시 세션 메모리 측정: 세션 N개를 동시에 유지할 때 세션당 메모리가 목표 이하인지 확인합니다.
+
+실행: python -m benchmarks.bench_sessions [--sessions 1000] [--target-kib 160] [페이지 ...]
+세션마다 Streamlit AppTest로 페이지를 실행하고 공정 전환 / 슬라이더 변경 / 불확실성 모드 등을 조작한 뒤,
+실제 서버의 세션이 계속 쥐고 있는 것(세션 상태 + fragment 저장소)만 남기고 테스트용 요소 트리는 버립니다.
+tracemalloc으로 잰 할당 증가량을 세션 수로 나눈 값이 세션당 메모리입니다.
+- 세션 전용: 프로세스 공유 캐시(평가/차트/몬테카를로/보완 루틴)를 비운 뒤의 값 → 목표(--target-kib)와 비교
+- 공유 캐시 포함: 캐시는 크기 상한이 있으므로 세션이 많을수록 세션당 몫이 줄어듭니다
+실제 서버처럼 스크립트 컴파일 캐시와 컴포넌트 레지스트리는 모든 세션이 공유합니다
+(AppTest는 실행마다 새로 컴파일하고, 인스턴스마다 설치 패키지 메타데이터를 다시 훑어 컴포넌트를 등록함).
+--top으로 출처(파일)별 상위 항목을 함께 출력합니다.
+측정 예 ("risk final.py", 1,000세션, Python 3.11 단일 코어): 세션 전용 135.6 KiB/세션 (목표 160), 공유 캐시 포함 138.4 KiB/세션.
+세션 전용의 대부분은 Streamlit 위젯 상태(slider / session_state / widgets)이고 페이지 자체는 약 9.5 KiB입니다.
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+from risk_engine.catalog import FS_PROCESS_CATALOG
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TARGET_KIB = 160
+PROCESS_SELECT = "🔋 배터리 제조 공정 단계 선택"
+
+
+def _risk_final(at, rng, full):
+    process = next(w for w in at.selectbox if w.label == PROCESS_SELECT)
+    # 단일 공정만 고름 (전체 비교 / 계층 화면은 불확실성 토글 전에 st.stop()으로 끝남)
+    process.set_value(rng.choice([o for o in process.options if o in FS_PROCESS_CATALOG])).run()
+    at.slider(key="s_env_c_total").set_value(rng.randint(1, 5))
+    at.slider(key="s_w_sc_total").set_value(rng.randint(1, 5))
+    if full or rng.random() < 0.25: # 일부 세션은 불확실성 모드 사용
+        at.toggle(key="mc_mode").set_value(True)
+    at.run()
+
+
+def _riskkk(at, rng, full):
+    process = next(w for w in at.selectbox if w.label == PROCESS_SELECT)
+    process.set_value(rng.choice(process.options))
+    at.slider(key="s_env_c").set_value(rng.randint(1, 5))
+    at.slider(key="s_w_sc").set_value(rng.randint(1, 5))
+    at.run()
+
+
+SCENARIOS = {"risk final.py": _risk_final, "riskkk.py": _riskkk}
+
+
+_shared = {}
+
+
+def share_server_singletons():
+    """서버 프로세스에 한 벌만 있는 객체(스크립트 컴파일 캐시, 컴포넌트 레지스트리)를 AppTest 세션들이 공유하게 합니다."""
+    from streamlit.components.v2.component_manager import BidiComponentManager
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import local_script_runner
+
+    script_cache = ScriptCache()
+    local_script_runner.ScriptCache = lambda: script_cache
+    components = BidiComponentManager()
+    components.discover_and_register_components(start_file_watching=False)
+    _shared["components"] = components
+
+
+def open_session(page, rng, timeout, full=False):
+    """페이지를 실행/조작하고 서버 세션이 유지하는 객체(세션 상태, fragment 저장소)만 반환합니다."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=timeout)
+    at._bidi_component_manager = _shared.get("components")
+    at.run()
+    SCENARIOS[page](at, rng, full)
+    if at.exception:
+        raise RuntimeError(f"{page}: {at.exception[0].message}")
+    return at.session_state, at._fragment_storage
+
+
+def clear_shared_caches():
+    from risk_engine import cache_clear, charts, montecarlo, rca
+
+    cache_clear()
+    charts.CACHE.clear()
+    montecarlo._simulate.cache_clear()
+    rca._rank_enhancements.cache_clear()
+
+
+def session_bytes(snapshot_before, snapshot_after):
+    exclude = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = snapshot_after.filter_traces(exclude).compare_to(snapshot_before.filter_traces(exclude), "filename")
+    return sum(s.size_diff for s in stats), stats
+
+
+def measure_page(page, sessions, seed, timeout, top):
+    rng = random.Random(seed)
+    for _ in range(3): # 모듈 import(차트 라이브러리 포함), 규칙 파일, 공유 캐시 초기화 등 첫 실행 비용 제외
+        open_session(page, rng, timeout, full=True)
+    clear_shared_caches()
+    gc.collect()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    started = time.perf_counter()
+    alive = []
+    for i in range(1, sessions + 1):
+        alive.append(open_session(page, rng, timeout))
+        if i % max(1, sessions // 10) == 0:
+            print(f"  {page}: {i:,}/{sessions:,} 세션 ({time.perf_counter() - started:.0f}s)", flush=True)
+    gc.collect()
+    with_caches, _ = session_bytes(before, tracemalloc.take_snapshot())
+    clear_shared_caches()
+    gc.collect()
+    only_sessions, stats = session_bytes(before, tracemalloc.take_snapshot())
+    tracemalloc.stop()
+
+    result = {
+        "sessions": sessions, "elapsed_s": time.perf_counter() - started,
+        "per_session_kib": only_sessions / sessions / 1024, "per_session_with_caches_kib": with_caches / sessions / 1024,
+        "total_mib": only_sessions / 2**20,
+    }
+    result["top"] = [(s.traceback[0].filename, s.size_diff / sessions / 1024) for s in stats[:top]]
+    del alive
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*", default=list(SCENARIOS), help=f"측정할 페이지 (기본: {', '.join(SCENARIOS)})")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--target-kib", type=float, default=DEFAULT_TARGET_KIB, help="세션 전용 메모리 목표 (KiB/세션)")
+    parser.add_argument("--top", type=int, default=0, help="출처(파일)별 상위 항목 수")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60, help="AppTest 1회 실행 제한 시간 (초)")
+    args = parser.parse_args(argv)
+    unknown = [page for page in args.pages if page not in SCENARIOS]
+    if unknown:
+        parser.error(f"시나리오가 없는 페이지: {', '.join(unknown)}")
+
+    os.environ.setdefault("RISK_HISTORY_DB", os.path.join(tempfile.mkdtemp(), "bench_history.db"))
+    warnings.filterwarnings("ignore", message="Glyph .* missing from font", category=UserWarning) # 한글 글꼴 미설치 환경
+    share_server_singletons()
+    failed = []
+    for page in args.pages:
+        r = measure_page(page, args.sessions, args.seed, args.timeout, args.top)
+        print(f"sessions {page:<14} {r['sessions']:,}개  세션 전용 {r['per_session_kib']:7.1f} KiB/세션 (합계 {r['total_mib']:.1f} MiB)  "
+              f"공유 캐시 포함 {r['per_session_with_caches_kib']:7.1f} KiB/세션  ({r['elapsed_s']:.0f}s)")
+        for filename, kib in r["top"]:
+            print(f"    {kib:8.2f} KiB  {os.path.relpath(filename, ROOT) if filename.startswith(ROOT) else filename}")
+        if r["per_session_kib"] > args.target_kib:
+            failed.append(page)
+    if failed:
+        print(f"!! 세션당 메모리 목표 {args.target_kib} KiB 초과: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""페이지 첫 위젯까지 걸리는 시간(time-to-first-widget) 측정.
+
+실행: python -m benchmarks.bench_startup [--repeat 5] [페이지 ...]
+페이지마다 새 파이썬 프로세스(빈 import 캐시)를 띄워 Streamlit AppTest로 한 번 실행하고,
+스크립트 실행 시작부터 첫 입력 위젯 / 첫 차트 이미지가 화면 메시지로 나갈 때까지의 시간을 잽니다.
+첫 위젯 시점에 pandas / matplotlib이 이미 import되어 있었는지도 기록합니다 (지연 import 확인용).
+(matplotlib은 페이지가 시작한 백그라운드 글꼴 워밍업 스레드가 먼저 불러오는 중일 수 있습니다.)
+같은 프로세스에서 한 번 더 실행한 값(warm)은 서버가 이미 떠 있는 상태의 재실행에 해당합니다.
+bench_suite의 startup 구간도 이 모듈을 사용합니다.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ("risk final.py", "riskkk.py")
+HEAVY_MODULES = ("pandas", "matplotlib", "pyarrow")
+WIDGET_TYPES = frozenset((
+    "button", "checkbox", "radio", "selectbox", "multiselect", "slider", "select_slider",
+    "number_input", "text_input", "text_area", "date_input", "file_uploader", "download_button",
+))
+CHART_TYPES = frozenset(("imgs", "arrow_vega_lite_chart"))
+
+
+def measure_child(page, timeout):
+    """(자식 프로세스에서 실행) 한 페이지의 콜드/웜 실행 시점 기록을 dict로 반환합니다."""
+    started = time.perf_counter()
+    from streamlit.delta_generator import DeltaGenerator
+    from streamlit.testing.v1 import AppTest
+    import_streamlit = time.perf_counter() - started
+
+    marks = {}
+    original = DeltaGenerator._enqueue
+
+    def _enqueue(self, delta_type, *args, **kwargs):
+        now = time.perf_counter()
+        if delta_type in WIDGET_TYPES and "first_widget" not in marks:
+            marks["first_widget"] = now
+            marks["loaded_at_first_widget"] = [m for m in HEAVY_MODULES if m in sys.modules]
+        if delta_type in CHART_TYPES and "first_chart" not in marks:
+            marks["first_chart"] = now
+        return original(self, delta_type, *args, **kwargs)
+
+    DeltaGenerator._enqueue = _enqueue
+    at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=timeout)
+    result = {"import_streamlit_ms": import_streamlit * 1000}
+    for run in ("cold", "warm"):
+        marks.clear()
+        t = time.perf_counter()
+        at.run()
+        end = time.perf_counter()
+        if at.exception:
+            raise RuntimeError(f"{page}: {at.exception[0].message}")
+        result[run] = {
+            "first_widget_ms": (marks["first_widget"] - t) * 1000 if "first_widget" in marks else None,
+            "first_chart_ms": (marks["first_chart"] - t) * 1000 if "first_chart" in marks else None,
+            "run_ms": (end - t) * 1000,
+            "loaded_at_first_widget": marks.get("loaded_at_first_widget", []),
+        }
+    return result
+
+
+def measure_page(page, repeat, timeout):
+    """새 프로세스에서 repeat번 측정해 항목별 {median_ms, min_ms, n}로 요약합니다."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (ROOT, os.environ.get("PYTHONPATH")))))
+    env.setdefault("RISK_HISTORY_DB", os.path.join(tempfile.mkdtemp(), "bench_history.db"))
+    env["PYTHONWARNINGS"] = "ignore" # 한글 글꼴 미설치 환경의 글리프 경고
+    samples = []
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_startup", "--child", page, "--timeout", str(timeout)],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+        )
+        samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    def summary(values):
+        values = [v for v in values if v is not None]
+        return {"n": len(values), "min_ms": min(values), "median_ms": statistics.median(values)} if values else None
+
+    out = {"import_streamlit": summary([s["import_streamlit_ms"] for s in samples])}
+    for run in ("cold", "warm"):
+        for metric in ("first_widget", "first_chart", "run"):
+            r = summary([s[run][f"{metric}_ms"] for s in samples])
+            if r is not None:
+                out[f"{run}_{metric}"] = r
+        out[f"{run}_loaded_at_first_widget"] = samples[-1][run]["loaded_at_first_widget"]
+    return out
+
+
+def bench_startup(pages, repeat, timeout=60):
+    return {page: measure_page(page, repeat, timeout) for page in pages}
+
+
+def print_results(results):
+    for page, r in results.items():
+        for name, value in r.items():
+            if isinstance(value, dict):
+                print(f"startup {page:<14} {name:<24} median {value['median_ms']:>8.1f} ms  min {value['min_ms']:>8.1f} ms  (n={value['n']})")
+        print(f"startup {page:<14} {'첫 위젯 시점 import됨':<24} {', '.join(r['cold_loaded_at_first_widget']) or '-'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*", default=list(PAGES))
+    parser.add_argument("--repeat", type=int, default=5, help="페이지당 새 프로세스 수")
+    parser.add_argument("--timeout", type=float, default=60, help="AppTest 1회 실행 제한 시간 (초)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure_child(args.child, args.timeout), ensure_ascii=False))
+        return 0
+    print_results(bench_startup(args.pages, args.repeat, args.timeout))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,331 @@
+"""성능 회귀 측정 묶음: 평가 엔진 처리량, 페이지 재실행 지연, matplotlib 렌더링 시간, 첫 위젯까지 시간.
+
+실행: python -m benchmarks.bench_suite [--out 결과.json] [--compare 이전결과.json] [--repeat N] [--skip pages]
+브라우저 없이 로컬에서 돌아갑니다. 페이지는 Streamlit AppTest로 실제 스크립트를 실행하고
+슬라이더 변경 / 공정 전환 / 8번 시뮬레이션 버튼 클릭 후 재실행 시간을 잽니다.
+8번 구간과 보완 루틴(st.fragment) 조작은 전체 재실행과 fragment 부분 재실행을 나란히 기록합니다.
+startup 구간은 새 프로세스에서 페이지를 처음 실행할 때 첫 위젯 / 첫 차트까지의 시간을 잽니다 (benchmarks.bench_startup).
+결과는 커밋 해시와 함께 JSON으로 저장하며, --compare로 이전 커밋 결과와 비교하면
+허용 폭(--tolerance, 기본 25%)을 넘게 느려진 항목을 표시하고 종료 코드 1을 반환합니다.
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from dataclasses import replace
+
+import numpy as np
+
+from benchmarks.bench_batch import decode_row, random_matrices
+from benchmarks.bench_startup import bench_startup, print_results as print_startup
+from risk_engine import SCHEME_FS, SCHEMES, charts
+from risk_engine.batch import jsa_totals, lagging_scores, management_scores, score_batch
+from risk_engine.rca import ENHANCE_OPTIONS
+from risk_engine.scoring import _evaluate, _lagging_score, _management_score, get_rules
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+SECTIONS = ("scoring", "pages", "charts", "startup")
+DEFAULT_TOLERANCE = 0.25 # 이 머신의 측정 잡음이 ±20% 안팎이므로 그보다 큰 변화만 회귀로 봄
+
+# 페이지별 상호작용 시나리오: (이름, 위젯 종류, 키 또는 라벨 ('접두사*'는 키 접두사), 번갈아 넣을 값, fragment 순번, 사전 클릭 버튼)
+# fragment 순번이 있으면 같은 조작을 전체 재실행(fragment 도입 전 비용)과 fragment 부분 재실행으로 각각 잽니다.
+# 순번은 페이지에서 st.fragment 함수가 처음 실행되는 순서입니다 ("risk final.py": 0 = 8번 감소 대책, 1 = 보완 루틴).
+RCA_CHECKBOX = "enhance_" + next(iter(ENHANCE_OPTIONS)).replace(" ", "_")
+INCIDENT_BUTTON = "🚨 사고 발생! (후행지표 인지 & 보완 루틴 시작)"
+PAGES = {
+    "risk final.py": (
+        ("slider_change", "slider", "s_env_c_total", (2, 4), None, None),
+        ("process_switch", "selectbox", "🔋 배터리 제조 공정 단계 선택", ("조립 공정", "전극 공정"), None, None),
+        ("section8_button", "button", "감소 대책 적용 및 위험도 재평가 시뮬레이션", None, 0, None),
+        ("section8_input", "number_input", "reduce_*", (1, 2), 0, None),
+        ("rca_checkbox", "checkbox", RCA_CHECKBOX, (True, False), 1, INCIDENT_BUTTON),
+    ),
+    "riskkk.py": (
+        ("slider_change", "slider", "s_env_c", (2, 4), None, None),
+        ("process_switch", "selectbox", "🔋 배터리 제조 공정 단계 선택", ("셀 조립 및 전해액 주입", "양극 혼합 및 코팅"), None, None),
+        ("incident_button", "button", INCIDENT_BUTTON, None, 0, None),
+        ("rca_checkbox", "checkbox", RCA_CHECKBOX, (True, False), 0, INCIDENT_BUTTON),
+    ),
+}
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+def summarize_ms(samples):
+    ms = [s * 1000 for s in samples]
+    return {"n": len(ms), "min_ms": min(ms), "median_ms": statistics.median(ms), "p95_ms": percentile(ms, 95)}
+
+
+def best_time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+# --- 1. 평가 엔진: 스칼라 vs 일괄 ---
+def bench_scoring(n_scalar, n_batch, repeat):
+    rules = get_rules()
+    X, L, F, S = random_matrices(n_batch)
+    sample = [decode_row(*row) for row in zip(X[:n_scalar], L[:n_scalar], F[:n_scalar], S[:n_scalar])]
+    out = {}
+    for scheme in SCHEMES:
+        sr = rules.schemes[scheme]
+        records = [replace(a, scheme=scheme) for a in sample]
+        leading = [a.leading for a in records]
+        lagging = [a.lagging for a in records]
+        uncached = _evaluate.__wrapped__
+        scalar = {
+            "leading": best_time(lambda: [_management_score(sr, li) + sum(f * s for _, _, f, s in li.jsa_factors) for li in leading], repeat),
+            "lagging": best_time(lambda: [_lagging_score(sr, lg) for lg in lagging], repeat),
+            "evaluate": best_time(lambda: [uncached(a, rules) for a in records], repeat),
+        }
+        batch = {
+            "leading": best_time(lambda: management_scores(X, scheme, rules) + jsa_totals(F, S), repeat),
+            "lagging": best_time(lambda: lagging_scores(L, scheme, rules), repeat),
+            "evaluate": best_time(lambda: score_batch(X, L, F, S, scheme, rules), repeat),
+        }
+        out[scheme] = {
+            kind: {
+                "scalar_rows_per_s": n_scalar / scalar[kind],
+                "batch_rows_per_s": n_batch / batch[kind],
+                "speedup": (n_batch / batch[kind]) / (n_scalar / scalar[kind]),
+            }
+            for kind in scalar
+        }
+    return out
+
+
+# --- 2. 페이지 재실행 (AppTest) ---
+def _widget(at, kind, key_or_label):
+    widgets = getattr(at, kind)
+    for w in widgets:
+        if w.key == key_or_label or w.label == key_or_label or (key_or_label.endswith("*") and (w.key or "").startswith(key_or_label[:-1])):
+            return w
+    raise LookupError(f"{kind} '{key_or_label}'를 찾을 수 없습니다.")
+
+
+def _fragment_run(at, fragment_id):
+    """브라우저가 fragment 안의 위젯을 바꿨을 때처럼 해당 fragment만 다시 실행합니다.
+    AppTest.run()은 항상 전체를 실행하므로 재실행 요청에 fragment id를 실어 보냅니다."""
+    from streamlit.runtime.scriptrunner_utils.script_requests import RerunData
+    from streamlit.testing.v1 import local_script_runner
+
+    local_script_runner.RerunData = functools.partial(RerunData, fragment_id_queue=[fragment_id])
+    try:
+        return at.run()
+    finally:
+        local_script_runner.RerunData = RerunData
+
+
+def _interact(at, kind, key, values, i):
+    w = _widget(at, kind, key)
+    if kind == "button":
+        w.click()
+    else:
+        w.set_value(values[i % len(values)])
+
+
+def bench_page(page, scenarios, repeat, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=timeout)
+    t = time.perf_counter()
+    at.run()
+    result = {"cold_run": summarize_ms([time.perf_counter() - t])}
+    warm = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        at.run()
+        warm.append(time.perf_counter() - t)
+    result["rerun_no_change"] = summarize_ms(warm)
+    registered = at._fragment_storage._registration_sequence_by_id
+    fragment_ids = sorted(registered, key=registered.get)
+
+    for name, kind, key, values, fragment, setup in scenarios:
+        modes = (("_full_rerun", at.run), ("", lambda: _fragment_run(at, fragment_ids[fragment]))) if fragment is not None else (("", at.run),)
+        for suffix, run in modes:
+            if setup:
+                _widget(at, "button", setup).click()
+                at.run()
+            samples = []
+            for i in range(repeat):
+                _interact(at, kind, key, values, i)
+                t = time.perf_counter()
+                run()
+                samples.append(time.perf_counter() - t)
+                if at.exception:
+                    raise RuntimeError(f"{page} / {name}{suffix}: {at.exception[0].message}")
+            result[name + suffix] = summarize_ms(samples)
+            at.run() # fragment 실행 후에는 트리에 fragment 요소만 남으므로 전체를 다시 그림
+    return result
+
+
+def bench_pages(repeat, timeout):
+    return {page: bench_page(page, scenarios, repeat, timeout) for page, scenarios in PAGES.items()}
+
+
+# --- 3. matplotlib 렌더링 (페이지와 같은 차트, st.pyplot과 같은 저장 옵션) ---
+CHARTS = {
+    "comparison_bar": (charts.comparison_chart, charts._comparison_figure, ("'조립 공정' 공정 위험도 비교", 182, "보통", 150, "주요 시스템 부실 (Major System Failure)", True)),
+    "simulation_bar": (charts.simulation_chart, charts._simulation_figure, ("'조립 공정' 공정 포함 전체 선행지표 위험도 변화 시뮬레이션", 182, 140)),
+    "all_process_stacked": (charts.all_process_chart, charts._all_process_figure, (
+        ("전극 공정", "조립 공정", "활성화 공정", "팩 공정"), (112,) * 4, (45, 70, 95, 30), (157, 182, 207, 142),
+        ("보통", "보통", "높음", "낮음"), tuple(get_rules().schemes[SCHEME_FS].leading_edges),
+    )),
+    "sensitivity_heatmap": (charts.sensitivity_chart, charts._sensitivity_figure, (
+        "'조립 공정' 선행 등급 격자", "작업허가제(PTW) 준수도", (1, 2, 3, 4, 5), "작업자 숙련도", ("미숙련", "보통", "숙련"),
+        ((211, 208, 205, 202, 199), (208, 205, 202, 199, 196), (206, 203, 200, 197, 194)),
+        ((3, 3, 3, 3, 2), (3, 3, 3, 2, 2), (3, 3, 2, 2, 2)), (0, 2),
+    )),
+    "tornado": (charts.tornado_chart, charts._tornado_figure, (
+        "'조립 공정' 입력별 점수 범위 (현재 높음)", ("작업자 안전수칙 준수도", "화학물질 저장 관리", "셀 적층 빈도(F)", "셀 적층 강도(S)", "작업허가제(PTW) 준수도", "작업자 숙련도"),
+        (197, 197, 197, 196, 199, 200), (213, 213, 213, 208, 211, 205), 205, tuple(get_rules().schemes[SCHEME_FS].leading_edges),
+    )),
+}
+
+
+def bench_charts(repeat):
+    out = {}
+    for name, (cached, build, args) in CHARTS.items():
+        charts._to_bytes(build(*args), "png") # 폰트 캐시 등 첫 호출 비용 제외
+        build_s, render_s, hit_s = [], [], []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            fig = build(*args)
+            t1 = time.perf_counter()
+            data = charts._to_bytes(fig, "png")
+            t2 = time.perf_counter()
+            build_s.append(t1 - t)
+            render_s.append(t2 - t1)
+        cached(*args)
+        for _ in range(repeat):
+            t = time.perf_counter()
+            cached(*args)
+            hit_s.append(time.perf_counter() - t)
+        out[name] = {"build": summarize_ms(build_s), "savefig_png": summarize_ms(render_s), "cache_hit": summarize_ms(hit_s), "png_bytes": len(data)}
+    return out
+
+
+# --- 결과 저장 / 비교 ---
+def git_revision():
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "-uno"], cwd=ROOT, capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return sha, dirty
+
+
+def environment():
+    import matplotlib
+    import streamlit
+
+    sha, dirty = git_revision()
+    return {
+        "commit": sha, "dirty": dirty, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+        "numpy": np.__version__, "streamlit": streamlit.__version__, "matplotlib": matplotlib.__version__,
+        "rules_version": get_rules().version,
+    }
+
+
+def flatten_metrics(results):
+    """비교용 (경로, 값, 높을수록 좋은지) 목록. 시간은 중앙값, 처리량은 rows/s 기준."""
+    metrics = []
+
+    def walk(node, path):
+        for key, value in node.items():
+            if isinstance(value, dict):
+                walk(value, path + (key,))
+            elif key.endswith("rows_per_s"):
+                metrics.append(("/".join(path + (key,)), value, True))
+            elif key == "median_ms":
+                metrics.append(("/".join(path), value, False))
+
+    walk({k: results[k] for k in SECTIONS if k in results}, ())
+    return metrics
+
+
+def compare(base, current, tolerance=DEFAULT_TOLERANCE):
+    """이전 결과 대비 변화율 표를 출력하고 회귀 항목 목록을 반환합니다."""
+    before = {path: value for path, value, _ in flatten_metrics(base)}
+    regressions = []
+    print(f"\n비교 기준: {base['env']['commit']} → {current['env']['commit']} (허용 {tolerance:.0%})")
+    for path, value, higher_is_better in flatten_metrics(current):
+        old = before.get(path)
+        if not old:
+            continue
+        change = value / old - 1
+        worse = -change if higher_is_better else change
+        flag = "!!" if worse > tolerance else "  "
+        if worse > tolerance:
+            regressions.append(path)
+        print(f"{flag} {path:<60} {old:>14,.2f} → {value:>14,.2f} ({change:+.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", help="결과 JSON 경로 (기본: benchmarks/results/<커밋>.json)")
+    parser.add_argument("--compare", metavar="BASE_JSON", help="비교할 이전 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="일괄 평가 행 수")
+    parser.add_argument("--scalar-rows", type=int, default=20_000)
+    parser.add_argument("--timeout", type=float, default=60, help="AppTest 1회 실행 제한 시간 (초)")
+    parser.add_argument("--skip", action="append", default=[], choices=SECTIONS)
+    args = parser.parse_args(argv)
+
+    # 페이지가 사용자 이력 DB를 건드리지 않도록 임시 DB 사용 (페이지 모듈이 import되기 전에 설정)
+    os.environ.setdefault("RISK_HISTORY_DB", os.path.join(tempfile.mkdtemp(), "bench_history.db"))
+
+    warnings.filterwarnings("ignore", message="Glyph .* missing from font", category=UserWarning) # 한글 글꼴 미설치 환경
+    results = {"env": environment()}
+    if "scoring" not in args.skip:
+        results["scoring"] = bench_scoring(args.scalar_rows, args.rows, args.repeat)
+        for scheme, kinds in results["scoring"].items():
+            for kind, r in kinds.items():
+                print(f"scoring {scheme:<8}{kind:<9} scalar {r['scalar_rows_per_s']:>12,.0f} rows/s  batch {r['batch_rows_per_s']:>14,.0f} rows/s  (x{r['speedup']:,.0f})")
+    if "pages" not in args.skip:
+        results["pages"] = bench_pages(args.repeat, args.timeout)
+        for page, scenarios in results["pages"].items():
+            for name, r in scenarios.items():
+                print(f"page    {page:<14} {name:<28} median {r['median_ms']:>8.1f} ms  p95 {r['p95_ms']:>8.1f} ms  (n={r['n']})")
+    if "charts" not in args.skip:
+        results["charts"] = bench_charts(args.repeat)
+        for name, r in results["charts"].items():
+            print(f"chart   {name:<20} build {r['build']['median_ms']:>6.1f} ms  savefig {r['savefig_png']['median_ms']:>6.1f} ms  cache hit {r['cache_hit']['median_ms']:.3f} ms  ({r['png_bytes']:,} bytes)")
+    if "startup" not in args.skip:
+        results["startup"] = bench_startup(PAGES, args.repeat, args.timeout)
+        print_startup(results["startup"])
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{results['env']['commit']}{'-dirty' if results['env']['dirty'] else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        if regressions:
+            print(f"!! {len(regressions)}개 항목이 {args.tolerance:.0%} 넘게 느려졌습니다.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""열폭주 전조 감지 측정: 100k 셀 x 1 Hz를 감당하는지, 표본에서 경보까지 얼마나 걸리는지 확인합니다.
+
+실행: python -m benchmarks.bench_thermal [--cells 100000] [--ticks 600] [--inject 20] [--realtime 150]
+- detect: 합성 계측을 실시간 대기 없이 연속으로 넣어 프레임(전 셀 1초분) 처리 시간, 전조 시작부터 경보까지의
+  계측 시간(초), 전조 주입 셀 이외의 오경보 수, 셀 상태 메모리를 잽니다.
+- realtime: 같은 프로세스의 asyncio 루프에서 발생기가 1 Hz로 로컬 TCP에 줄을 쓰고 ThermalDetector가 받아
+  경보가 날 때까지의 벽시계 지연(해당 표본을 보낸 시각 → 경보 객체 생성)과 수집 중 CPU / RSS 변화를 잽니다.
+  (발생기의 줄 만들기 비용까지 같은 코어에서 돌리므로 보수적인 값)
+- relatch: 경보한 셀이 clear(셀) 뒤에, 또는 ALERT_LATCH_S가 지난 뒤에 두 번째 전조에서 다시 경보하는지,
+  해제하지 않은 셀은 그 사이 다시 경보하지 않는지 확인합니다.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+import numpy as np
+
+from risk_engine.sensors import serve_tcp
+from risk_engine.thermal import ALERT_LATCH_S, WARMUP_SAMPLES, CellSimulator, ThermalDetector
+
+INJECT_AT = WARMUP_SAMPLES + 10 # 준비 구간이 끝난 뒤 전조 주입
+
+
+def _rss_mib():
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(line.split()[1]) / 1024 for line in f if line.startswith("VmRSS:"))
+    except (OSError, StopIteration):
+        return None
+
+
+def bench_detect(cells, ticks, inject, seed=0):
+    sim = CellSimulator(cells, seed, runaway_rate=0)
+    det = ThermalDetector(cells)
+    injected = np.linspace(0, cells - 1, inject, dtype=np.int64)
+    targets = set(injected.tolist())
+    frame_s, alerted, false_alarms = [], {}, 0
+    for k in range(ticks):
+        if k == INJECT_AT:
+            sim.inject(injected)
+        ids, volt, temp = sim.tick()
+        started = time.perf_counter()
+        events = det.update(ids, volt, temp, float(k))
+        frame_s.append(time.perf_counter() - started)
+        for e in events:
+            if e.cell in targets:
+                alerted.setdefault(e.cell, k - INJECT_AT)
+            else:
+                false_alarms += 1
+    delays = list(alerted.values())
+    return {
+        "frame_ms_p50": float(np.median(frame_s)) * 1000, "frame_ms_p99": float(np.percentile(frame_s, 99)) * 1000,
+        "detected": len(delays), "injected": inject, "false_alarms": false_alarms, "samples": cells * ticks,
+        "delay_s_p50": float(np.median(delays)) if delays else None, "delay_s_max": max(delays) if delays else None,
+        "state_mib": det.state_bytes() / 2**20,
+    }
+
+
+def bench_relatch(cells=64, seed=0):
+    """셀 0 / 1 / 2에 전조 → 셀 0만 clear → 셀 0 / 2에 두 번째 전조 → ALERT_LATCH_S 뒤 셀 1에 두 번째 전조.
+    셀별 경보 횟수를 단계마다 돌려줌."""
+    rng = np.random.default_rng(seed)
+    det = ThermalDetector(cells)
+    ids, volt, temp = np.arange(cells), np.full(cells, 3.7), np.full(cells, 25.0)
+    counts, clock = np.zeros(cells, dtype=np.int64), [0.0]
+
+    def run(seconds, hot=(), rate=0.0):
+        for _ in range(seconds):
+            clock[0] += 1.0
+            temp[list(hot)] += rate
+            for e in det.update(ids, volt, temp + rng.normal(0, 0.01, cells), clock[0]):
+                counts[e.cell] += 1
+
+    def excursion(hot):
+        run(15, hot, 0.5) # 급승온 뒤 그 온도에서 유지 (CUSUM이 가라앉을 때까지)
+        run(300)
+
+    run(WARMUP_SAMPLES + 30)
+    excursion((0, 1, 2))
+    first = counts[:3].tolist()
+    det.clear(0)
+    excursion((0, 2))
+    acked = counts[:3].tolist()
+    run(ALERT_LATCH_S)
+    before = int(counts[1])
+    excursion((1,))
+    return {"first": first, "acked": acked, "expired": [before, int(counts[1])], "others": int(counts[3:].sum())}
+
+
+async def _bench_realtime(cells, seconds, inject):
+    det = ThermalDetector(cells)
+    server = await serve_tcp(det, "127.0.0.1", 0)
+    _, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+    sim = CellSimulator(cells, runaway_rate=0)
+    injected = np.linspace(0, cells - 1, inject, dtype=np.int64)
+    sent_at = {} # 셀 → 그 셀의 마지막 표본을 보낸 시각
+    latencies = {}
+    original_update = det.update
+
+    def update(ids, volt, temp, t):
+        events = original_update(ids, volt, temp, t)
+        now = time.time()
+        for e in events:
+            latencies.setdefault(e.cell, now - sent_at.get(e.cell, now))
+        return events
+
+    det.update = update
+    rss0, cpu0, wall0 = _rss_mib(), time.process_time(), time.perf_counter()
+    next_tick = time.monotonic()
+    for k in range(int(seconds)):
+        if k == INJECT_AT:
+            sim.inject(injected)
+        text = sim.lines()
+        now = time.time()
+        for cell in injected.tolist():
+            sent_at[cell] = now
+        writer.write(text.encode())
+        await writer.drain()
+        next_tick += 1.0
+        await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+    await asyncio.sleep(0.5)
+    cpu, wall, rss1 = time.process_time() - cpu0, time.perf_counter() - wall0, _rss_mib()
+    writer.close()
+    await writer.wait_closed()
+    await asyncio.sleep(0.1) # 수집 쪽이 EOF를 보고 스스로 끝나도록
+    server.close()
+    await server.wait_closed()
+    lat = [v * 1000 for v in latencies.values()]
+    return {
+        "alerts": len(lat), "injected": inject, "samples": det.samples, "rejected": det.rejected,
+        "latency_ms_p50": float(np.median(lat)) if lat else None, "latency_ms_max": max(lat) if lat else None,
+        "cpu_percent": cpu / wall * 100, "rss_growth_mib": rss1 - rss0 if rss0 is not None and rss1 is not None else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cells", type=int, default=100_000)
+    parser.add_argument("--ticks", type=int, default=600, help="detect 구간 계측 시간 (초, 실시간 대기 없음)")
+    parser.add_argument("--inject", type=int, default=20, help="전조를 넣을 셀 수")
+    parser.add_argument("--realtime", type=float, default=150, help="realtime 구간 길이 (초, 0이면 건너뜀)")
+    args = parser.parse_args(argv)
+
+    r = bench_relatch()
+    relatch_ok = r["first"] == [1, 1, 1] and r["acked"] == [2, 1, 1] and r["expired"][1] > r["expired"][0] and not r["others"]
+    print(f"relatch  첫 전조 {r['first']}  셀 0 clear 뒤 셀 0/2 두 번째 전조 {r['acked']}  "
+          f"해제 시간 뒤 셀 1 {r['expired'][0]}→{r['expired'][1]}  다른 셀 {r['others']}  {'OK' if relatch_ok else 'FAIL'}")
+
+    r = bench_detect(args.cells, args.ticks, args.inject)
+    print(f"detect   {args.cells:,}셀 x {args.ticks}초  프레임 처리 p50 {r['frame_ms_p50']:.1f} ms  p99 {r['frame_ms_p99']:.1f} ms (1 Hz 예산 1000 ms)")
+    print(f"detect   감지 {r['detected']}/{r['injected']}  전조→경보 p50 {r['delay_s_p50']} s  최대 {r['delay_s_max']} s (계측 시간)  "
+          f"오경보 {r['false_alarms']} / {r['samples']:,} 표본  셀 상태 {r['state_mib']:.1f} MiB")
+    if args.realtime:
+        r = asyncio.run(_bench_realtime(args.cells, args.realtime, args.inject))
+        print(f"realtime 경보 {r['alerts']}/{r['injected']}  표본 전송→경보 p50 {r['latency_ms_p50']:.0f} ms  최대 {r['latency_ms_max']:.0f} ms  "
+              f"받은 표본 {r['samples']:,} (버림 {r['rejected']})  CPU {r['cpu_percent']:.0f}%  RSS 증가 {r['rss_growth_mib']:.1f} MiB")
+    return 0 if relatch_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,389 @@
+"""다중 세션 부하 시험: 동시 평가자 수를 늘려 가며 재실행 지연 / 처리량 / CPU / 메모리를 잽니다.
+
+실행: python -m benchmarks.loadtest [--sessions 1,5,10,25] [--duration 30] [--think-ms 1000] [--target server|apptest] [페이지 ...]
+- server (기본): 페이지마다 로컬에서 `streamlit run` 서버를 띄우고(네트워크 불필요) 세션마다 브라우저처럼
+  웹소켓(/_stcore/stream)으로 재실행 요청(BackMsg)을 보내 script_finished가 올 때까지의 시간을 잽니다.
+  fragment 안의 위젯은 브라우저와 같이 해당 fragment만 다시 실행하도록 요청합니다.
+  이미 떠 있는 서버는 --url (ws://호스트:포트)로 지정하며, --server-pid를 주면 그 프로세스의 CPU/메모리도 잽니다.
+- apptest: 서버 없이 같은 프로세스의 AppTest 인스턴스들을 순서대로 돌립니다 (AppTest는 전역 런타임을 바꿔 끼우므로
+  동시 실행 불가 → 동시성 경합 없이 세션 수에 따른 메모리/CPU 증가만 봄, fragment도 전체 재실행).
+세션 수 단계마다 세션을 추가로 열어(기존 세션은 유지) --duration초 동안 시나리오의 조작을 무작위로 재생합니다.
+조작 사이 생각 시간은 평균 --think-ms의 지수분포입니다 (0이면 쉬지 않고 연속 요청).
+단계별로 처리량(재실행/초), 지연 p50/p95/p99, 오류 수, 서버 CPU(코어 대비 %), 서버 RSS를 출력하고 --out으로 JSON 저장합니다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import warnings
+
+import numpy as np
+
+from benchmarks.bench_suite import INCIDENT_BUTTON, environment
+from risk_engine.catalog import ARICELL_PROCESS_STEPS, FS_PROCESS_CATALOG
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROCESS_SELECT = "🔋 배터리 제조 공정 단계 선택"
+LEVELS = (1, 2, 3, 4, 5)
+
+# 페이지별 평가자 조작 시나리오: (가중치, 위젯 종류, 키 또는 라벨 ('접두사*'는 키 접두사 중 무작위), 값 후보 (None이면 버튼 클릭))
+# 화면에 아직 없는 위젯(사고 버튼을 누르기 전의 보완 루틴 체크박스 등)은 그 차례에 고르지 않습니다.
+SCENARIOS = {
+    "risk final.py": (
+        (2, "selectbox", PROCESS_SELECT, tuple(FS_PROCESS_CATALOG)),
+        (1, "selectbox", PROCESS_SELECT, ("📊 전체 공정 비교",)),
+        (4, "slider", "freq_*", LEVELS),
+        (4, "slider", "sev_*", LEVELS),
+        (3, "slider", "s_env_c_total", LEVELS),
+        (3, "slider", "s_w_sc_total", LEVELS),
+        (1, "toggle", "mc_mode", (True, False)),
+        (2, "number_input", "reduce_*", (0, 1)),
+        (1, "button", "감소 대책 적용 및 위험도 재평가 시뮬레이션", None),
+        (1, "button", INCIDENT_BUTTON, None),
+        (2, "checkbox", "enhance_*", (True, False)),
+    ),
+    "riskkk.py": (
+        (2, "selectbox", PROCESS_SELECT, tuple(ARICELL_PROCESS_STEPS)),
+        (4, "slider", "s_env_c", LEVELS),
+        (4, "slider", "s_w_sc", LEVELS),
+        (3, "slider", "s_e_c", LEVELS),
+        (2, "selectbox", "s_w_s", ("미숙련", "보통", "숙련")),
+        (1, "button", INCIDENT_BUTTON, None),
+        (2, "checkbox", "enhance_*", (True, False)),
+    ),
+}
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+def _matches(key_or_label, key, label):
+    if key_or_label.endswith("*"):
+        return (key or "").startswith(key_or_label[:-1])
+    return key_or_label in (key, label)
+
+
+def choose_action(scenario, available, rng):
+    """지금 화면에 있는 위젯 중에서 가중치대로 조작 하나를 고릅니다. available(종류, 키/라벨) → 후보 목록."""
+    candidates = [(weight, step, found) for weight, *step in scenario if (found := available(step[0], step[1]))]
+    if not candidates:
+        return None
+    weight, (kind, key_or_label, values), found = rng.choices(candidates, weights=[c[0] for c in candidates])[0]
+    return kind, rng.choice(found), None if values is None else rng.choice(values), key_or_label
+
+
+# --- 프로세스 CPU / 메모리 (/proc, 리눅스 전용; 없으면 None) ---
+def proc_cpu_seconds(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.process_time() if pid == os.getpid() else None
+
+
+def proc_rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+# --- server: 로컬 streamlit 서버 + 웹소켓 클라이언트 ---
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(page, port, timeout):
+    env = dict(os.environ, PYTHONWARNINGS="ignore") # 한글 글꼴 미설치 환경의 글리프 경고
+    env.setdefault("RISK_HISTORY_DB", os.path.join(tempfile.mkdtemp(), "loadtest_history.db"))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(ROOT, page), "--server.headless", "true",
+         "--server.port", str(port), "--server.address", "127.0.0.1", "--server.fileWatcherType", "none",
+         "--browser.gatherUsageStats", "false"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{page}: streamlit 서버가 시작하지 못했습니다 (종료 코드 {proc.returncode}).")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as r:
+                if r.status == 200:
+                    return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"{page}: {timeout:.0f}초 안에 서버가 응답하지 않았습니다.")
+
+
+# 위젯 종류 → (Element 필드, WidgetState 값 필드); 토글은 checkbox 요소의 한 형태
+WIDGET_PROTO = {
+    "slider": ("slider", "double_array_value"), "selectbox": ("selectbox", "string_value"),
+    "radio": ("radio", "string_value"), "checkbox": ("checkbox", "bool_value"), "toggle": ("checkbox", "bool_value"),
+    "number_input": ("number_input", "double_value"), "button": ("button", "trigger_value"),
+}
+
+
+class ServerSession:
+    """브라우저 탭 하나처럼 동작하는 웹소켓 세션. 화면에 나온 위젯 id와 fragment를 기억했다가 재실행 요청에 씁니다."""
+
+    def __init__(self, url, timeout):
+        self.url, self.timeout = url, timeout
+        self.widgets = {} # id → (Element 필드, 사용자 키, 라벨, fragment id)
+        self.states = {} # id → WidgetState (브라우저처럼 화면에 있는 위젯의 바꾼 값을 계속 함께 보냄)
+        self.ws = None
+
+    async def open(self):
+        import websockets
+
+        self.ws = await websockets.connect(f"{self.url}/_stcore/stream", subprotocols=["streamlit"], max_size=None)
+        return await self.rerun()
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    def available(self, kind, key_or_label):
+        field = WIDGET_PROTO[kind][0]
+        return [wid for wid, (f, key, label, _) in self.widgets.items() if f == field and _matches(key_or_label, key, label)]
+
+    async def act(self, kind, widget_id, value):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        state = WidgetState(id=widget_id)
+        value_field = WIDGET_PROTO[kind][1]
+        if value_field == "double_array_value":
+            state.double_array_value.data.append(float(value))
+        elif value_field == "trigger_value":
+            state.trigger_value = True
+        else:
+            setattr(state, value_field, float(value) if value_field == "double_value" else value)
+        fragment_id = self.widgets[widget_id][3]
+        if value_field != "trigger_value": # 버튼은 한 번만 눌림
+            self.states[widget_id] = state
+        return await self.rerun(extra=() if value_field != "trigger_value" else (state,), fragment_id=fragment_id)
+
+    async def rerun(self, extra=(), fragment_id=""):
+        """재실행을 요청하고 script_finished까지 기다립니다. (지연 초, 예외 요소 수) 반환."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        from streamlit.runtime.state.common import user_key_from_element_id
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.fragment_id = fragment_id
+        msg.rerun_script.widget_states.widgets.extend([state for wid, state in self.states.items() if wid in self.widgets] + list(extra))
+        started = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        if not fragment_id:
+            self.widgets.clear()
+        errors = 0
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await asyncio.wait_for(self.ws.recv(), self.timeout))
+            kind = fwd.WhichOneof("type")
+            if kind == "script_finished":
+                return time.perf_counter() - started, errors
+            if kind != "delta" or fwd.delta.WhichOneof("type") != "new_element":
+                continue
+            element = fwd.delta.new_element
+            field = element.WhichOneof("type")
+            if field == "exception":
+                errors += 1
+            elif field in ("slider", "selectbox", "radio", "checkbox", "number_input", "button"):
+                proto = getattr(element, field)
+                self.widgets[proto.id] = (field, user_key_from_element_id(proto.id), proto.label, fwd.delta.fragment_id)
+
+
+async def _session_loop(session, scenario, rng, deadline, think_s, samples):
+    while time.monotonic() < deadline:
+        action = choose_action(scenario, session.available, rng)
+        if action is None:
+            break
+        kind, widget_id, value, name = action
+        try:
+            latency, errors = await session.act(kind, widget_id, value)
+        except (asyncio.TimeoutError, OSError) as exc:
+            samples.append((name, None, f"{type(exc).__name__}: {exc}"))
+            continue
+        samples.append((name, latency, errors))
+        if think_s:
+            await asyncio.sleep(min(rng.expovariate(1 / think_s), max(0.0, deadline - time.monotonic())))
+
+
+async def _run_server_steps(page, url, pid, steps, duration, think_s, timeout, seed, report):
+    sessions, rngs = [], []
+    try:
+        for count in steps:
+            opened = []
+            while len(sessions) < count:
+                session = ServerSession(url, timeout)
+                sessions.append(session)
+                rngs.append(random.Random(seed * 100_003 + len(sessions)))
+                opened.append(session.open())
+            initial = await asyncio.gather(*opened)
+            samples = []
+            cpu0, wall0 = proc_cpu_seconds(pid) if pid else None, time.perf_counter()
+            deadline = time.monotonic() + duration
+            await asyncio.gather(*(_session_loop(s, SCENARIOS[page], r, deadline, think_s, samples) for s, r in zip(sessions, rngs)))
+            report(count, samples, initial, cpu0, wall0, pid)
+    finally:
+        await asyncio.gather(*(s.close() for s in sessions), return_exceptions=True)
+
+
+# --- apptest: 서버 없이 같은 프로세스에서 ---
+class AppTestSession:
+    def __init__(self, page, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=timeout)
+
+    def _run(self):
+        started = time.perf_counter()
+        self.at.run()
+        return time.perf_counter() - started, len(self.at.exception)
+
+    def open(self):
+        return self._run()
+
+    def available(self, kind, key_or_label):
+        return [w for w in getattr(self.at, kind) if _matches(key_or_label, w.key, w.label)]
+
+    def act(self, kind, widget, value):
+        if kind == "button":
+            widget.click()
+        else:
+            widget.set_value(value)
+        return self._run()
+
+
+def _run_apptest_steps(page, steps, duration, think_s, timeout, seed, report):
+    sessions, rngs = [], []
+    for count in steps:
+        initial = []
+        while len(sessions) < count:
+            sessions.append(AppTestSession(page, timeout))
+            rngs.append(random.Random(seed * 100_003 + len(sessions)))
+            initial.append(sessions[-1].open())
+        samples = []
+        cpu0, wall0 = proc_cpu_seconds(os.getpid()), time.perf_counter()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline: # 세션을 돌아가며 한 조작씩
+            for session, rng in zip(sessions, rngs):
+                action = choose_action(SCENARIOS[page], session.available, rng)
+                if action is not None:
+                    kind, widget, value, name = action
+                    samples.append((name, *session.act(kind, widget, value)))
+                if time.monotonic() >= deadline:
+                    break
+        report(count, samples, initial, cpu0, wall0, os.getpid())
+
+
+# --- 집계 ---
+def summarize_step(count, samples, initial, cpu0, wall0, pid):
+    elapsed = time.perf_counter() - wall0
+    ok = [latency * 1000 for _, latency, _ in samples if latency is not None]
+    cpu1 = proc_cpu_seconds(pid) if pid else None
+    by_action = {}
+    for name, latency, _ in samples:
+        if latency is not None:
+            by_action.setdefault(name, []).append(latency * 1000)
+    return {
+        "sessions": count, "elapsed_s": elapsed, "reruns": len(ok), "reruns_per_s": len(ok) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ok, 50), "p95_ms": percentile(ok, 95), "p99_ms": percentile(ok, 99), "max_ms": max(ok, default=float("nan")),
+        "page_errors": sum(e for _, latency, e in samples if latency is not None),
+        "failed_requests": sum(1 for _, latency, _ in samples if latency is None),
+        "initial_load_p50_ms": percentile([t * 1000 for t, _ in initial], 50) if initial else None,
+        "cpu_percent": (cpu1 - cpu0) / elapsed * 100 if cpu0 is not None and cpu1 is not None and elapsed else None,
+        "rss_mib": rss / 2**20 if pid and (rss := proc_rss_bytes(pid)) else None,
+        "by_action_p50_ms": {name: percentile(v, 50) for name, v in sorted(by_action.items())},
+    }
+
+
+def print_step(page, r):
+    cpu = f"{r['cpu_percent']:6.0f}%" if r["cpu_percent"] is not None else "     -"
+    rss = f"{r['rss_mib']:7.0f} MiB" if r["rss_mib"] is not None else "        -"
+    print(f"load {page:<14} 세션 {r['sessions']:>4}  {r['reruns_per_s']:7.1f} 재실행/s  p50 {r['p50_ms']:7.0f} ms  p95 {r['p95_ms']:7.0f} ms  "
+          f"p99 {r['p99_ms']:7.0f} ms  오류 {r['page_errors'] + r['failed_requests']:>3}  CPU {cpu}  RSS {rss}", flush=True)
+
+
+def load_test(page, target, steps, duration, think_s, timeout, seed, url=None, server_pid=None):
+    results = []
+
+    def report(*args):
+        results.append(summarize_step(*args))
+        print_step(page, results[-1])
+
+    if target == "apptest":
+        _run_apptest_steps(page, steps, duration, think_s, timeout, seed, report)
+        return results
+    server = None
+    if url is None:
+        port = free_port()
+        server = start_server(page, port, timeout)
+        url, server_pid = f"ws://127.0.0.1:{port}", server.pid
+    try:
+        asyncio.run(_run_server_steps(page, url, server_pid, steps, duration, think_s, timeout, seed, report))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*", default=list(SCENARIOS), help=f"대상 페이지 (기본: {', '.join(SCENARIOS)})")
+    parser.add_argument("--target", choices=("server", "apptest"), default="server")
+    parser.add_argument("--sessions", default="1,5,10,25", help="단계별 동시 세션 수 (쉼표 구분, 증가 순)")
+    parser.add_argument("--duration", type=float, default=30, help="단계당 측정 시간 (초)")
+    parser.add_argument("--think-ms", type=float, default=1000, help="조작 사이 평균 생각 시간 (0이면 연속 요청)")
+    parser.add_argument("--timeout", type=float, default=60, help="재실행 1회 / 서버 시작 제한 시간 (초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="이미 떠 있는 서버 (ws://호스트:포트), 페이지는 하나만")
+    parser.add_argument("--server-pid", type=int, help="--url 서버의 프로세스 id (CPU/메모리 측정용)")
+    parser.add_argument("--out", help="결과 JSON 경로")
+    args = parser.parse_args(argv)
+    unknown = [page for page in args.pages if page not in SCENARIOS]
+    if unknown:
+        parser.error(f"시나리오가 없는 페이지: {', '.join(unknown)}")
+    try:
+        steps = [int(n) for n in args.sessions.split(",")]
+    except ValueError:
+        parser.error("--sessions는 쉼표로 구분한 정수여야 합니다 (예: 1,5,10)")
+    if steps != sorted(steps) or steps[0] < 1:
+        parser.error("--sessions는 1 이상, 증가 순이어야 합니다.")
+    if args.url and (len(args.pages) != 1 or args.target != "server"):
+        parser.error("--url은 server 대상에서 페이지 하나만 지정할 때 씁니다.")
+
+    os.environ.setdefault("RISK_HISTORY_DB", os.path.join(tempfile.mkdtemp(), "loadtest_history.db"))
+    warnings.filterwarnings("ignore", message="Glyph .* missing from font", category=UserWarning) # 한글 글꼴 미설치 환경
+    results = {"env": environment(), "target": args.target, "think_ms": args.think_ms, "duration_s": args.duration, "pages": {}}
+    for page in args.pages:
+        results["pages"][page] = load_test(
+            page, args.target, steps, args.duration, args.think_ms / 1000, args.timeout, args.seed, args.url, args.server_pid,
+        )
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""차트 렌더링 메모리 장기 실행(soak) 시험: 재실행을 반복해도 서버 RSS가 일정한지 확인합니다.
+
+실행: python -m benchmarks.soak_charts [--reruns 10000] [--mode charts|app|legacy] [--distinct 200] [--cache-mb 16]
+- charts: 매 재실행마다 페이지와 같은 방식으로 평가 → 7번 비교 차트 / 8번 시뮬레이션 차트를 렌더링 캐시로 가져옵니다.
+  입력 상태는 --distinct개 중에서 무작위로 고르고, 캐시 상한(--cache-mb)을 작게 주면 계속 교체(eviction)가 일어납니다.
+- app: Streamlit AppTest로 "risk final.py"를 실제로 재실행합니다 (슬라이더를 무작위로 바꿈, 느림).
+- legacy: 이전 방식(plt.subplots 후 닫지 않음)을 재현해 비교합니다. pyplot 레지스트리가 그림을 계속 쥐고 있어 RSS가 늘어납니다.
+구간별 RSS를 출력하고, 워밍업(처음 20%) 이후 증가량이 --max-growth-mb를 넘으면 종료 코드 1을 반환합니다.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError: # /proc가 없는 OS: 최대 RSS로 대신 (macOS는 바이트, Linux는 KB 단위)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def input_states(distinct, seed=0):
+    """(공정, 선행 점수, 선행 등급, 후행 점수, 후행 상태, 감소 후 점수) 상태 목록. 점수/등급은 실제 평가 엔진으로 계산."""
+    from risk_engine import SCHEME_FS, Assessment, LaggingInputs, LeadingInputs, evaluate
+
+    rng = random.Random(seed)
+    processes = ("전극 공정", "조립 공정", "활성화 공정", "팩 공정")
+    states = []
+    for _ in range(distinct):
+        factors = tuple((f"요인{i}", "", rng.randint(1, 5), rng.randint(1, 5)) for i in range(5))
+        leading = LeadingInputs(env_cleanliness=rng.randint(1, 5), worker_safety_compliance=rng.randint(1, 5), jsa_factors=factors)
+        lagging = LaggingInputs(past_fine_history_level=rng.choice(("없음", "있음 (1회성)", "상습적/중요 위반 (2회 이상)")))
+        r = evaluate(Assessment(leading, lagging, SCHEME_FS))
+        states.append((rng.choice(processes), r.leading_score, r.leading_grade, r.lagging_score, r.lagging_grade, max(0, r.leading_score - rng.randint(0, 40))))
+    return states
+
+
+def run_charts(reruns, distinct, seed, on_sample):
+    from risk_engine import charts
+
+    states = input_states(distinct, seed)
+    rng = random.Random(seed + 1)
+    for i in range(1, reruns + 1):
+        process, leading, grade, lagging, status, simulated = rng.choice(states)
+        charts.comparison_chart(f"'{process}' 공정 위험도 비교", leading, grade, lagging, status, annotate=status != "주목할 문제 없음")
+        charts.simulation_chart(f"'{process}' 공정 포함 전체 선행지표 위험도 변화 시뮬레이션", leading, simulated)
+        on_sample(i, charts.CACHE.info())
+
+
+def run_legacy(reruns, distinct, seed, on_sample):
+    import io
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    states = input_states(distinct, seed)
+    rng = random.Random(seed + 1)
+    for i in range(1, reruns + 1):
+        process, leading, grade, lagging, status, simulated = rng.choice(states)
+        for values in ((leading, lagging), (leading, simulated)): # 7번 / 8번 차트, 이전 코드처럼 닫지 않음
+            fig, ax = plt.subplots(figsize=(7, 4))
+            ax.bar(["선행지표", "후행지표"], values)
+            ax.set_title(f"'{process}' 공정 위험도 비교")
+            fig.savefig(io.BytesIO(), format="png", dpi=200, bbox_inches="tight")
+        on_sample(i, {"open_figures": len(plt.get_fignums())})
+
+
+def run_app(reruns, distinct, seed, on_sample):
+    from streamlit.testing.v1 import AppTest
+
+    from risk_engine import charts
+
+    rng = random.Random(seed)
+    at = AppTest.from_file(os.path.join(ROOT, "risk final.py"), default_timeout=120).run()
+    keys = ("s_env_c_total", "s_w_sc_total", "s_e_c_total")
+    for i in range(1, reruns + 1):
+        at.slider(key=rng.choice(keys)).set_value(rng.randint(1, 5)).run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+        on_sample(i, charts.CACHE.info())
+
+
+MODES = {"charts": run_charts, "app": run_app, "legacy": run_legacy}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=MODES, default="charts")
+    parser.add_argument("--reruns", type=int, default=10_000)
+    parser.add_argument("--distinct", type=int, default=200, help="서로 다른 입력 상태 수")
+    parser.add_argument("--cache-mb", type=float, default=16, help="렌더링 캐시 상한 (MB)")
+    parser.add_argument("--samples", type=int, default=20, help="RSS 기록 횟수")
+    parser.add_argument("--max-growth-mb", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.mode == "app": # 페이지가 사용자 이력 DB를 건드리지 않도록
+        os.environ.setdefault("RISK_HISTORY_DB", os.path.join(tempfile.mkdtemp(), "soak_history.db"))
+    warnings.filterwarnings("ignore", message="Glyph .* missing from font", category=UserWarning) # 한글 글꼴 미설치 환경
+    from risk_engine import charts
+    charts.CACHE.max_bytes = int(args.cache_mb * 2**20)
+
+    every = max(1, args.reruns // args.samples)
+    samples = []
+    started = time.perf_counter()
+
+    def on_sample(i, info):
+        if i % every == 0 or i == args.reruns:
+            samples.append((i, rss_mb()))
+            extra = "  ".join(f"{k}={v:,}" for k, v in info.items())
+            print(f"rerun {i:>7,}  rss {samples[-1][1]:8.1f} MB  {time.perf_counter() - started:7.1f}s  {extra}", flush=True)
+
+    print(f"mode={args.mode} reruns={args.reruns:,} distinct={args.distinct} cache={args.cache_mb} MB  start rss {rss_mb():.1f} MB")
+    MODES[args.mode](args.reruns, args.distinct, args.seed, on_sample)
+
+    warm = samples[max(0, len(samples) // 5 - 1)][1]
+    growth = max(rss for _, rss in samples) - warm
+    print(f"워밍업 이후 RSS 증가: {growth:+.1f} MB (허용 {args.max_growth_mb} MB)")
+    return 0 if growth <= args.max_growth_mb else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
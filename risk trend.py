@@ -0,0 +1,82 @@
+import streamlit as st
+import time
+
+from risk_engine import GRADES, SCHEME_ARICELL, SCHEME_FS
+from risk_engine.history import HistoryStore
+
+st.set_page_config(layout="wide", page_title="위험성 평가 추이 대시보드")
+st.title("📈 공정별 위험성 평가 추이 대시보드")
+st.markdown("---")
+st.write("저장된 평가 이력의 **일/주/월 집계(rollup)**를 읽어 공정별 선행/후행 지표 추이를 보여줍니다. 집계는 평가가 저장될 때마다 증분 갱신되므로, 수년치 이력도 원본 전체를 다시 읽지 않고 바로 표시됩니다.")
+
+# --- 이력 저장소 ---
+@st.cache_resource
+def get_history_store():
+    return HistoryStore()
+
+# --- 조회 조건 ---
+PERIOD_LABELS = {"일별": "day", "주별": "week", "월별": "month"}
+LOOKBACK_DAYS = {"최근 90일": 90, "최근 1년": 365, "최근 3년": 3 * 365, "전체": None}
+
+col_scheme, col_period, col_range = st.columns(3)
+with col_scheme:
+    scheme_label = st.radio("평가 방식", ["F/S 직접 입력", "아리셀 점수"], horizontal=True, key="trend_scheme")
+with col_period:
+    period_label = st.radio("집계 단위", list(PERIOD_LABELS), index=1, horizontal=True, key="trend_period")
+with col_range:
+    range_label = st.selectbox("조회 기간", list(LOOKBACK_DAYS), index=1, key="trend_range")
+
+scheme = SCHEME_FS if scheme_label == "F/S 직접 입력" else SCHEME_ARICELL
+period = PERIOD_LABELS[period_label]
+lookback = LOOKBACK_DAYS[range_label]
+since = time.time() - lookback * 86400 if lookback else None
+
+load_start = time.perf_counter()
+rollup_rows = get_history_store().trend(period, scheme=scheme, since=since)
+load_ms = (time.perf_counter() - load_start) * 1000
+
+if not rollup_rows:
+    st.info("조회 조건에 해당하는 평가 이력이 없습니다. 평가 화면에서 '💾 이번 평가를 이력에 저장'으로 이력을 쌓아 주세요.")
+    st.stop()
+
+import pandas as pd # 조회 위젯을 그린 뒤, 표/차트를 만들 때 import (이력이 없으면 불러오지 않음)
+trend_df = pd.DataFrame([
+    {"구간": pd.Timestamp.fromtimestamp(row["bucket"]), "공정": row["process"], "평가 건수": row["n"],
+     "선행 평균": row["avg_leading"], "선행 최대": row["max_leading"], "후행 평균": row["avg_lagging"], "후행 최대": row["max_lagging"],
+     **{f"선행 {grade}": count for grade, count in row["leading_grades"].items()}}
+    for row in rollup_rows
+])
+
+all_processes = sorted(trend_df["공정"].unique())
+selected_processes = st.multiselect("공정 선택", all_processes, default=all_processes, key="trend_processes")
+trend_df = trend_df[trend_df["공정"].isin(selected_processes)]
+if trend_df.empty:
+    st.info("공정을 하나 이상 선택해 주세요.")
+    st.stop()
+
+st.caption(f"rollup {len(rollup_rows):,}행 / 평가 {int(trend_df['평가 건수'].sum()):,}건 집계, 조회 {load_ms:.1f} ms")
+st.markdown("---")
+
+# --- 1. 선행/후행 점수 추이 ---
+# 차트는 브라우저에서 그려지는 st.line_chart/st.area_chart를 사용 (수년치 일별 구간도 서버 렌더링 비용 없음)
+st.header("1. 공정별 선행/후행 점수 추이")
+col_leading, col_lagging = st.columns(2)
+with col_leading:
+    st.subheader(f"{period_label} 선행지표 평균 점수")
+    st.line_chart(trend_df.pivot_table(index="구간", columns="공정", values="선행 평균"), y_label="선행 점수")
+with col_lagging:
+    st.subheader(f"{period_label} 후행지표 평균 점수")
+    st.line_chart(trend_df.pivot_table(index="구간", columns="공정", values="후행 평균"), y_label="후행 점수")
+
+# --- 2. 선행 등급 분포 추이 ---
+st.header("2. 선행 위험 등급 분포 추이")
+grade_df = trend_df.groupby("구간")[[f"선행 {grade}" for grade in GRADES]].sum()
+grade_df.columns = list(GRADES)
+st.area_chart(grade_df, color=["#4caf50", "#8bc34a", "#ffc107", "#ff9800", "#f44336"], y_label="평가 건수")
+
+# --- 3. 집계 표 ---
+with st.expander("📋 구간별 집계 표"):
+    st.dataframe(
+        trend_df.assign(구간=trend_df["구간"].dt.strftime("%Y-%m-%d")).round({"선행 평균": 1, "후행 평균": 1}),
+        width="stretch", hide_index=True,
+    )
@@ -0,0 +1,34 @@
+"""배터리 공정 위험성 평가 엔진."""
+from .scoring import (
+    AUDIT_COMPLIANCE_OPTIONS,
+    EQUIP_BREAKDOWN_OPTIONS,
+    FINE_HISTORY_OPTIONS,
+    FIRE_FACILITY_OPTIONS,
+    GOVT_INTERVENTION_OPTIONS,
+    GRADES,
+    HIDDEN_REPORTS_OPTIONS,
+    JSA_DETAIL_COLUMNS,
+    LAGGING_FIELD_LABELS,
+    LAGGING_STATUSES,
+    LEADING_FIELD_LABELS,
+    MAJOR_INCIDENT_OPTIONS,
+    OVER_STORAGE_OPTIONS,
+    SAFETY_INSPECTION_OPTIONS,
+    SCHEME_ARICELL,
+    SCHEME_FS,
+    SCHEMES,
+    SPECIAL_EXTINGUISHER_OPTIONS,
+    TRAINING_ADEQUACY_OPTIONS,
+    WORKER_SKILL_OPTIONS,
+    Assessment,
+    AssessmentResult,
+    LaggingInputs,
+    LeadingInputs,
+    cache_clear,
+    cache_info,
+    evaluate,
+    get_lagging_status_and_score,
+    get_risk_level,
+    get_rules,
+    score_to_grade,
+)
@@ -0,0 +1,209 @@
+"""NumPy 일괄 평가기: N건의 평가를 한 번의 벡터 연산으로 계산합니다.
+
+입력은 정수 행렬로 인코딩합니다. 1~5 슬라이더는 값 그대로, 범주형 항목은 선택지 순서(코드)로 저장합니다.
+점수표는 scoring.py가 규칙 파일에서 컴파일한 것과 같은 표를 NumPy 배열로 옮겨 쓰므로,
+스칼라 평가(evaluate)와 항상 같은 점수를 내고 규칙 파일이 바뀌면 함께 교체됩니다.
+"""
+from dataclasses import dataclass, fields
+from functools import lru_cache
+
+import numpy as np
+
+from .scoring import (
+    CATEGORY_OPTIONS,
+    GRADES,
+    LAGGING_CATEGORY_FIELDS,
+    LAGGING_FIELDS,
+    LAGGING_LABELS,
+    LEADING_DOMAINS,
+    LEADING_FIELDS,
+    SCHEME_FS,
+    LaggingInputs,
+    LeadingInputs,
+    get_rules,
+)
+
+LEADING_DEFAULTS = {f.name: f.default for f in fields(LeadingInputs) if f.name in LEADING_FIELDS}
+LAGGING_DEFAULTS = {f.name: f.default for f in fields(LaggingInputs)}
+
+_LEADING_ROWS = np.arange(len(LEADING_FIELDS))
+_LAGGING_CATEGORY_IDX = np.array([LAGGING_FIELDS.index(name) for name in LAGGING_CATEGORY_FIELDS])
+_LAGGING_ROWS = np.arange(len(LAGGING_CATEGORY_FIELDS))
+_FATALITIES = LAGGING_FIELDS.index("past_fatalities_count")
+_INJURIES = LAGGING_FIELDS.index("past_injuries_count")
+_MAJOR = LAGGING_FIELDS.index("has_major_incident")
+_HUMAN_COLUMNS = {"past_fatalities_count": _FATALITIES, "past_injuries_count": _INJURIES}
+
+
+# --- 컴파일된 규칙 → NumPy 점수표 (규칙 객체별로 한 번만 변환) ---
+@dataclass(frozen=True)
+class _SchemeArrays:
+    leading_lut: np.ndarray # (항목 x 코드)
+    lagging_lut: np.ndarray
+    leading_edges: np.ndarray
+    leading_side: str
+    lagging_edges: np.ndarray
+    lagging_side: str
+
+
+@lru_cache(maxsize=8)
+def _scheme_arrays(rules, scheme):
+    sr = rules.schemes[scheme]
+    return _SchemeArrays(
+        np.array(sr.leading_lut, dtype=np.int32),
+        np.array(sr.lagging_lut, dtype=np.int64),
+        np.array(sr.leading_edges), "left" if sr.leading_edge_in_lower else "right",
+        np.array(sr.lagging_edges), "left" if sr.lagging_edge_in_lower else "right",
+    )
+
+
+def leading_lut(scheme=SCHEME_FS, rules=None):
+    """현재 규칙의 선행지표 점수표 (LEADING_FIELDS 행 x 코드 열)."""
+    return _scheme_arrays(rules or get_rules(), scheme).leading_lut
+
+
+# --- 인코딩 ---
+def encode_column(name, values, n):
+    if np.isscalar(values):
+        return np.full(n, encode_column(name, [values], 1)[0], dtype=np.int64)
+    arr = np.asarray(values)
+    options = CATEGORY_OPTIONS.get(name)
+    if options is None:
+        # 소수 / nan / inf는 잘라서 정수로 만들지 않고 거부
+        if arr.dtype.kind == "f" and not (np.isfinite(arr) & (arr == np.trunc(arr))).all():
+            raise ValueError(f"{name}: 정수가 필요합니다")
+        try:
+            return arr.astype(np.int64, copy=False)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f"{name}: 정수가 필요합니다") from None
+    uniq, inverse = np.unique(arr.astype(str), return_inverse=True)
+    try:
+        codes = np.array([options.index(u) for u in uniq], dtype=np.int64)
+    except ValueError:
+        unknown = sorted(set(uniq) - set(options))
+        raise ValueError(f"{name}: 알 수 없는 선택지 {unknown}") from None
+    return codes[inverse.reshape(-1)]
+
+
+def _encode(columns, names, defaults):
+    # 범위 검사는 int64로 한 뒤 호출하는 쪽에서 좁은 정수형으로 바꿈 (int8에 바로 쓰면 261 → 5처럼 넘쳐서 검사를 통과)
+    n = next((len(v) for v in columns.values() if not np.isscalar(v) and v is not None), 1)
+    out = np.empty((n, len(names)), dtype=np.int64)
+    for j, name in enumerate(names):
+        out[:, j] = encode_column(name, columns.get(name, defaults[name]), n)
+    return out
+
+
+def encode_leading(columns):
+    """열 이름 → 값 배열(또는 스칼라) 매핑을 (N, len(LEADING_FIELDS)) int8 행렬로 변환합니다."""
+    X = _encode(columns, LEADING_FIELDS, LEADING_DEFAULTS)
+    lo = np.array([LEADING_DOMAINS[name][0] for name in LEADING_FIELDS])
+    hi = np.array([LEADING_DOMAINS[name][1] for name in LEADING_FIELDS])
+    bad = (X < lo) | (X > hi)
+    if bad.any():
+        j = int(np.nonzero(bad.any(axis=0))[0][0])
+        raise ValueError(f"{LEADING_FIELDS[j]}: 허용 범위 {LEADING_DOMAINS[LEADING_FIELDS[j]]} 밖의 값")
+    return X.astype(np.int8)
+
+
+def encode_lagging(columns):
+    """열 이름 → 값 배열(또는 스칼라) 매핑을 (N, len(LAGGING_FIELDS)) int32 행렬로 변환합니다."""
+    L = _encode(columns, LAGGING_FIELDS, LAGGING_DEFAULTS)
+    counts = L[:, [_FATALITIES, _INJURIES]]
+    if (counts < 0).any():
+        raise ValueError("사망자/부상자 수는 0 이상이어야 합니다.")
+    if (counts > np.iinfo(np.int32).max).any():
+        raise ValueError("사망자/부상자 수가 너무 큽니다.")
+    return L.astype(np.int32)
+
+
+def encode_assessments(assessments):
+    """Assessment 목록을 (선행 행렬, 후행 행렬, F 행렬, S 행렬)로 변환합니다. F/S는 요인 수가 적은 행을 0으로 채웁니다."""
+    leading = {name: [getattr(a.leading, name) for a in assessments] for name in LEADING_FIELDS}
+    lagging = {name: [getattr(a.lagging, name) for a in assessments] for name in LAGGING_FIELDS}
+    k = max((len(a.leading.jsa_factors) for a in assessments), default=0)
+    freq = np.zeros((len(assessments), k), dtype=np.int8)
+    sev = np.zeros((len(assessments), k), dtype=np.int8)
+    for i, a in enumerate(assessments):
+        for j, (_, _, f, s) in enumerate(a.leading.jsa_factors):
+            freq[i, j], sev[i, j] = f, s
+    return encode_leading(leading), encode_lagging(lagging), freq, sev
+
+
+# --- 점수 계산 커널 ---
+def management_scores(X, scheme=SCHEME_FS, rules=None):
+    return leading_lut(scheme, rules)[_LEADING_ROWS, X].sum(axis=1)
+
+
+def jsa_totals(freq, sev):
+    if freq is None or freq.size == 0:
+        return np.zeros(len(freq) if freq is not None else 0, dtype=np.int32)
+    return (freq.astype(np.int32) * sev).sum(axis=1)
+
+
+def lagging_scores(L, scheme, rules=None):
+    rules = rules or get_rules()
+    sr = rules.schemes[scheme]
+    codes = L[:, _LAGGING_CATEGORY_IDX]
+    score = _scheme_arrays(rules, scheme).lagging_lut[_LAGGING_ROWS, codes].sum(axis=1)
+    fat, inj = L[:, _FATALITIES].astype(np.int64), L[:, _INJURIES].astype(np.int64)
+    if sr.per_fatality or sr.per_injury:
+        score = score + fat * sr.per_fatality + inj * sr.per_injury
+    if sr.human_tiers:
+        human = np.select(
+            [L[:, _HUMAN_COLUMNS[field]] >= minimum for field, minimum, _ in sr.human_tiers],
+            [points for _, _, points in sr.human_tiers], default=0,
+        )
+        score = score + (np.where(L[:, _MAJOR] == 1, human, 0) if sr.tiers_require_major_incident else human)
+    return score
+
+
+def leading_grade_codes(scores, scheme, rules=None):
+    arrays = _scheme_arrays(rules or get_rules(), scheme)
+    return np.searchsorted(arrays.leading_edges, scores, side=arrays.leading_side).astype(np.int8)
+
+
+def lagging_grade_codes(scores, scheme, rules=None):
+    arrays = _scheme_arrays(rules or get_rules(), scheme)
+    return np.searchsorted(arrays.lagging_edges, scores, side=arrays.lagging_side).astype(np.int8)
+
+
+def leading_labels(codes):
+    return np.asarray(GRADES, dtype=object)[codes]
+
+
+def lagging_labels(codes, scheme):
+    return np.asarray(LAGGING_LABELS[scheme], dtype=object)[codes]
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    leading_score: np.ndarray
+    leading_grade: np.ndarray # GRADES 인덱스
+    jsa_total: np.ndarray
+    management_score: np.ndarray
+    lagging_score: np.ndarray
+    lagging_grade: np.ndarray # "aricell": GRADES 인덱스 / "fs": LAGGING_STATUSES 인덱스
+
+
+def score_batch(X, L=None, freq=None, sev=None, scheme=SCHEME_FS, rules=None):
+    rules = rules or get_rules() # 배치 전체에 같은 규칙 적용
+    mgmt = management_scores(X, scheme, rules)
+    jsa = jsa_totals(freq, sev) if freq is not None else np.zeros(len(X), dtype=mgmt.dtype)
+    leading = mgmt + jsa
+    if L is None:
+        lag = np.zeros(len(X), dtype=np.int64)
+    else:
+        lag = lagging_scores(L, scheme, rules)
+    return BatchResult(
+        leading, leading_grade_codes(leading, scheme, rules), jsa, mgmt,
+        lag, lagging_grade_codes(lag, scheme, rules),
+    )
+
+
+def score_assessments(assessments, rules=None):
+    """Assessment 목록(같은 방식)을 한 번의 벡터 연산으로 평가합니다. 여러 공정 비교 화면용."""
+    if not assessments:
+        raise ValueError("평가할 Assessment가 없습니다.")
+    X, L, freq, sev = encode_assessments(assessments)
+    return score_batch(X, L, freq, sev, assessments[0].scheme, rules)
@@ -0,0 +1,106 @@
+"""공정 카탈로그(공정 설명 / 공정별 위험요인)와 세션별 F/S 입력 보관.
+
+카탈로그는 바뀌지 않는 정적 자료이므로 모듈 상수(읽기 전용 매핑 + frozen 레코드)로 두어 프로세스당 한 벌만 만들고
+모든 세션이 같은 객체를 참조합니다. 페이지 스크립트 안에 dict로 두면 재실행마다 새로 만들어지고,
+fragment 함수가 잡고 있는 스크립트 전역을 통해 세션마다 한 벌씩 남습니다.
+세션별 F/S 입력은 1~5 정수뿐이므로 FSGrid가 (공정 x 위험요인 x [F, S]) 바이트 배열 하나에 보관합니다.
+"""
+from dataclasses import dataclass
+from types import MappingProxyType
+
+
+@dataclass(frozen=True, slots=True)
+class RiskFactor:
+    name: str
+    type: str
+
+
+@dataclass(frozen=True, slots=True)
+class ProcessInfo:
+    desc: str
+    risk_factors: tuple # RiskFactor, 화면/평가 순서
+
+
+def _process(desc, *factors):
+    return ProcessInfo(desc, tuple(RiskFactor(name, kind) for name, kind in factors))
+
+
+# --- "risk final.py": 배터리 제조 4대 핵심 공정별 위험요인 (F/S 직접 입력) ---
+FS_PROCESS_CATALOG = MappingProxyType({
+    "전극 공정": _process(
+        "양극/음극 활물질을 바인더와 섞어 슬러리를 만들고, 코팅, 건조, 프레스, 슬리팅하는 공정. (화학물질 취급, 분진, 화재/폭발, 기계적 위험)",
+        ("화학물질(슬러리, 유기용제) 누출/흡입", "화학물질"),
+        ("분진 발생 및 관리", "환경/호흡기"),
+        ("고온 건조 설비 이상 및 발열", "설비/열상"),
+        ("프레스/슬리터 등 기계적 끼임/절단", "기계"),
+        ("방폭 및 환기 설비 미흡", "설비/화재"),
+    ),
+    "조립 공정": _process(
+        "전극을 감거나 쌓아 젤리롤/스택을 만들고, 케이스에 넣고 전해액 주입 후 밀봉하는 공정. (화학물질, 질식, 기계적, 열적 위험)",
+        ("전해액 주입 중 유출/흡입", "화학물질"),
+        ("전해액/밀봉 관련 화재/폭발", "화재/화학"),
+        ("권취/스태킹 장비 기계적 끼임", "기계"),
+        ("비활성 가스(아르곤 등) 질식", "화학물질/환경"),
+        ("용접/봉합 스파크 및 열적 위험", "열"),
+    ),
+    "활성화 공정": _process(
+        "조립된 배터리에 초기 충방전을 통해 활물질을 활성화하고 품질 검사. (열폭주, 가스 발생, 전기적 위험)",
+        ("불량 셀 열폭주/발화", "열/화재"), # 아리셀 사고와 직결
+        ("셀 내부 가스 발생 및 폭발", "폭발"),
+        ("초기 전해액 누출 및 흡입", "화학물질"),
+        ("충방전 설비의 전기적 위험", "전기"),
+        ("과열 모니터링 및 진화 시스템 미흡", "안전시스템"),
+    ),
+    "팩 공정": _process(
+        "여러 개의 셀을 모듈/팩으로 조립하고 배선, 보호회로 연결, 최종 검사 및 포장. (전기적, 물리적, 열적 위험)",
+        ("고전압 배선 및 조립 중 감전", "전기"),
+        ("셀/모듈 운반/적재 중 낙하/충격", "물리"),
+        ("조립/용접 스파크 및 화재", "열/화재"),
+        ("불량 팩 발화/폭발 (최종 검사)", "열/폭발"),
+        ("포장/운반 자동화 설비 기계적 위험", "기계"),
+    ),
+})
+
+# --- riskkk.py: 배터리 제조 공정 단계 → 설명 (아리셀 교훈) ---
+ARICELL_PROCESS_STEPS = MappingProxyType({
+    "양극 혼합 및 코팅": "배터리 재료(화학물질)를 혼합하고 전극에 코팅하는 단계. 화학물질 취급, 분진, 슬러리, 화재/폭발 위험이 있습니다.",
+    "프레스 및 슬리팅": "코팅된 전극을 압착하여 밀도를 높이고(프레스) 폭에 맞춰 자르는(슬리팅) 단계. 기계적 끼임, 절단, 그리고 불량 제품(배터리)으로 인한 발열, 화재/폭발 위험이 내재되어 있습니다. 특히 이 공정은 **아리셀 배터리 공장 화재·폭발 사고가 발생한 핵심 '사고 발생 위치'**입니다.",
+    "셀 조립 및 전해액 주입": "양극, 음극, 분리막을 조립하고(권취, 스태킹) 배터리 핵심 물질인 전해액을 주입하는 단계. 화학물질 유출, 중독, 질식, 화재 위험이 높습니다.",
+    "밀봉 및 활성화": "전해액이 주입된 셀을 외부와 완벽히 차단하고(밀봉) 초기 충방전을 통해 셀의 성능을 깨우는(활성화) 단계. 밀봉 불량, 폭발(불량 셀), 화재, 과열 위험이 내재되어 있습니다.",
+    "충방전 테스트": "완성된 셀, 모듈, 팩의 성능을 검사하기 위해 반복적인 충방전을 수행하는 단계. 과열, 발화, 폭발, 전기적 위험이 높습니다.",
+    "모듈/팩 조립 및 최종 검사": "개별 셀들을 모듈 또는 팩 형태로 연결하고(배선, 용접) 최종 성능을 검사 후 포장하는 단계. 기계적 손상, 감전, 단락, 화재 위험이 내재되어 있습니다.",
+})
+
+
+# --- 세션별 공정 F/S 입력 ---
+@dataclass(slots=True)
+class FSGrid:
+    """카탈로그 전체 공정의 위험요인별 (F, S)를 바이트 배열 하나에 보관합니다 (4공정 x 5요인이면 40바이트).
+    공정별 리스트/튜플/딕셔너리 대신 세션 상태에 두는 압축 레코드이며, 공정/요인 객체는 카탈로그 것을 공유합니다."""
+    processes: tuple # 공정 이름, 카탈로그 순서
+    factors: tuple # 공정별 RiskFactor 튜플
+    width: int # 공정당 최대 위험요인 수
+    values: bytearray # [공정 순번][요인 순번][F, S]
+
+    @classmethod
+    def new(cls, catalog, default=(3, 3)):
+        factors = tuple(info.risk_factors for info in catalog.values())
+        width = max(map(len, factors))
+        return cls(tuple(catalog), factors, width, bytearray(default) * (len(catalog) * width))
+
+    def _offset(self, process, i=0):
+        return (self.processes.index(process) * self.width + i) * 2
+
+    def get(self, process, i):
+        j = self._offset(process, i)
+        return self.values[j], self.values[j + 1]
+
+    def set(self, process, i, freq, sev):
+        j = self._offset(process, i)
+        self.values[j:j + 2] = bytes((freq, sev))
+
+    def jsa_factors(self, process):
+        """LeadingInputs.jsa_factors 형식 ((이름, 유형, F, S), ...)."""
+        j = self._offset(process)
+        fs = self.values[j:j + 2 * self.width]
+        return tuple((f.name, f.type, fs[2 * i], fs[2 * i + 1]) for i, f in enumerate(self.factors[self.processes.index(process)]))
@@ -0,0 +1,318 @@
+"""페이지 차트 렌더링과 렌더 결과 캐시.
+
+pyplot(plt.subplots)은 만든 그림을 전역 레지스트리에 보관하므로 닫지 않으면 세션이 늘수록 서버 메모리가 계속 늘어납니다.
+여기서는 matplotlib.figure.Figure를 직접 만들어(pyplot 전역 상태 없음) PNG/SVG 바이트로 저장한 즉시 비우고,
+결과 바이트를 (차트 종류, 점수, 등급, 공정 ...) 키로 프로세스 전체에서 공유하는 LRU 캐시에 둡니다.
+캐시는 항목 수가 아니라 바이트 합계로 상한을 두며, 넘으면 가장 오래 쓰지 않은 차트부터 버립니다.
+저장 옵션은 st.pyplot 기본값(dpi 200, bbox_inches="tight")과 같으므로 st.image(..., width="stretch")로 같은 모양이 나옵니다.
+
+matplotlib은 처음 차트를 그릴 때 import합니다(이 모듈을 import해도 불러오지 않음). 처음 그리기 전에 warm_up()이
+글꼴 캐시를 만들거나 읽고 한글 글꼴을 골라 rcParams에 지정합니다. 페이지는 start_warm_up()으로 이를 백그라운드에서
+미리 시작하고, 컨테이너 이미지는 빌드 단계에서 `python -m risk_engine --warm-up`으로 글꼴 캐시를 만들어 둘 수 있습니다.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from .scoring import GRADES
+
+DEFAULT_MAX_BYTES = int(float(os.environ.get("RISK_CHART_CACHE_MB", "32")) * 1024 * 1024)
+SAVEFIG_OPTIONS = {"dpi": 200, "bbox_inches": "tight"}
+FORMATS = ("png", "svg")
+
+# 선행 등급 / 후행 등급 (아리셀 방식) / 후행 위험 상태 (F/S 방식) 막대 색
+BAR_COLORS = {
+    '매우 낮음': 'lightgreen', '낮음': 'skyblue', '보통': 'lightyellow', '높음': 'salmon', '매우 높음': 'red',
+    '주목할 문제 없음': 'forestgreen', '경고 필요 (Warning Required)': 'orange', '주요 시스템 부실 (Major System Failure)': 'darkorange',
+    '심각한 결함 이력 (Critical Failure History)': 'darkred', '주요 인명 피해': 'darkred', '클린 레코드': 'darkgreen',
+}
+# 먼저 찾은 글꼴을 씁니다. RISK_CHART_FONT로 직접 지정할 수 있습니다.
+KOREAN_FONT_CANDIDATES = (
+    "Malgun Gothic", "AppleGothic", "Apple SD Gothic Neo", "NanumGothic", "NanumBarunGothic",
+    "Noto Sans CJK KR", "Noto Sans KR", "Source Han Sans KR", "UnDotum", "Baekmuk Gulim",
+)
+ARICELL_NOTES = (
+    ("- 사고 전 화재 은폐 의혹", 0.88), ("- 안전점검 체계의 허점", 0.81), ("- 특수 소화기 부재", 0.74),
+    ("- 위험물질 초과 보관", 0.67), ("- 안전교육/인력관리 부실", 0.60),
+)
+
+
+class ChartCache:
+    """렌더링된 차트 바이트의 LRU 캐시 (바이트 합계 상한). 여러 세션 스레드에서 동시에 써도 안전합니다."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_render(self, key, render):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+        data = render() # 렌더링은 잠금 밖에서 (같은 키를 두 세션이 동시에 그리면 한 번 더 그릴 뿐 결과는 같음)
+        if len(data) > self.max_bytes:
+            return data
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = data
+                self._bytes += len(data)
+                while self._bytes > self.max_bytes:
+                    _, old = self._items.popitem(last=False)
+                    self._bytes -= len(old)
+                    self.evictions += 1
+        return data
+
+    def info(self):
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+
+CACHE = ChartCache()
+
+
+class ChartStore:
+    """내용 주소 방식의 디스크 차트 캐시: (차트 종류, 형식, 인자, 글꼴)의 해시를 파일 이름으로 씁니다.
+    보고서 작업자 프로세스처럼 메모리 캐시를 공유하지 못하는 곳에서 같은 차트를 한 번만 그리도록 합니다.
+    파일은 임시 이름으로 쓴 뒤 교체하므로 여러 프로세스가 같은 키를 동시에 그려도 깨진 파일을 읽지 않습니다."""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        digest = hashlib.sha256(repr((key, korean_font())).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, digest[:2], f"{digest}.{key[1]}")
+
+    def get_or_render(self, key, render):
+        """key는 (차트 종류, 형식, 인자...) 튜플. 캐시에 없으면 render()의 바이트를 저장하고 반환합니다."""
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            self.hits += 1
+            return data
+        except FileNotFoundError:
+            pass
+        self.misses += 1
+        data = render()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return data
+
+
+# --- matplotlib 지연 import / 글꼴 워밍업 ---
+_warm_lock = threading.Lock() # warm_up() 실행 중에는 차트 그리기가 이 잠금에서 기다림
+_start_lock = threading.Lock()
+_warm_state = {"done": False, "font": None, "thread": None}
+
+
+def warm_up():
+    """matplotlib을 불러오고 글꼴 캐시를 만들거나 읽은 뒤 한글 글꼴을 골라 rcParams에 지정합니다.
+    프로세스당 한 번만 실행되며(이후 호출은 바로 반환) 고른 글꼴 이름을, 한글 글꼴이 없으면 None을 반환합니다."""
+    with _warm_lock:
+        if _warm_state["done"]:
+            return _warm_state["font"]
+        import matplotlib
+        from matplotlib import font_manager
+
+        available = {f.name for f in font_manager.fontManager.ttflist} # 처음 접근할 때 글꼴 캐시 생성/로드
+        wanted = os.environ.get("RISK_CHART_FONT")
+        candidates = (wanted,) + KOREAN_FONT_CANDIDATES if wanted else KOREAN_FONT_CANDIDATES
+        font = next((name for name in candidates if name in available), None)
+        if font is not None:
+            matplotlib.rcParams["font.family"] = "sans-serif"
+            matplotlib.rcParams["font.sans-serif"] = [font, *matplotlib.rcParams["font.sans-serif"]]
+            matplotlib.rcParams["axes.unicode_minus"] = False # 한글 글꼴 대부분은 유니코드 마이너스 글리프가 없음
+        fig = _figure((1, 1), warm=False) # 글꼴 파일 읽기 / Agg 렌더러 초기화까지 미리
+        fig.text(0.5, 0.5, "위험도 -1" if font else "-1")
+        _to_bytes(fig, "png")
+        _warm_state.update(done=True, font=font)
+        return font
+
+
+def start_warm_up():
+    """warm_up()을 백그라운드 스레드에서 한 번 시작합니다. 그 사이 차트를 그리려는 세션은 워밍업이 끝날 때까지 기다립니다."""
+    with _start_lock:
+        if _warm_state["done"] or _warm_state["thread"] is not None:
+            return
+        thread = _warm_state["thread"] = threading.Thread(target=warm_up, name="chart-warm-up", daemon=True)
+    thread.start()
+
+
+def korean_font():
+    """warm_up()에서 고른 한글 글꼴 이름 (워밍업 전이거나 한글 글꼴이 없으면 None)."""
+    return _warm_state["font"]
+
+
+def _figure(figsize=None, warm=True):
+    if warm:
+        warm_up()
+    from matplotlib.figure import Figure
+    return Figure(figsize=figsize)
+
+
+def _to_bytes(fig, fmt):
+    """그림을 바이트로 저장하고 즉시 비웁니다. Figure는 pyplot에 등록되지 않았으므로 참조가 끊기면 바로 해제됩니다."""
+    if fmt not in FORMATS:
+        raise ValueError(f"지원하지 않는 형식: {fmt!r} (가능: {FORMATS})")
+    buf = io.BytesIO()
+    try:
+        fig.savefig(buf, format=fmt, **SAVEFIG_OPTIONS)
+    finally:
+        fig.clear()
+    return buf.getvalue()
+
+
+def _cached(kind, build, args, fmt):
+    return CACHE.get_or_render((kind, fmt) + args, lambda: _to_bytes(build(*args), fmt))
+
+
+# --- 7. 선행 vs. 후행 비교 막대 ---
+def _comparison_figure(title, leading_score, leading_label, lagging_score, lagging_label, annotate):
+    fig = _figure((7, 4))
+    ax = fig.subplots()
+    bars = ax.bar(["선행지표", "후행지표"], [leading_score, lagging_score],
+                  color=[BAR_COLORS.get(leading_label, 'gray'), BAR_COLORS.get(lagging_label, 'gray')])
+    ax.set_ylim(0, max(leading_score, lagging_score) + 40) # y축 여유 공간 확보
+    ax.set_ylabel("위험도 점수 (내부 계산)")
+    ax.set_title(title)
+    for bar, text_display in zip(bars, [leading_label, lagging_label]):
+        yval = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2, yval + 1, f"{text_display}\n({yval:.0f}점)", ha='center', va='bottom', fontsize=10, weight='bold')
+    if annotate: # 아리셀 사고 부실 사례를 그래프 옆에 주석으로 표시
+        ax.text(1.05, 0.95, "⚠️ **아리셀 사고와 같은 과거 문제점**", transform=ax.transAxes, fontsize=10, verticalalignment='top', bbox=dict(boxstyle='round,pad=0.5', fc='lightcoral', ec='firebrick', lw=1, alpha=0.5))
+        for note, y in ARICELL_NOTES:
+            ax.text(1.05, y, note, transform=ax.transAxes, fontsize=8, verticalalignment='top')
+        ax.text(1.05, 0.53, "➡ **후행지표가 이를 강력히 경고!**", transform=ax.transAxes, fontsize=9, verticalalignment='top', color='red')
+        fig.tight_layout() # 그래프와 주석 겹치지 않게 레이아웃 조정
+    return fig
+
+
+def comparison_chart(title, leading_score, leading_label, lagging_score, lagging_label, annotate=False, fmt="png"):
+    return _cached("comparison", _comparison_figure, (title, leading_score, leading_label, lagging_score, lagging_label, bool(annotate)), fmt)
+
+
+# --- 8. 감소 대책 전/후 막대 ---
+def _simulation_figure(title, before, after):
+    fig = _figure()
+    ax = fig.subplots()
+    ax.bar(["현재 총 선행 위험도", "감소 후 예상 선행 위험도"], [before, after], color=["salmon", "lightgreen"])
+    ax.set_ylim(0, max(before, after) + 20)
+    ax.set_ylabel("총 위험도 점수")
+    ax.set_title(title)
+    for bar in ax.patches:
+        yval = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2, yval + 1, f"{yval:.2f}", ha='center', va='bottom')
+    return fig
+
+
+def simulation_chart(title, before, after, fmt="png"):
+    return _cached("simulation", _simulation_figure, (title, before, after), fmt)
+
+
+# --- 전체 공정 비교 누적 막대 ---
+def _all_process_figure(processes, management_scores, jsa_totals, leading_scores, leading_grades, edges):
+    fig = _figure((7, 4))
+    ax = fig.subplots()
+    ax.bar(processes, management_scores, color='lightgray', edgecolor='gray', label='관리 수준 점수 (전사 공통)')
+    ax.bar(processes, jsa_totals, bottom=management_scores,
+           color=[BAR_COLORS[g] for g in leading_grades], edgecolor='gray', label='공정 위험요인 합계 (F*S)')
+    for edge, grade in zip(edges, GRADES[1:]):
+        ax.axhline(edge, color='gray', linestyle=':', linewidth=0.8)
+        ax.text(len(processes) - 0.5, edge, f" {grade}", va='bottom', ha='right', fontsize=8, color='gray')
+    for x, (score, grade) in enumerate(zip(leading_scores, leading_grades)):
+        ax.text(x, score + 2, f"{grade}\n({score}점)", ha='center', va='bottom', fontsize=9, weight='bold')
+    ax.set_ylabel("선행지표 총점")
+    ax.set_ylim(0, max(max(leading_scores), edges[-1]) * 1.2)
+    ax.legend(loc='upper left', fontsize=8)
+    return fig
+
+
+def all_process_chart(processes, management_scores, jsa_totals, leading_scores, leading_grades, edges, fmt="png"):
+    args = tuple(map(tuple, (processes, management_scores, jsa_totals, leading_scores, leading_grades, edges)))
+    return _cached("all_process", _all_process_figure, args, fmt)
+
+
+# --- 민감도: 2변수 격자 (등급 색 + 등급 경계선) ---
+def _sensitivity_figure(title, x_label, x_ticks, y_label, y_ticks, scores, grades, current):
+    from matplotlib.colors import ListedColormap
+    from matplotlib.patches import Patch, Rectangle
+
+    rows, cols = len(y_ticks), len(x_ticks)
+    fig = _figure((7, 1.6 + 0.55 * rows))
+    ax = fig.subplots()
+    ax.imshow(grades, cmap=ListedColormap([BAR_COLORS[g] for g in GRADES]), vmin=-0.5, vmax=len(GRADES) - 0.5, aspect='auto', origin='lower')
+    for i in range(rows):
+        for j in range(cols):
+            ax.text(j, i, f"{scores[i][j]}", ha='center', va='center', fontsize=8)
+    # 등급 경계: 이웃한 두 칸의 등급이 다르면 그 사이에 굵은 선 (격자가 정수라 보간 없이 정확한 경계)
+    for i in range(rows):
+        for j in range(cols):
+            if j + 1 < cols and grades[i][j] != grades[i][j + 1]:
+                ax.plot([j + 0.5, j + 0.5], [i - 0.5, i + 0.5], color='black', linewidth=2)
+            if i + 1 < rows and grades[i][j] != grades[i + 1][j]:
+                ax.plot([j - 0.5, j + 0.5], [i + 0.5, i + 0.5], color='black', linewidth=2)
+    cy, cx = current
+    ax.add_patch(Rectangle((cx - 0.5, cy - 0.5), 1, 1, fill=False, edgecolor='blue', linewidth=2.5))
+    ax.set_xticks(range(cols), [str(t) for t in x_ticks], rotation=20 if max(len(str(t)) for t in x_ticks) > 4 else 0, fontsize=8)
+    ax.set_yticks(range(rows), [str(t) for t in y_ticks], fontsize=8)
+    ax.set_xlabel(x_label)
+    ax.set_ylabel(y_label)
+    ax.set_title(title)
+    shown = sorted({g for row in grades for g in row})
+    ax.legend(handles=[Patch(color=BAR_COLORS[GRADES[g]], label=GRADES[g]) for g in shown],
+              loc='upper left', bbox_to_anchor=(1.01, 1), fontsize=8, title="선행 등급", title_fontsize=8)
+    return fig
+
+
+def sensitivity_chart(title, x_label, x_ticks, y_label, y_ticks, scores, grades, current, fmt="png"):
+    """scores / grades: (y 값 수 x x 값 수) 격자 (grades는 GRADES 인덱스), current: 현재 입력 칸 (행, 열)."""
+    args = (title, x_label, tuple(x_ticks), y_label, tuple(y_ticks),
+            tuple(map(tuple, scores)), tuple(map(tuple, grades)), tuple(current))
+    return _cached("sensitivity", _sensitivity_figure, args, fmt)
+
+
+# --- 민감도: 1변수 tornado ---
+def _tornado_figure(title, labels, lows, highs, current, edges):
+    fig = _figure((7, 1.2 + 0.28 * len(labels)))
+    ax = fig.subplots()
+    y = range(len(labels))
+    ax.barh(y, [high - current for high in highs], left=current, color='salmon', label='위험 증가 쪽 (최고 점수)')
+    ax.barh(y, [low - current for low in lows], left=current, color='skyblue', label='위험 감소 쪽 (최저 점수)')
+    ax.axvline(current, color='black', linewidth=1)
+    lo, hi = min(lows), max(highs)
+    for edge, grade in zip(edges, GRADES[1:]):
+        if lo <= edge <= hi:
+            ax.axvline(edge, color='gray', linestyle=':', linewidth=0.8)
+            ax.text(edge, -0.9, f" {grade}", ha='left', va='bottom', fontsize=8, color='gray')
+    ax.set_yticks(y, labels, fontsize=8)
+    ax.invert_yaxis() # 변화 폭이 큰 입력이 위로
+    ax.set_xlabel(f"선행지표 총점 (현재 {current}점)")
+    ax.set_title(title)
+    ax.legend(loc='best', fontsize=8)
+    return fig
+
+
+def tornado_chart(title, labels, lows, highs, current, edges, fmt="png"):
+    return _cached("tornado", _tornado_figure, (title, tuple(labels), tuple(lows), tuple(highs), current, tuple(edges)), fmt)
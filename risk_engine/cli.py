@@ -0,0 +1,69 @@
+"""헤드리스 평가 CLI: JSONL 평가 레코드를 읽어 점수/등급을 JSONL로 출력합니다.
+
+    python -m risk_engine assessments.jsonl > scores.jsonl
+    cat assessments.jsonl | python -m risk_engine --scheme aricell
+    python -m risk_engine --warm-up # 컨테이너 빌드 단계: matplotlib 글꼴 캐시 생성 + 한글 글꼴 확인
+
+streamlit/matplotlib/numpy를 import하지 않으므로 셸 파이프라인에서 바로 사용할 수 있습니다 (--warm-up 제외).
+"""
+import argparse
+import json
+import sys
+
+from .records import assessment_from_record, result_to_record
+from .scoring import SCHEME_FS, SCHEMES, evaluate
+
+PASSTHROUGH_KEYS = ("id", "site", "process")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m risk_engine", description="JSONL 평가 레코드의 선행/후행지표 점수와 등급을 계산합니다.")
+    parser.add_argument("input", nargs="?", default="-", help="입력 JSONL 파일 (기본: 표준입력)")
+    parser.add_argument("--scheme", choices=SCHEMES, default=SCHEME_FS, help="레코드에 scheme이 없을 때 사용할 평가 방식 (기본: fs)")
+    parser.add_argument("--details", action="store_true", help="공정 위험요인별 F*S 상세 포함")
+    parser.add_argument("--warm-up", action="store_true", help="차트 글꼴 캐시를 미리 만들고 사용할 한글 글꼴을 출력한 뒤 종료")
+    return parser
+
+
+def run(lines, out, err, scheme=SCHEME_FS, details=False):
+    failed = 0
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("JSON 객체가 아닙니다")
+            result = evaluate(assessment_from_record(record, scheme))
+        except ValueError as e: # json.JSONDecodeError 포함
+            failed += 1
+            err.write(f"{lineno}행: {e}\n")
+            continue
+        row = {key: record[key] for key in PASSTHROUGH_KEYS if key in record}
+        row.update(result_to_record(result, details))
+        out.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return failed
+
+
+def warm_up(out, err):
+    from .charts import warm_up as warm_up_charts
+
+    font = warm_up_charts()
+    if font is None:
+        err.write("한글 글꼴을 찾지 못했습니다. 차트의 한글이 깨질 수 있습니다 (RISK_CHART_FONT로 지정 가능).\n")
+        return 1
+    out.write(f"차트 글꼴: {font}\n")
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.warm_up:
+        return warm_up(sys.stdout, sys.stderr)
+    if args.input == "-":
+        failed = run(sys.stdin, sys.stdout, sys.stderr, args.scheme, args.details)
+    else:
+        with open(args.input, encoding="utf-8") as f:
+            failed = run(f, sys.stdout, sys.stderr, args.scheme, args.details)
+    return 1 if failed else 0
@@ -0,0 +1,137 @@
+"""선행지표 점수의 항목별 기여 벡터: 입력 하나가 바뀌면 그 항목의 기여만 고쳐 총점을 O(1)로 갱신합니다.
+
+선행 총점은 항목별로 독립인 기여의 합입니다: 전사 관리 항목 22개(규칙 파일의 점수표 값) + 공정 위험요인별 F*S.
+LeadingContributions는 이 기여를 목록으로 들고 총점 / 관리 점수 / 위험요인 합계를 누적값으로 유지하므로
+- set(key, value): 항목 하나를 바꾸고 차이만큼 총점을 고침 (점수표 조회 1번)
+- update(assessment): 새 입력 레코드와 값이 다른 항목만 set() (페이지 재실행마다 세션에 둔 벡터를 갱신)
+- total_with({key: 기여}): 입력은 그대로 두고 일부 기여만 바꾼 가상 총점 (섹션 8 감소 대책 시뮬레이션)
+- margin(): 현재 등급에서 한 단계 좋은 / 나쁜 등급 경계까지 남은 점수
+항목 키는 LEADING_FIELDS 이름과 위험요인 i번째의 "jsa_i"(값은 (F, S))입니다. 총점은 항상 evaluate()의 leading_score와 같습니다.
+"""
+from dataclasses import dataclass
+
+from .scoring import GRADES, LEADING_FIELD_LABELS, LEADING_FIELDS, _grade_index, get_rules
+
+_N_FIELDS = len(LEADING_FIELDS)
+
+
+def jsa_key(i):
+    return f"jsa_{i}"
+
+
+@dataclass(frozen=True, slots=True)
+class Contribution:
+    key: str
+    label: str
+    value: object # 입력값 (위험요인은 (F, S))
+    points: int # 총점에 더해지는 점수
+    best: int # 이 항목만 바꿔서 낼 수 있는 가장 낮은 점수
+
+    @property
+    def reducible(self):
+        return self.points - self.best
+
+
+@dataclass(frozen=True, slots=True)
+class GradeMargin:
+    grade: str
+    better_grade: str # 한 단계 좋은 등급 (이미 가장 좋은 등급이면 None)
+    points_to_better: int # 그 등급이 되려면 줄여야 하는 점수
+    worse_grade: str # 한 단계 나쁜 등급 (이미 가장 나쁜 등급이면 None)
+    points_to_worse: int # 그 등급이 되는 데 더해져야 하는 점수
+
+
+class LeadingContributions:
+    def __init__(self, assessment, rules=None):
+        self._build(assessment, rules or get_rules())
+
+    def _build(self, assessment, rules):
+        sr = rules.schemes.get(assessment.scheme)
+        if sr is None:
+            raise ValueError(f"알 수 없는 평가 방식: {assessment.scheme!r}")
+        self.scheme, self.rules, self._sr = assessment.scheme, rules, sr
+        li = assessment.leading
+        factors = li.jsa_factors
+        self.keys = LEADING_FIELDS + tuple(jsa_key(i) for i in range(len(factors)))
+        self.labels = tuple(LEADING_FIELD_LABELS[name] for name in LEADING_FIELDS) + tuple(f"{name} (F*S)" for name, *_ in factors)
+        self._index = {key: j for j, key in enumerate(self.keys)}
+        self.values = [getattr(li, name) for name in LEADING_FIELDS] + [(freq, sev) for _, _, freq, sev in factors]
+        self.points = [self._points(j, value) for j, value in enumerate(self.values)]
+        self.management_score = sum(self.points[:_N_FIELDS])
+        self.jsa_total = sum(self.points[_N_FIELDS:])
+
+    def _points(self, j, value):
+        if j >= _N_FIELDS:
+            freq, sev = value
+            return freq * sev
+        try:
+            return self._sr.leading_points[j][value]
+        except (KeyError, TypeError):
+            raise ValueError(f"{LEADING_FIELDS[j]}: 허용되지 않는 값 {value!r}") from None
+
+    @property
+    def total(self):
+        return self.management_score + self.jsa_total
+
+    def set(self, key, value):
+        """key 항목의 입력을 value로 바꾸고 새 총점을 반환합니다. 위험요인 항목("jsa_i")의 value는 (F, S)."""
+        j = self._index[key]
+        new = self._points(j, value)
+        delta = new - self.points[j]
+        if j < _N_FIELDS:
+            self.management_score += delta
+        else:
+            self.jsa_total += delta
+        self.points[j], self.values[j] = new, value
+        return self.total
+
+    def update(self, assessment, rules=None):
+        """값이 달라진 항목만 set()으로 고치고 바뀐 항목 수를 반환합니다.
+        평가 방식 / 규칙 / 위험요인 수가 다르면 기여를 모두 새로 계산합니다 (반환값은 전체 항목 수)."""
+        rules = rules or get_rules()
+        li = assessment.leading
+        if assessment.scheme != self.scheme or rules is not self.rules or len(li.jsa_factors) != len(self.keys) - _N_FIELDS:
+            self._build(assessment, rules)
+            return len(self.keys)
+        changed = 0
+        for j, name in enumerate(LEADING_FIELDS):
+            value = getattr(li, name)
+            if value != self.values[j]:
+                self.set(name, value)
+                changed += 1
+        for i, (_, _, freq, sev) in enumerate(li.jsa_factors):
+            if (freq, sev) != self.values[_N_FIELDS + i]:
+                self.set(jsa_key(i), (freq, sev))
+                changed += 1
+        return changed
+
+    def total_with(self, overrides):
+        """입력은 그대로 두고 일부 항목의 기여만 {key: 점수}로 바꿨을 때의 총점."""
+        return self.total + sum(points - self.points[self._index[key]] for key, points in overrides.items())
+
+    def grade_of(self, score):
+        return GRADES[_grade_index(self._sr.leading_edges, self._sr.leading_edge_in_lower, score)]
+
+    @property
+    def grade(self):
+        return self.grade_of(self.total)
+
+    def margin(self, score=None):
+        """score(기본: 현재 총점)에서 한 단계 좋은 / 나쁜 등급 경계까지 남은 점수."""
+        score = self.total if score is None else score
+        edges, in_lower = self._sr.leading_edges, self._sr.leading_edge_in_lower
+        g = _grade_index(edges, in_lower, score)
+        # edge_in_lower: 등급 g는 edges[g-1] < 점수 <= edges[g], 아니면 edges[g-1] <= 점수 < edges[g]
+        better = (score - edges[g - 1] + (0 if in_lower else 1)) if g > 0 else None
+        worse = (edges[g] - score + (1 if in_lower else 0)) if g < len(edges) else None
+        return GradeMargin(
+            GRADES[g], GRADES[g - 1] if g > 0 else None, better, GRADES[g + 1] if g < len(edges) else None, worse,
+        )
+
+    def contributions(self):
+        """항목별 기여 (LEADING_FIELDS 순, 이어서 위험요인 순)."""
+        best = [min(table.values()) for table in self._sr.leading_points] + [1] * (len(self.keys) - _N_FIELDS) # F, S 최소 1
+        return tuple(
+            Contribution(key, label, value, points, low)
+            for key, label, value, points, low in zip(self.keys, self.labels, self.values, self.points, best)
+        )
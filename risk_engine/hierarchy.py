@@ -0,0 +1,399 @@
+"""사업장 계층 위험도 집계: 회사 → 공장 → 라인 → 공정.
+
+전사 관리 수준 입력(LEADING_FIELDS)은 회사(루트)에 두고, 공장 / 라인이 일부 항목을 재정의합니다. 공정(잎)은 카탈로그의
+위험요인별 F/S만 가지며, 잎의 선행 점수 = 소속 라인의 관리 점수(위쪽 재정의를 모두 반영한 입력) + F*S 합계입니다.
+노드마다 집계(공정 수, 점수 합계, 가장 위험한 공정, 등급별 공정 수)를 캐시해 두고 바뀐 곳에서 위로만 고칩니다.
+- 공정 F/S 변경: 그 공정의 점수를 다시 계산하고 조상(라인, 공장, 회사)의 집계를 차이만큼 고침.
+  가장 위험한 공정의 점수가 내려간 경우에만 해당 조상의 자식 집계를 다시 훑음 (자식 수만큼, 트리 전체는 보지 않음)
+- 공장 / 라인 재정의 변경: 그 노드 아래만 다시 계산하고 조상에는 차이를 반영
+- 회사 입력 변경: 모든 공정이 영향을 받으므로 전체를 다시 계산
+관리 점수는 재정의가 있는 노드에서만 계산하고, 재정의가 없는 노드는 부모의 입력과 점수를 그대로 씁니다.
+RiskTree.touched는 마지막 변경에서 다시 계산한 노드 수입니다.
+"""
+import itertools
+import random
+from dataclasses import dataclass, replace
+
+from .catalog import FS_PROCESS_CATALOG
+from .scoring import (
+    CATEGORY_OPTIONS,
+    GRADES,
+    LEADING_DOMAINS,
+    LEADING_FIELDS,
+    SCHEME_FS,
+    Assessment,
+    LeadingInputs,
+    _grade_index,
+    get_rules,
+    management_score,
+)
+
+LEVELS = ("회사", "공장", "라인", "공정")
+COMPANY, PLANT, LINE, PROCESS = range(len(LEVELS))
+FS_DEFAULT = 3
+# 노드 id는 프로세스 안에서 트리를 가리지 않고 유일 (트리를 새로 만들어도 화면 위젯 키가 예전 노드와 겹치지 않음)
+_node_ids = itertools.count()
+
+
+class Group:
+    """회사 / 공장 / 라인 노드. 재정의를 반영한 관리 입력과 아래 공정들의 집계를 캐시합니다."""
+    __slots__ = ("id", "name", "level", "parent", "children", "overrides", "inputs", "management",
+                 "count", "total", "worst", "worst_leaf", "grades")
+
+    def __init__(self, id, name, level, parent, overrides):
+        self.id, self.name, self.level, self.parent = id, name, level, parent
+        self.children = {} # 이름 → 노드 (추가 순서)
+        self.overrides = dict(overrides)
+        self.inputs = None # 재정의를 반영한 LeadingInputs (jsa_factors 없음)
+        self.management = 0
+        self._clear()
+
+    def _clear(self):
+        self.count = self.total = 0
+        self.worst, self.worst_leaf = None, None
+        self.grades = [0] * len(GRADES)
+
+
+class Leaf:
+    """공정 노드: 카탈로그 위험요인 순서의 F/S (바이트 F0 S0 F1 S1 ...)와 점수."""
+    __slots__ = ("id", "name", "parent", "fs", "jsa", "score", "grade")
+    level = PROCESS
+
+    def __init__(self, id, name, parent, fs):
+        self.id, self.name, self.parent, self.fs = id, name, parent, fs
+        self.jsa = sum(f * s for f, s in zip(fs[0::2], fs[1::2]))
+        self.score = self.grade = 0
+
+    # 자식 집계를 훑을 때 Group과 같은 이름으로 읽기 위함
+    @property
+    def worst(self):
+        return self.score
+
+    @property
+    def worst_leaf(self):
+        return self
+
+
+@dataclass(frozen=True, slots=True)
+class Rollup:
+    id: int
+    level: str
+    name: str
+    path: str
+    processes: int # 아래 공정 수
+    mean_score: float
+    worst_score: int # 가장 위험한 공정의 선행 점수 (공정이 없으면 None)
+    worst_grade: str
+    worst_path: str
+    management_score: int # 이 노드의 관리 점수 (공정은 소속 라인의 값)
+    overrides: dict
+    grade_counts: dict # 선행 등급 → 공정 수
+
+
+class RiskTree:
+    def __init__(self, company=LeadingInputs(), name="회사", scheme=SCHEME_FS, catalog=FS_PROCESS_CATALOG, rules=None):
+        self.scheme, self.catalog = scheme, catalog
+        self._set_rules(rules or get_rules())
+        self.nodes = {} # id → 노드
+        self.root = self._register(Group(next(_node_ids), name, COMPANY, None, {}))
+        self.root.inputs = replace(company, jsa_factors=())
+        self.root.management = self._management(self.root.inputs)
+        self.touched = 1
+
+    def _set_rules(self, rules):
+        sr = rules.schemes.get(self.scheme)
+        if sr is None:
+            raise ValueError(f"알 수 없는 평가 방식: {self.scheme!r}")
+        self.rules, self._edges, self._in_lower = rules, sr.leading_edges, sr.leading_edge_in_lower
+
+    def _register(self, node):
+        self.nodes[node.id] = node
+        return node
+
+    def _management(self, inputs):
+        return management_score(inputs, self.scheme, self.rules)
+
+    def _grade(self, score):
+        return _grade_index(self._edges, self._in_lower, score)
+
+    # --- 구조 만들기 ---
+    def add_plant(self, name, **overrides):
+        return self._add_group(self.root, name, PLANT, overrides)
+
+    def add_line(self, plant, name, processes=None, **overrides):
+        """plant 아래에 라인을 추가합니다. processes: {공정: fs}를 주면 그 공정들도 함께 추가합니다."""
+        line = self._add_group(plant, name, LINE, overrides)
+        for process, fs in (processes or {}).items():
+            self.add_process(line, process, fs)
+        self.touched = 1 + len(line.children) + line.level
+        return line
+
+    def _check_child(self, parent, name, level):
+        if parent.level != level - 1:
+            raise ValueError(f"{LEVELS[level]}은(는) {LEVELS[level - 1]} 아래에만 둘 수 있습니다.")
+        if name in parent.children:
+            raise ValueError(f"'{self.path(parent) or parent.name}'에 이미 '{name}'이(가) 있습니다.")
+
+    def _add_group(self, parent, name, level, overrides):
+        self._check_child(parent, name, level)
+        node = Group(next(_node_ids), name, level, parent, self._check_overrides(overrides))
+        self._resolve(node) # 잘못된 재정의 값이면 여기서 ValueError (트리는 그대로)
+        parent.children[name] = node
+        return self._register(node)
+
+    def add_process(self, line, process, fs=None):
+        """line 아래에 카탈로그 공정을 추가합니다. fs: 위험요인 순서의 ((F, S), ...) (기본: 모두 3)."""
+        self._check_child(line, process, PROCESS)
+        leaf = Leaf(next(_node_ids), process, line, self._check_fs(process, fs))
+        self._score(leaf)
+        line.children[process] = leaf
+        self._register(leaf)
+        node = line
+        while node is not None:
+            node.count += 1
+            node.total += leaf.score
+            node.grades[leaf.grade] += 1
+            if node.worst is None or leaf.score > node.worst:
+                node.worst, node.worst_leaf = leaf.score, leaf
+            node = node.parent
+        self.touched = 1 + line.level + 1
+        return leaf
+
+    def remove(self, node):
+        """노드와 그 아래를 지우고 조상의 집계에서 뺍니다."""
+        if node is self.root:
+            raise ValueError("회사 노드는 지울 수 없습니다.")
+        old = self._snapshot(node)
+        del node.parent.children[node.name]
+        for n in self._walk(node):
+            del self.nodes[n.id]
+        self.touched = self._apply_delta(node.parent, old, (0, 0, [0] * len(GRADES)), rescan=True)
+
+    # --- 입력 변경 ---
+    def set_fs(self, leaf, i, freq, sev):
+        fs = bytearray(leaf.fs)
+        fs[2 * i:2 * i + 2] = bytes(self._fs_value(v) for v in (freq, sev))
+        return self.set_factors(leaf, fs)
+
+    def set_factors(self, leaf, fs):
+        """공정의 F/S를 바꾸고 새 점수를 반환합니다. 다시 계산하는 것은 그 공정과 조상뿐입니다."""
+        fs = self._check_fs(leaf.name, [(f, s) for f, s in zip(fs[0::2], fs[1::2])] if isinstance(fs, (bytes, bytearray)) else fs)
+        if fs == leaf.fs:
+            self.touched = 0
+            return leaf.score
+        old_score, old_grade = leaf.score, leaf.grade
+        leaf.fs = fs
+        leaf.jsa = sum(f * s for f, s in zip(fs[0::2], fs[1::2]))
+        self._score(leaf)
+        delta, touched, node = leaf.score - old_score, 1, leaf.parent
+        while node is not None:
+            node.total += delta
+            if leaf.grade != old_grade:
+                node.grades[old_grade] -= 1
+                node.grades[leaf.grade] += 1
+            if leaf.score >= node.worst:
+                node.worst, node.worst_leaf = leaf.score, leaf
+            elif node.worst_leaf is leaf: # 가장 위험했던 공정의 점수가 내려감 → 자식 집계 중 최댓값
+                self._rescan_worst(node)
+            touched += 1
+            node = node.parent
+        self.touched = touched
+        return leaf.score
+
+    def set_overrides(self, node, **fields):
+        """공장 / 라인의 관리 항목 재정의를 바꿉니다 (값이 None이면 재정의 해제). 그 노드 아래만 다시 계산합니다."""
+        if node.level not in (PLANT, LINE):
+            raise ValueError("재정의는 공장 / 라인에만 둘 수 있습니다 (회사 입력은 set_company, 공정은 F/S).")
+        overrides = {**node.overrides, **self._check_overrides({k: v for k, v in fields.items() if v is not None})}
+        for name in (k for k, v in fields.items() if v is None):
+            overrides.pop(name, None)
+        if overrides == node.overrides:
+            self.touched = 0
+            return
+        previous = node.overrides
+        node.overrides = overrides
+        try:
+            self._resolve(node)
+        except ValueError:
+            node.overrides = previous
+            raise
+        self._update_subtree(node)
+
+    def set_company(self, company):
+        """회사(루트) 관리 입력을 바꿉니다. 모든 공정에 영향을 주므로 바뀌었으면 전체를 다시 계산합니다."""
+        inputs = replace(company, jsa_factors=())
+        if inputs == self.root.inputs:
+            self.touched = 0
+            return
+        management = self._management(inputs)
+        self.root.inputs, self.root.management = inputs, management
+        self.touched = self._recompute(self.root)
+
+    def ensure_rules(self):
+        """규칙 파일이 바뀌었으면 새 규칙으로 전체를 다시 계산합니다. 바뀌었으면 True."""
+        rules = get_rules()
+        if rules is self.rules:
+            return False
+        self._set_rules(rules)
+        self.root.management = self._management(self.root.inputs)
+        self.touched = self._recompute(self.root)
+        return True
+
+    # --- 조회 ---
+    def path(self, node):
+        names = []
+        while node.parent is not None:
+            names.append(node.name)
+            node = node.parent
+        return " / ".join(reversed(names))
+
+    def rollup(self, node):
+        if isinstance(node, Leaf):
+            line = node.parent
+            return Rollup(node.id, LEVELS[PROCESS], node.name, self.path(node), 1, float(node.score), node.score,
+                          GRADES[node.grade], self.path(node), line.management, {}, {GRADES[node.grade]: 1})
+        return Rollup(
+            node.id, LEVELS[node.level], node.name, self.path(node), node.count,
+            node.total / node.count if node.count else 0.0, node.worst,
+            GRADES[node.worst_leaf.grade] if node.worst_leaf is not None else None,
+            self.path(node.worst_leaf) if node.worst_leaf is not None else None,
+            node.management, dict(node.overrides), dict(zip(GRADES, node.grades)),
+        )
+
+    def children(self, node):
+        return [self.rollup(child) for child in node.children.values()] if isinstance(node, Group) else []
+
+    def leaves(self, node=None):
+        return (n for n in self._walk(node or self.root) if isinstance(n, Leaf))
+
+    def assessment(self, leaf):
+        """공정 노드의 평가 입력 (evaluate()로 같은 점수를 얻을 수 있음)."""
+        factors = self.catalog[leaf.name].risk_factors
+        jsa = tuple((f.name, f.type, leaf.fs[2 * i], leaf.fs[2 * i + 1]) for i, f in enumerate(factors))
+        return Assessment(leading=replace(leaf.parent.inputs, jsa_factors=jsa), scheme=self.scheme, process=leaf.name)
+
+    # --- 내부: 계산 / 전파 ---
+    def _check_overrides(self, overrides):
+        unknown = sorted(set(overrides) - set(LEADING_FIELDS))
+        if unknown:
+            raise ValueError(f"재정의할 수 없는 항목: {unknown}")
+        return overrides
+
+    def _fs_value(self, v):
+        v = int(v)
+        if not 1 <= v <= 5:
+            raise ValueError(f"F/S는 1~5여야 합니다: {v}")
+        return v
+
+    def _check_fs(self, process, fs):
+        info = self.catalog.get(process)
+        if info is None:
+            raise ValueError(f"카탈로그에 없는 공정: {process!r}")
+        n = len(info.risk_factors)
+        if fs is None:
+            return bytes([FS_DEFAULT]) * (2 * n)
+        fs = list(fs)
+        if len(fs) != n:
+            raise ValueError(f"'{process}' 위험요인은 {n}개입니다 (F/S {len(fs)}쌍 입력).")
+        return bytes(self._fs_value(v) for pair in fs for v in pair)
+
+    def _resolve(self, node):
+        parent = node.parent
+        if node.overrides:
+            node.inputs = replace(parent.inputs, **node.overrides)
+            node.management = self._management(node.inputs)
+        else:
+            node.inputs, node.management = parent.inputs, parent.management
+
+    def _score(self, leaf):
+        leaf.score = leaf.parent.management + leaf.jsa
+        leaf.grade = self._grade(leaf.score)
+
+    def _walk(self, node):
+        yield node
+        if isinstance(node, Group):
+            for child in node.children.values():
+                yield from self._walk(child)
+
+    def _rescan_worst(self, node):
+        node.worst, node.worst_leaf = None, None
+        for child in node.children.values():
+            if child.worst is not None and (node.worst is None or child.worst > node.worst):
+                node.worst, node.worst_leaf = child.worst, child.worst_leaf
+
+    def _recompute(self, node):
+        """node 아래 전체를 다시 계산합니다 (입력 → 관리 점수 → 공정 점수 → 집계). 다시 계산한 노드 수를 반환."""
+        if node.parent is not None:
+            self._resolve(node)
+        node._clear()
+        touched = 1
+        for child in node.children.values():
+            if isinstance(child, Leaf):
+                self._score(child)
+                touched += 1
+                node.count += 1
+                node.total += child.score
+                node.grades[child.grade] += 1
+            else:
+                touched += self._recompute(child)
+                node.count += child.count
+                node.total += child.total
+                for g, n in enumerate(child.grades):
+                    node.grades[g] += n
+            if child.worst is not None and (node.worst is None or child.worst > node.worst):
+                node.worst, node.worst_leaf = child.worst, child.worst_leaf
+        return touched
+
+    @staticmethod
+    def _snapshot(node):
+        if isinstance(node, Leaf):
+            grades = [0] * len(GRADES)
+            grades[node.grade] = 1
+            return 1, node.score, grades
+        return node.count, node.total, list(node.grades)
+
+    def _apply_delta(self, start, old, new, rescan):
+        """start부터 루트까지 (공정 수, 합계, 등급별 수)의 차이를 반영하고 가장 위험한 공정을 자식 집계에서 다시 고릅니다."""
+        touched, node = 0, start
+        while node is not None:
+            node.count += new[0] - old[0]
+            node.total += new[1] - old[1]
+            for g in range(len(GRADES)):
+                node.grades[g] += new[2][g] - old[2][g]
+            if rescan:
+                self._rescan_worst(node)
+            touched += 1
+            node = node.parent
+        return touched
+
+    def _update_subtree(self, node):
+        old = self._snapshot(node)
+        touched = self._recompute(node)
+        self.touched = touched + self._apply_delta(node.parent, old, self._snapshot(node), rescan=True)
+
+    # --- 예시 / 측정용 구조 ---
+    @classmethod
+    def generate(cls, company=LeadingInputs(), plants=10, lines=10, override_rate=0.2, seed=0, catalog=FS_PROCESS_CATALOG):
+        """공장 plants개 x 라인 lines개 x 카탈로그 공정 전체, F/S는 무작위. 공장 / 라인의 override_rate 비율은
+        관리 항목 1~2개를 무작위 값으로 재정의합니다."""
+        rng = random.Random(seed)
+        tree = cls(company, catalog=catalog)
+
+        def overrides():
+            if rng.random() >= override_rate:
+                return {}
+            fields = rng.sample(LEADING_FIELDS, rng.randint(1, 2))
+            out = {}
+            for name in fields:
+                code = rng.randint(*LEADING_DOMAINS[name])
+                out[name] = CATEGORY_OPTIONS[name][code] if name in CATEGORY_OPTIONS else code
+            return out
+
+        for p in range(plants):
+            plant = tree.add_plant(f"공장{p + 1:02d}", **overrides())
+            for l in range(lines):
+                tree.add_line(plant, f"라인{l + 1:02d}", {
+                    process: [(rng.randint(1, 5), rng.randint(1, 5)) for _ in info.risk_factors] for process, info in catalog.items()
+                }, **overrides())
+        tree.touched = len(tree.nodes)
+        return tree
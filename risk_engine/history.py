@@ -0,0 +1,332 @@
+"""SQLite 평가 이력 저장소.
+
+완료된 평가(입력, 선행 점수/등급, 후행 점수/상태)를 로컬 SQLite 파일에 기록합니다.
+WAL 모드와 일괄 삽입(executemany)을 사용하고, 공정+기간 / 등급+공정+기간 조회를 인덱스로 처리합니다.
+일/주/월 추이용 rollup 테이블은 삽입과 같은 트랜잭션에서 증분 갱신합니다.
+등급/상태는 정수 코드(GRADES / LAGGING_STATUSES 또는 GRADES 인덱스)로 저장합니다.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from .catalog import FS_PROCESS_CATALOG
+from .records import assessment_from_codes, assessment_to_codes
+from .scoring import GRADES, LAGGING_STATUSES, SCHEME_ARICELL
+
+DEFAULT_PATH = os.environ.get("RISK_HISTORY_DB", "risk_history.db")
+DEFAULT_BATCH_SIZE = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessments (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,            -- 평가 시각 (unix epoch 초)
+    scheme TEXT NOT NULL,
+    process TEXT NOT NULL,
+    site TEXT NOT NULL DEFAULT '',
+    leading_score INTEGER NOT NULL,
+    leading_grade INTEGER NOT NULL, -- GRADES 인덱스
+    jsa_total INTEGER NOT NULL,
+    lagging_score INTEGER NOT NULL,
+    lagging_grade INTEGER NOT NULL, -- aricell: GRADES 인덱스 / fs: LAGGING_STATUSES 인덱스
+    inputs TEXT NOT NULL            -- records.assessment_to_codes() JSON
+);
+CREATE INDEX IF NOT EXISTS ix_assessments_process_ts ON assessments (process, ts);
+CREATE INDEX IF NOT EXISTS ix_assessments_grade ON assessments (leading_grade, process, ts);
+"""
+
+# 일/주/월 집계: 새 평가가 기록될 때 같은 트랜잭션에서 증분 갱신 (전체 재집계 없음)
+_ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    period TEXT NOT NULL,           -- 'day' / 'week' / 'month'
+    bucket INTEGER NOT NULL,        -- 구간 시작 시각 (로컬 자정, unix epoch 초)
+    scheme TEXT NOT NULL,
+    process TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    sum_leading INTEGER NOT NULL,
+    max_leading INTEGER NOT NULL,
+    sum_lagging INTEGER NOT NULL,
+    max_lagging INTEGER NOT NULL,
+    g0 INTEGER NOT NULL, g1 INTEGER NOT NULL, g2 INTEGER NOT NULL, g3 INTEGER NOT NULL, g4 INTEGER NOT NULL, -- 선행 등급별 건수
+    l0 INTEGER NOT NULL, l1 INTEGER NOT NULL, l2 INTEGER NOT NULL, l3 INTEGER NOT NULL, l4 INTEGER NOT NULL, -- 후행 등급/상태별 건수
+    PRIMARY KEY (period, scheme, process, bucket)
+) WITHOUT ROWID;
+"""
+PERIODS = ("day", "week", "month")
+
+_UPSERT_ROLLUP = """
+INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (period, scheme, process, bucket) DO UPDATE SET
+    n = n + excluded.n,
+    sum_leading = sum_leading + excluded.sum_leading,
+    max_leading = MAX(max_leading, excluded.max_leading),
+    sum_lagging = sum_lagging + excluded.sum_lagging,
+    max_lagging = MAX(max_lagging, excluded.max_lagging),
+    g0 = g0 + excluded.g0, g1 = g1 + excluded.g1, g2 = g2 + excluded.g2, g3 = g3 + excluded.g3, g4 = g4 + excluded.g4,
+    l0 = l0 + excluded.l0, l1 = l1 + excluded.l1, l2 = l2 + excluded.l2, l3 = l3 + excluded.l3, l4 = l4 + excluded.l4
+"""
+
+_COLUMNS = "id, ts, scheme, process, site, leading_score, leading_grade, jsa_total, lagging_score, lagging_grade"
+# rollup 전 부분 집계 단위 (초). 시간대 오프셋과 서머타임 전환은 모두 15분의 배수이므로(+05:30, +05:45, +08:45 등)
+# 한 구간의 평가는 항상 같은 로컬 날짜에 속함 (시 단위로 묶으면 +05:30 등에서 자정 전후 30분이 다른 날로 섞임)
+SLOT_S = 900
+
+
+def bucket_start(ts, period):
+    """ts가 속한 일/주(월요일 시작)/월 구간의 시작 시각 (로컬 시간 기준)."""
+    d = datetime.fromtimestamp(ts).date()
+    if period == "week":
+        d -= timedelta(days=d.weekday())
+    elif period == "month":
+        d = d.replace(day=1)
+    return int(datetime(d.year, d.month, d.day).timestamp())
+
+
+def _merge(acc, key, partial):
+    a = acc.get(key)
+    if a is None:
+        acc[key] = list(partial)
+        return
+    a[0] += partial[0]
+    a[1] += partial[1]
+    a[2] = max(a[2], partial[2])
+    a[3] += partial[3]
+    a[4] = max(a[4], partial[4])
+    for i in range(5, 15):
+        a[i] += partial[i]
+
+
+def rollup_deltas(slots):
+    """SLOT_S 단위 부분 집계 {(slot, scheme, process): [...]}를 일/주/월 rollup 증분 행으로 올립니다.
+
+    구간 경계가 로컬 자정과 어긋나지 않으므로(SLOT_S 참고) 같은 구간의 평가는 항상 같은 일/주/월 구간에 속합니다.
+    """
+    days = {}
+    day_of_slot = {}
+    for (slot, scheme, process), partial in slots.items():
+        day = day_of_slot.get(slot)
+        if day is None:
+            day = day_of_slot[slot] = bucket_start(slot * SLOT_S, "day")
+        _merge(days, (day, scheme, process), partial)
+    out = [("day",) + key + tuple(a) for key, a in days.items()]
+    for period in PERIODS[1:]:
+        acc = {}
+        for (day, scheme, process), partial in days.items():
+            _merge(acc, (bucket_start(day, period), scheme, process), partial)
+        out.extend((period,) + key + tuple(a) for key, a in acc.items())
+    return out
+
+
+def aggregate_rows(rows):
+    """평가 행 목록을 (period, bucket, scheme, process)별 rollup 증분으로 묶습니다."""
+    slots = {}
+    for ts, scheme, process, _, leading, grade, _, lagging, lag_grade, _ in rows:
+        key = (ts // SLOT_S, scheme, process)
+        a = slots.get(key)
+        if a is None:
+            a = slots[key] = [0, 0, leading, 0, lagging] + [0] * 10
+        a[0] += 1
+        a[1] += leading
+        if leading > a[2]:
+            a[2] = leading
+        a[3] += lagging
+        if lagging > a[4]:
+            a[4] = lagging
+        a[5 + grade] += 1
+        a[10 + lag_grade] += 1
+    return rollup_deltas(slots)
+
+
+def lagging_label(scheme, code):
+    return (GRADES if scheme == SCHEME_ARICELL else LAGGING_STATUSES)[code]
+
+
+def lagging_code(scheme, label):
+    return (GRADES if scheme == SCHEME_ARICELL else LAGGING_STATUSES).index(label)
+
+
+def _record(row, with_inputs):
+    rec = dict(zip(_COLUMNS.split(", "), row[:10]))
+    rec["leading_grade"] = GRADES[rec["leading_grade"]]
+    rec["lagging_grade"] = lagging_label(rec["scheme"], rec["lagging_grade"])
+    if with_inputs:
+        process = FS_PROCESS_CATALOG.get(rec["process"])
+        factor_names = tuple((f.name, f.type) for f in process.risk_factors) if process else ()
+        rec["assessment"] = assessment_from_codes(json.loads(row[10]), rec["scheme"], rec["process"], factor_names)
+    return rec
+
+
+class HistoryStore:
+    def __init__(self, path=DEFAULT_PATH, batch_size=DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pending = []
+        # Streamlit 세션 스레드들이 공유하므로 check_same_thread=False + 잠금으로 직렬화
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._conn.executescript(_SCHEMA)
+        has_rollups = self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'rollups'").fetchone()
+        self._conn.executescript(_ROLLUP_SCHEMA)
+        if not has_rollups:
+            self.rebuild_rollups()
+
+    # --- 쓰기 ---
+    @staticmethod
+    def _row(assessment, result, ts, site):
+        return (
+            int(ts if ts is not None else time.time()), assessment.scheme, assessment.process, site,
+            result.leading_score, GRADES.index(result.leading_grade), result.jsa_total,
+            result.lagging_score, lagging_code(assessment.scheme, result.lagging_grade),
+            json.dumps(assessment_to_codes(assessment), separators=(",", ":")),
+        )
+
+    def add(self, assessment, result, ts=None, site=""):
+        """버퍼에 추가하고, batch_size 이상 쌓이면 한 트랜잭션으로 기록합니다."""
+        with self._lock:
+            self._pending.append(self._row(assessment, result, ts, site))
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def add_rows(self, rows):
+        """이미 만들어진 행 튜플(ts, scheme, process, site, leading_score, leading_grade, jsa_total, lagging_score, lagging_grade, inputs)을 일괄 기록합니다."""
+        with self._lock:
+            self._write(rows)
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._pending:
+            rows, self._pending = self._pending, []
+            self._write(rows)
+
+    def _write(self, rows):
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                "INSERT INTO assessments (ts, scheme, process, site, leading_score, leading_grade, jsa_total, lagging_score, lagging_grade, inputs)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.executemany(_UPSERT_ROLLUP, aggregate_rows(rows))
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    # --- 조회 ---
+    @staticmethod
+    def _where(process, grade, since, until):
+        clauses, params = [], []
+        if grade is not None:
+            clauses.append("leading_grade = ?")
+            params.append(GRADES.index(grade))
+        if process is not None:
+            clauses.append("process = ?")
+            params.append(process)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(int(since))
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(int(until))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, process=None, grade=None, since=None, until=None, limit=1000, with_inputs=False):
+        """조건에 맞는 평가를 최신순으로 반환합니다. since/until은 unix epoch 초, grade는 선행지표 등급."""
+        where, params = self._where(process, grade, since, until)
+        cols = _COLUMNS + (", inputs" if with_inputs else "")
+        sql = f"SELECT {cols} FROM assessments{where} ORDER BY ts DESC LIMIT ?"
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(sql, params + [limit]).fetchall()
+        return [_record(row, with_inputs) for row in rows]
+
+    def latest(self, since=None):
+        """사업장+공정별 가장 최근 평가 (입력 포함), 사업장 / 공정 순. 보고서 일괄 내보내기의 대상 목록입니다."""
+        where, params = self._where(None, None, since, None)
+        # SQLite: MAX()와 함께 고른 나머지 열은 최댓값을 가진 행의 값
+        sql = f"SELECT {_COLUMNS}, inputs, MAX(ts) FROM assessments{where} GROUP BY site, process ORDER BY site, process"
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(sql, params).fetchall()
+        return [_record(row, True) for row in rows]
+
+    def count(self, process=None, grade=None, since=None, until=None):
+        where, params = self._where(process, grade, since, until)
+        with self._lock:
+            self._flush_locked()
+            return self._conn.execute(f"SELECT COUNT(*) FROM assessments{where}", params).fetchone()[0]
+
+    def analyze(self):
+        """대량 적재 뒤 SQLite 통계를 갱신해, 조회 계획이 공정/등급 인덱스 중 맞는 쪽을 고르도록 합니다."""
+        with self._lock:
+            self._flush_locked()
+            self._conn.execute("ANALYZE")
+
+    def rebuild_rollups(self):
+        """기존 이력 전체로 rollup을 다시 만듭니다 (rollup 도입 이전 DB의 최초 1회용).
+
+        SLOT_S 단위 부분 집계는 SQLite의 정수 GROUP BY로 만들고, 일/주/월 구간 변환만 파이썬에서 합니다.
+        """
+        grade_sums = ", ".join(f"SUM(leading_grade = {i})" for i in range(5))
+        lag_sums = ", ".join(f"SUM(lagging_grade = {i})" for i in range(5))
+        with self._lock:
+            slots = {
+                (slot, scheme, process): partial
+                for slot, scheme, process, *partial in self._conn.execute(
+                    f"SELECT ts / {SLOT_S}, scheme, process, COUNT(*), SUM(leading_score), MAX(leading_score), SUM(lagging_score), MAX(lagging_score),"
+                    f" {grade_sums}, {lag_sums} FROM assessments GROUP BY ts / {SLOT_S}, scheme, process"
+                )
+            }
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM rollups")
+            self._conn.executemany(_UPSERT_ROLLUP, rollup_deltas(slots))
+            self._conn.execute("COMMIT")
+
+    def trend(self, period="day", scheme=None, process=None, since=None, until=None):
+        """일/주/월 rollup을 시간순으로 반환합니다 (평균/최대 점수, 등급별 건수)."""
+        if period not in PERIODS:
+            raise ValueError(f"period는 {PERIODS} 중 하나여야 합니다: {period!r}")
+        clauses, params = ["period = ?"], [period]
+        for column, value in (("scheme", scheme), ("process", process)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("bucket >= ?")
+            params.append(bucket_start(since, period))
+        if until is not None:
+            clauses.append("bucket < ?")
+            params.append(int(until))
+        sql = f"SELECT * FROM rollups WHERE {' AND '.join(clauses)} ORDER BY bucket"
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(sql, params).fetchall()
+        out = []
+        for _, bucket, scheme_, process_, n, s_lead, m_lead, s_lag, m_lag, *counts in rows:
+            lag_labels = GRADES if scheme_ == SCHEME_ARICELL else LAGGING_STATUSES
+            out.append({
+                "bucket": bucket, "scheme": scheme_, "process": process_, "n": n,
+                "avg_leading": s_lead / n, "max_leading": m_lead, "avg_lagging": s_lag / n, "max_lagging": m_lag,
+                "leading_grades": dict(zip(GRADES, counts[:5])),
+                "lagging_grades": dict(zip(lag_labels, counts[5:5 + len(lag_labels)])),
+            })
+        return out
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
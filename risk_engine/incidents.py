@@ -0,0 +1,452 @@
+"""사고 / 점검 / 과태료 기록 수집과 후행지표 자동 입력.
+
+사망자 수 / 부상자 수 / 벌금 이력 / 보고 누락 같은 후행지표를 손으로 입력하지 않고, 실제 기록 파일(CSV 또는 JSONL,
+수 GB 가능)을 한 번 훑어 사업장+공정별 누적 집계를 만들고 그 집계로 LaggingInputs 항목을 채웁니다.
+파일은 고정 크기 블록으로 읽어 줄 경계에서 자르고 블록마다 pandas로 파싱/집계하므로 메모리는 블록 크기로 묶입니다.
+파일별로 읽은 위치(바이트)와 집계를 상태 파일(JSON)에 남겨, 기록이 덧붙은 뒤 다시 수집하면 늘어난 꼬리만 읽습니다.
+파일이 잘리거나 앞부분이 바뀌면(로그 회전 / 재작성) 그 파일의 집계만 버리고 처음부터 다시 읽습니다.
+
+기록 한 줄이 레코드 하나입니다 (CSV 필드 안의 줄바꿈은 지원하지 않음). 열 이름:
+    kind         incident / inspection / fine (없으면 파일 이름에 든 단어로 판단: incidents.csv, fines.jsonl ...)
+    site, process
+    incident:    fatalities, injuries, major (중대 재해 여부), concealment (suspected / confirmed: 보고 누락 정황)
+    inspection:  finding (over_storage / concealment_suspected / concealment_confirmed, 그 밖의 값은 건수만)
+    fine:        major (중요 위반 여부)
+
+페이지는 start_service()로 프로세스당 하나의 수집 스레드를 띄웁니다 (RISK_INCIDENT_LOGS 미설정 시 None → 기존 입력).
+    RISK_INCIDENT_LOGS=/data/incidents.csv:/data/inspections.jsonl:/data/fines.csv   # os.pathsep으로 구분
+    RISK_INCIDENT_STATE=risk_incidents.json   # 읽은 위치 / 집계 보관 (기본값)
+단독 실행: python -m risk_engine.incidents ingest /data/incidents.csv ... / generate --rows 1000000 incidents.csv
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from .scoring import FINE_HISTORY_OPTIONS, HIDDEN_REPORTS_OPTIONS, MAJOR_INCIDENT_OPTIONS, OVER_STORAGE_OPTIONS
+
+DEFAULT_STATE_PATH = os.environ.get("RISK_INCIDENT_STATE", "risk_incidents.json")
+BLOCK_BYTES = 8 << 20 # 한 번에 읽어 파싱하는 크기
+HEAD_BYTES = 4096 # 이 앞부분의 해시가 바뀌면 다른 파일로 보고 처음부터 다시 읽음
+POLL_S = 30 # 수집 스레드가 파일 크기를 다시 확인하는 주기
+ALL_SITES = "" # lagging_fields(site=ALL_SITES): 모든 사업장 합계
+
+KINDS = ("incident", "inspection", "fine")
+# 사업장+공정별 누적 카운터 (배열 열 순서)
+COUNTERS = (
+    "incidents", "major_incidents", "fatalities", "injuries",
+    "inspections", "over_storage", "concealment_suspected", "concealment_confirmed",
+    "fines", "major_fines",
+)
+# 기록 집계로 채우는 LaggingInputs 항목 (페이지 표시용 이름)
+RECORD_FIELD_LABELS = {
+    "has_major_incident": "중대 재해",
+    "past_fatalities_count": "사망자 수",
+    "past_injuries_count": "부상자 수",
+    "past_fine_history_level": "벌금 이력",
+    "past_hazard_over_storage": "초과 보관 적발",
+    "past_hidden_accident_reports": "보고 누락/은폐",
+}
+_TRUE = frozenset(("1", "1.0", "true", "y", "yes", "예", "있음"))
+_LABEL_COLUMNS = ("kind", "site", "process", "concealment", "finding")
+_MAX_COUNT = 2.0 ** 53 # 숫자 열(사망자 수 등)로 받는 값의 상한: float64로 정확히 담기는 정수
+_READ_COLUMNS = _LABEL_COLUMNS + ("fatalities", "injuries", "major")
+
+
+def kind_from_name(path):
+    name = os.path.basename(str(path)).lower()
+    return next((kind for kind in KINDS if kind in name), None)
+
+
+def _format(path):
+    ext = os.path.splitext(str(path).lower())[1]
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    if ext in (".csv", ".txt"):
+        return "csv"
+    raise ValueError(f"지원하지 않는 기록 형식: {path} (CSV 또는 JSONL)")
+
+
+def _head_hash(f, offset):
+    """이미 읽은 앞부분(최대 HEAD_BYTES)의 해시. 덧붙인 꼬리는 포함하지 않으므로 append만으로는 바뀌지 않음."""
+    f.seek(0)
+    return hashlib.blake2b(f.read(min(offset, HEAD_BYTES)), digest_size=16).hexdigest()
+
+
+# --- 블록 집계 ---
+def _labels(df, name, n):
+    """문자열 열 → (정규화한 범주 배열, 행별 코드). 비교는 범주 수만큼만 하고 코드로 행에 펼칩니다. 결측 / 없는 열은 ""."""
+    if name not in df:
+        return np.array([""], dtype=object), np.zeros(n, dtype=np.intp)
+    col = df[name]
+    if col.dtype != "category":
+        col = col.astype("category")
+    cats = col.cat.categories.astype(str).str.strip().str.lower().to_numpy(dtype=object)
+    return np.append(cats, ""), col.cat.codes.to_numpy() # 코드 -1(결측) → 마지막 ""
+
+
+def _is(labels, *values):
+    cats, codes = labels
+    return np.isin(cats, values)[codes]
+
+
+def _truthy(df, name, n):
+    if name not in df:
+        return np.zeros(n, dtype=bool)
+    col = df[name]
+    if col.dtype.kind in "biuf":
+        return col.fillna(0).to_numpy() != 0
+    return _is(_labels(df, name, n), *_TRUE)
+
+
+def _numeric(df, name, n):
+    import pandas as pd
+
+    if name not in df:
+        return np.zeros(n, dtype=np.int64)
+    values = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=np.float64)
+    # 숫자로 읽을 수 없는 값과 같이 ±inf / int64로 담을 수 없는 큰 값도 결측(0)으로 봄 (그대로 바꾸면 음수로 넘침)
+    return np.where(np.abs(values) <= _MAX_COUNT, values, 0).clip(min=0).astype(np.int64)
+
+
+def count_frame(df, default_kind=None):
+    """기록 DataFrame 한 블록 → {(site, process): 카운터 배열}. kind를 알 수 없는 행은 건너뜁니다."""
+    n = len(df)
+    if not n:
+        return {}
+    if "kind" in df:
+        cats, codes = _labels(df, "kind", n)
+        if default_kind is not None:
+            cats = np.where(np.isin(cats, KINDS), cats, default_kind)
+        incident, inspection, fine = (_is((cats, codes), k) for k in KINDS)
+    elif default_kind is not None:
+        incident, inspection, fine = (np.full(n, k == default_kind) for k in KINDS)
+    else:
+        raise ValueError("kind 열이 없고 파일 이름으로도 기록 종류(incident / inspection / fine)를 알 수 없습니다.")
+
+    fatalities = np.where(incident, _numeric(df, "fatalities", n), 0)
+    major = _truthy(df, "major", n)
+    concealment, finding = _labels(df, "concealment", n), _labels(df, "finding", n)
+
+    columns = { # COUNTERS 순서
+        "incidents": incident,
+        "major_incidents": incident & (major | (fatalities > 0)),
+        "fatalities": fatalities,
+        "injuries": np.where(incident, _numeric(df, "injuries", n), 0),
+        "inspections": inspection,
+        "over_storage": inspection & _is(finding, "over_storage"),
+        "concealment_suspected": (incident & _is(concealment, "suspected")) | (inspection & _is(finding, "concealment_suspected")),
+        "concealment_confirmed": (incident & _is(concealment, "confirmed")) | (inspection & _is(finding, "concealment_confirmed")),
+        "fines": fine,
+        "major_fines": fine & major,
+    }
+
+    keep = incident | inspection | fine
+    site_cats, site = _keys(df, "site", n)
+    process_cats, process = _keys(df, "process", n)
+    pair = site * len(process_cats) + process
+    pair[~keep] = -1 # kind를 알 수 없는 행은 따로 모아 버림
+    # (사업장, 공정) 코드 쌍별 합계: 열마다 bincount 한 번 (행 단위 파이썬 처리 없음)
+    uniq, inverse = np.unique(pair, return_inverse=True)
+    sums = np.stack([np.bincount(inverse, weights=columns[name], minlength=len(uniq)) for name in COUNTERS], axis=1).astype(np.int64)
+    return {
+        (site_cats[u // len(process_cats)], process_cats[u % len(process_cats)]): row
+        for u, row in zip(uniq.tolist(), sums) if u >= 0
+    }
+
+
+def _keys(df, name, n):
+    """집계 키 열 → (원래 값 범주 목록, 행별 코드). 결측 / 없는 열은 ""."""
+    if name not in df:
+        return [""], np.zeros(n, dtype=np.int64)
+    col = df[name]
+    if col.dtype != "category":
+        col = col.astype("category")
+    return [str(c) for c in col.cat.categories] + [""], np.where((codes := col.cat.codes.to_numpy()) < 0, len(col.cat.categories), codes).astype(np.int64)
+
+
+def _parse_block(data, fmt, header):
+    import pandas as pd
+
+    if fmt == "jsonl":
+        try:
+            import pyarrow.json as pa_json
+        except ImportError: # pyarrow가 없으면 pandas(ujson)로: 느리고 블록당 메모리가 몇 배 큼
+            return pd.read_json(io.BytesIO(data), lines=True, dtype=False)
+        table = pa_json.read_json(io.BytesIO(data))
+        # 문자열 열은 사전 인코딩해 범주형으로 넘김
+        for name in _LABEL_COLUMNS:
+            if name in table.column_names and str(table.schema.field(name).type) == "string":
+                table = table.set_column(table.column_names.index(name), name, table.column(name).dictionary_encode())
+        return table.to_pandas()
+    usecols = [c for c in header if c in _READ_COLUMNS]
+    # 문자열 열은 범주형으로 바로 읽음 (행마다 문자열 객체를 만들지 않음), 숫자 열은 추론
+    return pd.read_csv(io.BytesIO(data), names=header, header=None, usecols=usecols, keep_default_na=False, na_values=[""], low_memory=False,
+                       dtype={c: "category" for c in usecols if c in _LABEL_COLUMNS})
+
+
+# --- 파일별 증분 수집 상태 ---
+class IncidentLedger:
+    """기록 파일별 읽은 위치와 사업장+공정별 누적 카운터. refresh()는 늘어난 꼬리만 읽습니다."""
+
+    def __init__(self, paths=(), state_path=None):
+        self.paths = [str(p) for p in paths]
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self._sources = {} # 경로 → {"offset", "head", "header", "counts": {(site, process): 배열}}
+        self._totals = None
+        self.version = 0 # 집계가 바뀔 때마다 증가 (페이지 재평가 판단용)
+        self.last_refresh = None
+        if state_path and os.path.exists(state_path):
+            self._load(state_path)
+
+    def _load(self, state_path):
+        with open(state_path, encoding="utf-8") as f:
+            raw = json.load(f)
+        if raw.get("counters") != list(COUNTERS):
+            return # 카운터 구성이 바뀐 이전 상태 → 처음부터 다시 읽음
+        for path, src in raw.get("sources", {}).items():
+            counts = {tuple(key.split("\x1f", 1)): np.array(row, dtype=np.int64) for key, row in src["counts"].items()}
+            self._sources[path] = {"offset": src["offset"], "head": src["head"], "header": src["header"], "counts": counts}
+
+    def save(self, state_path=None):
+        """상태를 임시 파일에 쓴 뒤 교체합니다 (쓰는 중에 중단돼도 이전 상태가 남음)."""
+        state_path = state_path or self.state_path
+        if not state_path:
+            return
+        with self._lock:
+            raw = {"counters": list(COUNTERS), "sources": {
+                path: {"offset": src["offset"], "head": src["head"], "header": src["header"],
+                       "counts": {"\x1f".join(key): row.tolist() for key, row in src["counts"].items()}}
+                for path, src in self._sources.items()
+            }}
+        tmp = f"{state_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(raw, f, ensure_ascii=False)
+        os.replace(tmp, state_path)
+
+    def refresh(self, block_bytes=BLOCK_BYTES):
+        """모든 기록 파일의 새 꼬리를 읽습니다. 새로 반영한 레코드 수를 반환 (변화가 없으면 stat만 하고 0)."""
+        rows = 0
+        for path in self.paths:
+            rows += self.ingest(path, block_bytes=block_bytes)
+        self.last_refresh = time.time()
+        return rows
+
+    def ingest(self, path, kind=None, block_bytes=BLOCK_BYTES):
+        path = str(path)
+        if path not in self.paths:
+            self.paths.append(path)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return 0
+        src = self._sources.get(path)
+        if src is not None and src["offset"] == size:
+            return 0
+        fmt = _format(path)
+        kind = kind or kind_from_name(path)
+        rows = 0
+        with open(path, "rb") as f:
+            reset = src is None or size < src["offset"] or _head_hash(f, src["offset"]) != src["head"]
+            if reset: # 새 파일 / 잘리거나 다시 쓰인 파일: 이 파일의 집계를 버리고 처음부터
+                src = {"offset": 0, "head": None, "header": None, "counts": {}}
+            offset, header = src["offset"], src["header"]
+            counts = {key: row.copy() for key, row in src["counts"].items()}
+            f.seek(offset)
+            if fmt == "csv" and header is None:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    return 0 # 머리줄도 아직 다 쓰이지 않음
+                header = [c.strip() for c in line.decode("utf-8-sig").rstrip("\r\n").split(",")]
+                offset = f.tell()
+            while True:
+                data = f.read(block_bytes)
+                if not data:
+                    break
+                cut = data.rfind(b"\n") + 1
+                if not cut:
+                    if len(data) < block_bytes:
+                        break # 마지막 줄이 아직 쓰이는 중: 다음 수집에서 읽음
+                    raise ValueError(f"{path}: {block_bytes} 바이트 안에 줄바꿈이 없습니다.")
+                block = data[:cut]
+                if block.strip():
+                    frame = _parse_block(block, fmt, header)
+                    rows += len(frame)
+                    for key, row in count_frame(frame, kind).items():
+                        counts[key] = counts[key] + row if key in counts else row
+                offset += cut
+                f.seek(offset)
+            if not reset and offset == src["offset"]:
+                return 0 # 덧붙은 줄이 아직 끝나지 않음
+            head = _head_hash(f, offset)
+        with self._lock:
+            self._sources[path] = {"offset": offset, "head": head, "header": header, "counts": counts}
+            self._totals = None
+            self.version += 1
+        return rows
+
+    def totals(self):
+        """{(site, process): 카운터 배열} (모든 파일 합계)."""
+        with self._lock:
+            if self._totals is None:
+                totals = {}
+                for src in self._sources.values():
+                    for key, row in src["counts"].items():
+                        totals[key] = totals[key] + row if key in totals else row.copy()
+                self._totals = totals
+            return self._totals
+
+    def sites(self):
+        return sorted({site for site, _ in self.totals()})
+
+    def counts(self, site=ALL_SITES, process=None):
+        """사업장(ALL_SITES면 전체) / 공정(None이면 전체) 조건에 맞는 카운터 합계 {이름: 값}."""
+        total = np.zeros(len(COUNTERS), dtype=np.int64)
+        for (s, p), row in self.totals().items():
+            if (site == ALL_SITES or s == site) and (process is None or p == process):
+                total += row
+        return dict(zip(COUNTERS, total.tolist()))
+
+    def lagging_fields(self, site=ALL_SITES, process=None):
+        """기록에서 정해지는 LaggingInputs 항목 → 값. replace(LaggingInputs(...), **이 값)으로 덮어씁니다."""
+        return lagging_fields_from_counts(self.counts(site, process))
+
+
+def lagging_fields_from_counts(c):
+    fines = c["fines"]
+    if fines == 0:
+        fine_level = FINE_HISTORY_OPTIONS[0]
+    elif fines == 1 and not c["major_fines"]:
+        fine_level = FINE_HISTORY_OPTIONS[1]
+    else:
+        fine_level = FINE_HISTORY_OPTIONS[2]
+    if c["concealment_confirmed"]:
+        hidden = HIDDEN_REPORTS_OPTIONS[2]
+    elif c["concealment_suspected"]:
+        hidden = HIDDEN_REPORTS_OPTIONS[1]
+    else:
+        hidden = HIDDEN_REPORTS_OPTIONS[0]
+    return {
+        "has_major_incident": MAJOR_INCIDENT_OPTIONS[1 if c["major_incidents"] else 0],
+        "past_fatalities_count": c["fatalities"],
+        "past_injuries_count": c["injuries"],
+        "past_fine_history_level": fine_level,
+        "past_hazard_over_storage": OVER_STORAGE_OPTIONS[1 if c["over_storage"] else 0],
+        "past_hidden_accident_reports": hidden,
+    }
+
+
+def describe(c, fields=None):
+    """사이드바 / CLI 표시용 요약 줄들. fields를 주면 후행지표에 반영한 값도 덧붙입니다."""
+    lines = [
+        f"사고 {c['incidents']:,}건 (중대 {c['major_incidents']:,} · 사망 {c['fatalities']:,}명 · 부상 {c['injuries']:,}명)",
+        f"점검 {c['inspections']:,}건 (초과 보관 적발 {c['over_storage']:,}) · 과태료 {c['fines']:,}건 (중요 위반 {c['major_fines']:,})",
+        f"보고 누락 의혹 {c['concealment_suspected']:,}건 · 확인 {c['concealment_confirmed']:,}건",
+    ]
+    if fields:
+        lines.append("후행지표 반영: " + " · ".join(f"{RECORD_FIELD_LABELS[field]} {value}" for field, value in fields.items()))
+    return lines
+
+
+# --- 페이지용 공유 수집 스레드 ---
+_service_lock = threading.Lock()
+_services = {}
+
+
+def start_service(paths=None, state_path=None, poll_s=POLL_S):
+    """기록 파일 묶음별로 한 번만 수집 스레드를 띄우고 IncidentLedger를 반환합니다. RISK_INCIDENT_LOGS 미설정 시 None."""
+    paths = paths if paths is not None else [p for p in os.environ.get("RISK_INCIDENT_LOGS", "").split(os.pathsep) if p]
+    if not paths:
+        return None
+    state_path = state_path or DEFAULT_STATE_PATH
+    key = (tuple(paths), state_path)
+    with _service_lock:
+        ledger = _services.get(key)
+        if ledger is not None:
+            return ledger
+        ledger = _services[key] = IncidentLedger(paths, state_path)
+
+    def run():
+        while True:
+            try:
+                if ledger.refresh():
+                    ledger.save()
+            except (OSError, ValueError) as e:
+                print(f"사고 기록 수집 실패: {e}", file=sys.stderr)
+            time.sleep(poll_s)
+
+    threading.Thread(target=run, name="incident-ledger", daemon=True).start()
+    return ledger
+
+
+# --- 합성 기록 발생기 (측정 / 시험용) ---
+def generate(path, rows, sites=50, seed=0, append=False):
+    """kind 열이 섞인 합성 기록을 CSV 또는 JSONL로 씁니다. 사고는 드물고 대부분 점검 기록입니다."""
+    import pandas as pd
+
+    from .catalog import FS_PROCESS_CATALOG
+
+    rng = np.random.default_rng(seed)
+    processes = np.array(list(FS_PROCESS_CATALOG))
+    fmt = _format(path)
+    mode = "a" if append else "w"
+    chunk = 500_000
+    for start in range(0, rows, chunk):
+        n = min(chunk, rows - start)
+        kind = rng.choice(np.array(KINDS), n, p=(0.05, 0.9, 0.05))
+        incident = kind == "incident"
+        finding = rng.choice(np.array(["ok", "ok", "ok", "housekeeping", "over_storage", "concealment_suspected"]), n, p=(0.5, 0.2, 0.1, 0.19, 0.008, 0.002))
+        df = pd.DataFrame({
+            "kind": kind,
+            "site": np.char.add("site-", rng.integers(0, sites, n).astype(str)),
+            "process": processes[rng.integers(0, len(processes), n)],
+            "fatalities": np.where(incident & (rng.random(n) < 0.001), 1, 0),
+            "injuries": np.where(incident, rng.poisson(0.3, n), 0),
+            "major": np.where(kind != "inspection", (rng.random(n) < 0.02).astype(int), 0),
+            "concealment": np.where(incident & (rng.random(n) < 0.001), "suspected", ""),
+            "finding": np.where(kind == "inspection", finding, ""),
+        })
+        if fmt == "jsonl":
+            df.to_json(path, orient="records", lines=True, force_ascii=False, mode=mode if start == 0 else "a")
+        else:
+            df.to_csv(path, index=False, mode=mode if start == 0 else "a", header=start == 0 and not (append and os.path.exists(path)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m risk_engine.incidents", description="사고 / 점검 / 과태료 기록 집계 (후행지표 자동 입력)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="기록 파일을 (증분) 수집하고 사업장별 후행지표 항목을 출력")
+    ingest.add_argument("paths", nargs="+")
+    ingest.add_argument("--state", default=DEFAULT_STATE_PATH)
+    ingest.add_argument("--site", default=ALL_SITES)
+    gen = sub.add_parser("generate", help="합성 기록 파일 생성")
+    gen.add_argument("path")
+    gen.add_argument("--rows", type=int, default=1_000_000)
+    gen.add_argument("--sites", type=int, default=50)
+    gen.add_argument("--seed", type=int, default=0)
+    gen.add_argument("--append", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        generate(args.path, args.rows, args.sites, args.seed, args.append)
+        return 0
+    ledger = IncidentLedger(args.paths, args.state)
+    started = time.perf_counter()
+    rows = ledger.refresh()
+    ledger.save()
+    print(f"새 레코드 {rows:,}건 ({time.perf_counter() - started:.2f}s)", file=sys.stderr)
+    for line in describe(ledger.counts(args.site)):
+        print(line, file=sys.stderr)
+    print(json.dumps(ledger.lagging_fields(args.site), ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
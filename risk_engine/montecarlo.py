@@ -0,0 +1,108 @@
+"""몬테카를로 불확실성 분석: 주관적 입력값에 ±편차를 주어 점수/등급 분포를 계산합니다.
+
+각 정수 입력은 [값 - 편차, 값 + 편차] 범위에서 균등하게 뽑고 허용 범위로 자릅니다.
+모든 표본은 batch.score_batch로 한 번에 평가합니다.
+점수는 정수이므로 결과에는 표본별 점수 배열 대신 (점수, 건수) 분포만 남깁니다. 결과가 캐시와 세션에 오래 남아도
+표본 수와 관계없이 수 KB입니다 (배열로 두면 50만 표본에 3MB).
+"""
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from .batch import (
+    CATEGORY_OPTIONS,
+    LAGGING_FIELDS,
+    LEADING_DOMAINS,
+    LEADING_FIELDS,
+    encode_assessments,
+    score_batch,
+)
+from .scoring import GRADES, LAGGING_STATUSES, SCHEME_ARICELL, get_rules
+
+DEFAULT_SAMPLES = 100_000
+HIGH_GRADE = GRADES.index("높음")
+
+
+@dataclass(frozen=True)
+class UncertaintyResult:
+    samples: int
+    leading_values: np.ndarray # 나온 선행 점수 (오름차순)
+    leading_counts: np.ndarray # 점수별 표본 수
+    lagging_values: np.ndarray
+    lagging_counts: np.ndarray
+    leading_grade_probs: dict # 등급 → 확률
+    lagging_grade_probs: dict # 등급(또는 위험 상태) → 확률
+    p_high_or_worse: float # P(선행 등급 ∈ {높음, 매우 높음})
+    p_very_high: float
+    leading_percentiles: dict # {5: .., 50: .., 95: ..}
+    elapsed: float
+
+    def leading_histogram(self, bins=30):
+        counts, edges = np.histogram(self.leading_values, bins=bins, weights=self.leading_counts)
+        return counts / self.samples, edges
+
+
+def _distribution(scores, dtype):
+    values, counts = np.unique(scores, return_counts=True)
+    return values.astype(dtype), counts.astype(np.int32)
+
+
+def _jitter(rng, column, spread, lo, hi):
+    noise = rng.integers(-spread, spread + 1, column.shape[0], dtype=np.int16)
+    return np.clip(column + noise, lo, hi)
+
+
+def simulate(assessment, leading_spreads=(), fs_spreads=(), lagging_spreads=(), samples=DEFAULT_SAMPLES, seed=0):
+    """leading_spreads/lagging_spreads: ((필드명, 편차), ...), fs_spreads: ((F 편차, S 편차), ...) 위험요인 순서."""
+    return _simulate(assessment, leading_spreads, fs_spreads, lagging_spreads, samples, seed, get_rules())
+
+
+@lru_cache(maxsize=16)
+def _simulate(assessment, leading_spreads, fs_spreads, lagging_spreads, samples, seed, rules):
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    X0, L0, F0, S0 = encode_assessments([assessment])
+
+    X = np.repeat(X0, samples, axis=0)
+    for name, spread in leading_spreads:
+        if spread > 0:
+            j = LEADING_FIELDS.index(name)
+            lo, hi = LEADING_DOMAINS[name]
+            X[:, j] = _jitter(rng, X[:, j], spread, lo, hi)
+
+    F = np.repeat(F0, samples, axis=0)
+    S = np.repeat(S0, samples, axis=0)
+    for j, (f_spread, s_spread) in enumerate(fs_spreads[:F.shape[1]]):
+        if f_spread > 0:
+            F[:, j] = _jitter(rng, F[:, j], f_spread, 1, 5)
+        if s_spread > 0:
+            S[:, j] = _jitter(rng, S[:, j], s_spread, 1, 5)
+
+    L = np.repeat(L0, samples, axis=0)
+    for name, spread in lagging_spreads:
+        if spread > 0:
+            j = LAGGING_FIELDS.index(name)
+            hi = len(CATEGORY_OPTIONS[name]) - 1 if name in CATEGORY_OPTIONS else np.iinfo(np.int32).max
+            L[:, j] = _jitter(rng, L[:, j].astype(np.int64), spread, 0, hi)
+
+    r = score_batch(X, L, F, S, assessment.scheme, rules)
+    lead_probs = np.bincount(r.leading_grade, minlength=len(GRADES)) / samples
+    lag_labels = GRADES if assessment.scheme == SCHEME_ARICELL else LAGGING_STATUSES
+    lag_probs = np.bincount(r.lagging_grade, minlength=len(lag_labels)) / samples
+    p5, p50, p95 = np.percentile(r.leading_score, (5, 50, 95))
+    leading_values, leading_counts = _distribution(r.leading_score, np.int16)
+    lagging_values, lagging_counts = _distribution(r.lagging_score, np.int32)
+
+    return UncertaintyResult(
+        samples=samples,
+        leading_values=leading_values, leading_counts=leading_counts,
+        lagging_values=lagging_values, lagging_counts=lagging_counts,
+        leading_grade_probs=dict(zip(GRADES, lead_probs.tolist())),
+        lagging_grade_probs=dict(zip(lag_labels, lag_probs.tolist())),
+        p_high_or_worse=float(lead_probs[HIGH_GRADE:].sum()),
+        p_very_high=float(lead_probs[-1]),
+        leading_percentiles={5: float(p5), 50: float(p50), 95: float(p95)},
+        elapsed=time.perf_counter() - started,
+    )
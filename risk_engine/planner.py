@@ -0,0 +1,142 @@
+"""위험성 감소 대책 최적 플래너 (섹션 8).
+
+공정 위험요인의 F*S 감소 단가와 전사적 관리 항목의 단계별 개선 단가를 받아,
+선행지표 총점을 목표 등급 경계 이하로 낮추는 최소 비용 조합을 구합니다.
+감소 점수(정수)를 상태로 하는 그룹 배낭(DP) 문제로 정확히 풉니다.
+"""
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from .batch import CATEGORY_OPTIONS, LEADING_DOMAINS, LEADING_FIELDS, encode_assessments, leading_lut
+from .scoring import GRADES, _evaluate, get_rules
+
+
+@dataclass(frozen=True)
+class MitigationPlan:
+    feasible: bool
+    target_grade: str
+    target_score: int # 목표 등급 상한 점수
+    current_score: int
+    planned_score: int
+    total_cost: float
+    jsa_reductions: tuple # ((위험요인, F*S 감소량, 비용), ...)
+    management_changes: tuple # ((필드명, 현재값, 개선값, 비용), ...)
+
+
+def grade_upper_bound(grade, scheme, rules=None):
+    """grade 등급에 드는 가장 높은 (정수) 선행 점수. 가장 나쁜 등급은 상한 없음."""
+    sr = (rules or get_rules()).schemes[scheme]
+    idx = GRADES.index(grade)
+    if idx >= len(sr.leading_edges):
+        return math.inf
+    # edge_in_lower면 경계값까지 이 등급, 아니면 경계값부터 다음 등급 (scoring._grade_index와 같은 규칙)
+    return sr.leading_edges[idx] - (0 if sr.leading_edge_in_lower else 1)
+
+
+def _decode(field, code):
+    return CATEGORY_OPTIONS[field][code] if field in CATEGORY_OPTIONS else int(code)
+
+
+def _groups(assessment, jsa_costs, management_costs, rules):
+    """그룹별 선택지 [(감소 점수, 비용, 설명), ...]. 각 그룹의 0번은 '변경 없음'."""
+    groups = []
+    for (name, _, freq, sev), cost in zip(assessment.leading.jsa_factors, jsa_costs):
+        if cost is None:
+            continue
+        options = [(0, 0.0, (name, 0))]
+        options += [(units, units * cost, (name, units)) for units in range(1, freq * sev + 1)]
+        groups.append(("jsa", options))
+
+    X, _, _, _ = encode_assessments([assessment])
+    lut = leading_lut(assessment.scheme, rules)
+    for field, cost in management_costs:
+        if cost is None:
+            continue
+        j = LEADING_FIELDS.index(field)
+        cur = int(X[0, j])
+        lo, hi = LEADING_DOMAINS[field]
+        options = [(0, 0.0, None)]
+        for new in range(lo, hi + 1):
+            gain = int(lut[j, cur] - lut[j, new])
+            if gain > 0:
+                options.append((gain, abs(new - cur) * cost, (field, _decode(field, cur), _decode(field, new))))
+        if len(options) > 1:
+            groups.append(("mgmt", options))
+    return groups
+
+
+def _solve(groups, need):
+    """감소 점수 need 이상을 달성하는 최소 비용. dp[r] = 감소량 r(need에서 포화)의 최소 비용."""
+    dp = np.full(need + 1, np.inf)
+    dp[0] = 0.0
+    choice = np.zeros((len(groups), need + 1), dtype=np.int32)
+    source = np.zeros((len(groups), need + 1), dtype=np.int32)
+    states = np.arange(need + 1)
+    for g, (_, options) in enumerate(groups):
+        best = dp.copy()
+        best_src = states.copy()
+        best_opt = np.zeros(need + 1, dtype=np.int32)
+        for k, (gain, cost, _) in enumerate(options[1:], 1):
+            cand = np.full(need + 1, np.inf)
+            src = np.zeros(need + 1, dtype=np.int32)
+            if gain < need:
+                cand[gain:need] = dp[:need - gain] + cost
+                src[gain:need] = states[:need - gain]
+            # need 이상 감소는 need 상태로 포화
+            tail = dp[max(need - gain, 0):]
+            t = int(np.argmin(tail))
+            cand[need] = tail[t] + cost
+            src[need] = max(need - gain, 0) + t
+            better = cand < best
+            best[better], best_src[better], best_opt[better] = cand[better], src[better], k
+        dp = best
+        choice[g], source[g] = best_opt, best_src
+    if not np.isfinite(dp[need]):
+        return None
+    picks, r = [], need
+    for g in range(len(groups) - 1, -1, -1):
+        picks.append((g, int(choice[g, r])))
+        r = int(source[g, r])
+    return float(dp[need]), picks
+
+
+def plan_mitigation(assessment, target_grade, jsa_costs, management_costs):
+    """jsa_costs: 위험요인 순서의 F*S 1점 감소 단가 (None이면 조정 불가)
+    management_costs: ((필드명, 1단계 개선 단가), ...)"""
+    return _plan_mitigation(assessment, target_grade, jsa_costs, management_costs, get_rules())
+
+
+@lru_cache(maxsize=256)
+def _plan_mitigation(assessment, target_grade, jsa_costs, management_costs, rules):
+    current = _evaluate(assessment, rules).leading_score
+    bound = grade_upper_bound(target_grade, assessment.scheme, rules)
+    need = max(0, current - int(bound)) if math.isfinite(bound) else 0
+    groups = _groups(assessment, jsa_costs, management_costs, rules)
+    solved = _solve(groups, need) if need else (0.0, [])
+    if solved is None:
+        return MitigationPlan(False, target_grade, bound, current, current, math.inf, (), ())
+
+    total, picks = solved
+    jsa, mgmt, gained = [], [], 0
+    for g, k in sorted(picks):
+        if k == 0:
+            continue
+        kind, options = groups[g]
+        gain, cost, what = options[k]
+        gained += gain
+        if kind == "jsa":
+            jsa.append((what[0], what[1], cost))
+        else:
+            mgmt.append(what + (cost,))
+    return MitigationPlan(True, target_grade, bound, current, current - gained, total, tuple(jsa), tuple(mgmt))
+
+
+def plan_all(assessments, target_grade, jsa_costs, management_costs):
+    """공정별 Assessment 매핑에 대해 각각 최적 계획을 구합니다 (공정별 캐시)."""
+    return {
+        process: plan_mitigation(a, target_grade, tuple(jsa_costs[:len(a.leading.jsa_factors)]), management_costs)
+        for process, a in assessments.items()
+    }
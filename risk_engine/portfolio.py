@@ -0,0 +1,197 @@
+"""포트폴리오 일괄 평가: CSV/Parquet 평가 파일을 고정 크기 청크로 읽어 스트리밍 평가합니다.
+
+파일 전체를 메모리에 올리지 않고 청크 단위로 점수를 계산해 출력 파일에 바로 기록합니다.
+등급별 건수와 최악 N개 사이트는 힙으로 누적 집계합니다(전체 결과 정렬 없음).
+입력 열 이름은 LeadingInputs/LaggingInputs 필드명과 같고, 공정 위험요인 F/S는 freq_1, sev_1, ... 열을 사용합니다.
+"""
+import heapq
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from .batch import (
+    LAGGING_DEFAULTS,
+    LAGGING_FIELDS,
+    LEADING_DEFAULTS,
+    LEADING_FIELDS,
+    encode_lagging,
+    encode_leading,
+    lagging_labels,
+    leading_labels,
+    score_batch,
+)
+from .scoring import GRADES, LAGGING_STATUSES, SCHEME_ARICELL, SCHEME_FS
+
+DEFAULT_CHUNK_SIZE = 100_000
+ID_COLUMNS = ("site", "process")
+RESULT_COLUMNS = ID_COLUMNS + ("leading_score", "leading_grade", "jsa_total", "lagging_score", "lagging_grade")
+_FS_COLUMN = re.compile(r"^(freq|sev)_(\d+)$")
+
+
+def detect_format(name):
+    ext = os.path.splitext(str(name).lower())[1]
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    if ext in (".csv", ".txt", ".gz"):
+        return "csv"
+    raise ValueError(f"지원하지 않는 파일 형식: {name} (CSV 또는 Parquet)")
+
+
+# --- 1. 청크 읽기 (generator) ---
+def iter_chunks(source, fmt="csv", chunk_size=DEFAULT_CHUNK_SIZE):
+    """(DataFrame 청크, 진행률 0~1) 을 순서대로 생성합니다. source는 경로 또는 바이너리 파일 객체입니다."""
+    if fmt == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet 파일을 읽으려면 pyarrow가 필요합니다: pip install pyarrow") from e
+        pf = pq.ParquetFile(source)
+        total = max(pf.metadata.num_rows, 1)
+        done = 0
+        for batch in pf.iter_batches(batch_size=chunk_size):
+            done += batch.num_rows
+            yield batch.to_pandas(), done / total
+        return
+
+    size = _source_size(source)
+    with pd.read_csv(source, chunksize=chunk_size) as reader:
+        for chunk in reader:
+            yield chunk, _position(source, reader) / size if size else 0.0
+
+
+def _source_size(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if hasattr(source, "seek") and hasattr(source, "tell"):
+        pos = source.tell()
+        source.seek(0, os.SEEK_END)
+        size = source.tell()
+        source.seek(pos)
+        return size
+    return 0
+
+
+def _position(source, reader):
+    handle = source if hasattr(source, "tell") else getattr(getattr(reader, "handles", None), "handle", None)
+    try:
+        return handle.tell() if handle is not None else 0
+    except (OSError, ValueError):
+        return 0
+
+
+# --- 2. 청크 평가 ---
+def score_chunk(df, scheme=SCHEME_FS, offset=0):
+    """df 한 청크를 평가합니다. offset: 파일 전체에서 이 청크 첫 행의 순번 (site 열이 없을 때 행 순번을 site로 씀)."""
+    n = len(df)
+    leading_cols = {name: _filled(df, name, LEADING_DEFAULTS[name]) for name in LEADING_FIELDS if name in df}
+    lagging_cols = {name: _filled(df, name, LAGGING_DEFAULTS[name]) for name in LAGGING_FIELDS if name in df}
+    X = encode_leading(leading_cols) if leading_cols else encode_leading({}).repeat(n, axis=0)
+    L = encode_lagging(lagging_cols) if lagging_cols else encode_lagging({}).repeat(n, axis=0)
+    freq, sev = _fs_matrices(df)
+    r = score_batch(X, L, freq, sev, scheme)
+
+    out = pd.DataFrame({
+        "site": df["site"].to_numpy() if "site" in df else np.arange(offset, offset + n),
+        "process": df["process"].to_numpy() if "process" in df else "",
+        "leading_score": r.leading_score,
+        "leading_grade": leading_labels(r.leading_grade),
+        "jsa_total": r.jsa_total,
+        "lagging_score": r.lagging_score,
+        "lagging_grade": lagging_labels(r.lagging_grade, scheme),
+    })
+    return out, r
+
+
+def _filled(df, name, default):
+    col = df[name]
+    return col.fillna(default).to_numpy() if col.isna().any() else col.to_numpy()
+
+
+def _fs_matrices(df):
+    idx = sorted({int(m.group(2)) for m in map(_FS_COLUMN.match, df.columns) if m})
+    if not idx:
+        return None, None
+    freq = np.zeros((len(df), len(idx)), dtype=np.int8)
+    sev = np.zeros((len(df), len(idx)), dtype=np.int8)
+    for j, i in enumerate(idx):
+        if f"freq_{i}" not in df or f"sev_{i}" not in df:
+            raise ValueError(f"freq_{i}/sev_{i}: 빈도(F)와 강도(S) 열은 짝으로 있어야 합니다.")
+        f = df[f"freq_{i}"].to_numpy(dtype=np.float64, na_value=np.nan)
+        s = df[f"sev_{i}"].to_numpy(dtype=np.float64, na_value=np.nan)
+        # F/S가 둘 다 비어 있는 요인만 0으로 두어 F*S 합산에서 제외. 적힌 값은 1~5 정수여야 함 (0, 소수, 한쪽만 빈 값은 오류)
+        given = ~(np.isnan(f) & np.isnan(s))
+        values = np.concatenate([f[given], s[given]])
+        if not ((values >= 1) & (values <= 5) & (values == np.trunc(values))).all():
+            raise ValueError(f"freq_{i}/sev_{i}: 빈도(F)/강도(S)는 1~5 정수여야 합니다.")
+        freq[given, j] = f[given]
+        sev[given, j] = s[given]
+    return freq, sev
+
+
+# --- 3. 누적 집계 (등급별 건수 + 최악 N개 사이트 힙) ---
+class PortfolioSummary:
+    def __init__(self, worst_n=20, scheme=SCHEME_FS):
+        self.worst_n = worst_n
+        self.scheme = scheme
+        self.rows = 0
+        self.leading_counts = np.zeros(len(GRADES), dtype=np.int64)
+        lagging_labels_ = GRADES if scheme == SCHEME_ARICELL else LAGGING_STATUSES
+        self.lagging_counts = np.zeros(len(lagging_labels_), dtype=np.int64)
+        self._lagging_labels = lagging_labels_
+        self._heap = [] # (선행 점수, 후행 점수, 순번, site, process) 최소 힙
+        self._seq = 0
+
+    def update(self, frame, result):
+        n = len(frame)
+        self.leading_counts += np.bincount(result.leading_grade, minlength=len(self.leading_counts))
+        self.lagging_counts += np.bincount(result.lagging_grade, minlength=len(self.lagging_counts))
+        if self.worst_n and n:
+            # 청크 내 상위 후보만 추려 힙에 넣음
+            k = min(self.worst_n, n)
+            cand = np.argpartition(result.leading_score, n - k)[n - k:]
+            sites, processes = frame["site"].to_numpy(), frame["process"].to_numpy()
+            for i in cand:
+                item = (int(result.leading_score[i]), int(result.lagging_score[i]), self._seq + int(i), sites[i], processes[i])
+                if len(self._heap) < self.worst_n:
+                    heapq.heappush(self._heap, item)
+                elif item[:2] > self._heap[0][:2]:
+                    heapq.heapreplace(self._heap, item)
+        self._seq += n
+        self.rows += n
+
+    def grade_counts(self):
+        return dict(zip(GRADES, self.leading_counts.tolist()))
+
+    def lagging_counts_by_label(self):
+        return dict(zip(self._lagging_labels, self.lagging_counts.tolist()))
+
+    def worst(self):
+        rows = sorted(self._heap, key=lambda item: (item[0], item[1]), reverse=True)
+        return [
+            {"site": site, "process": process, "leading_score": lead, "lagging_score": lag}
+            for lead, lag, _, site, process in rows
+        ]
+
+
+# --- 4. 파이프라인: 읽기 → 평가 → 출력 파일 기록 + 집계 ---
+def score_stream(chunks, scheme=SCHEME_FS):
+    offset = 0
+    for df, progress in chunks:
+        frame, result = score_chunk(df, scheme, offset)
+        offset += len(df)
+        yield frame, result, progress
+
+
+def score_file(source, out_path, fmt="csv", chunk_size=DEFAULT_CHUNK_SIZE, worst_n=20, scheme=SCHEME_FS, on_progress=None):
+    summary = PortfolioSummary(worst_n, scheme)
+    with open(out_path, "w", encoding="utf-8-sig", newline="") as out:
+        header = True
+        for frame, result, progress in score_stream(iter_chunks(source, fmt, chunk_size), scheme):
+            frame.to_csv(out, header=header, index=False)
+            header = False
+            summary.update(frame, result)
+            if on_progress is not None:
+                on_progress(progress, summary.rows)
+    return summary
@@ -0,0 +1,93 @@
+"""RCA 강화된 선행지표 제안(12개)의 조합별 예상 위험도 감소 순위.
+
+각 제안을 선행지표 입력 변화(항목 → 목표값)로 정의하고, 2^12 = 4096개 조합 전체를 한 번에 평가합니다.
+같은 항목을 여러 제안이 바꾸면 위험 점수가 가장 낮은 값을 적용합니다. 현재 값이 더 좋으면 그대로 둡니다.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from .batch import CATEGORY_OPTIONS, LEADING_FIELDS, encode_assessments, jsa_totals, leading_grade_codes, leading_lut, management_scores
+from .scoring import GRADES, get_rules
+
+# --- 강화된 선행지표 제안 → 입력 변화 ---
+ENHANCE_OPTIONS = {
+    "JSA(작업안전분석) 수행 완성도 높임": (("jsa_performance", 5),),
+    "작업표준서(SOP) 준수도 강화": (("sops_compliance", 5),),
+    "작업허가제(PTW) 엄격 적용": (("ptw_compliance", 5),),
+    "배터리 보관 온도/습도 자동 센서 및 경고 시스템 도입": (("equip_inspection_cycle", 5),),
+    "정전기 발생 가능성 평가 및 방지 대책 강화": (("equip_condition", 5),),
+    "방폭 환기 시스템 점검 및 보강": (("env_ventilation", 5),),
+    "리튬 특성 및 비상 대응 훈련 강화 (월 1회 이상)": (("chemical_mgmt_msds", 5), ("worker_safety_education_freq", 2)),
+    "피난 유도등 및 비상 대피 경로 확보/훈련 강화": (("env_orderliness", 5),),
+    "전사적 정기 안전점검 의무화 및 실질 점검 강화": (("safety_inspection_status", "정기점검 완벽"),),
+    "배터리 전용 특수 소화기 비치 및 소방 시설 보강": (("special_extinguisher_presence", "보유"), ("fire_facility_adequacy", "기준 초과 설치")),
+    "위험물질 저장/취급 규정 준수 및 실시간 모니터링": (("chemical_mgmt_storage", 5),),
+    "파견직 포함 전 직원에 대한 철저한 안전 교육 실시": (("worker_safety_education_freq", 4), ("worker_safety_compliance", 5)),
+}
+OPTION_NAMES = tuple(ENHANCE_OPTIONS)
+N_COMBOS = 1 << len(OPTION_NAMES)
+
+
+def _code(field, value):
+    return CATEGORY_OPTIONS[field].index(value) if field in CATEGORY_OPTIONS else value
+
+
+# (제안 번호, 열 번호, 목표 코드)
+_DELTAS = tuple(
+    (k, LEADING_FIELDS.index(field), _code(field, value))
+    for k, name in enumerate(OPTION_NAMES)
+    for field, value in ENHANCE_OPTIONS[name]
+)
+_MASKS = np.arange(N_COMBOS)
+_SIZES = np.array([bin(m).count("1") for m in range(N_COMBOS)])
+
+
+@dataclass(frozen=True)
+class EnhancementRanking:
+    scores: np.ndarray # 조합(비트마스크) → 예상 선행지표 총점
+    grades: np.ndarray # GRADES 인덱스
+    best_by_size: tuple # ((제안 수, 마스크, 점수), ...) 0~12개
+    pareto: tuple # 제안 수를 늘릴 때 점수가 실제로 낮아지는 조합만
+
+    def mask_of(self, selected):
+        return sum(1 << k for k, name in enumerate(OPTION_NAMES) if name in selected)
+
+    def score_of(self, selected):
+        return int(self.scores[self.mask_of(selected)])
+
+    def grade_of(self, selected):
+        return GRADES[self.grades[self.mask_of(selected)]]
+
+    @staticmethod
+    def names(mask):
+        return [name for k, name in enumerate(OPTION_NAMES) if mask >> k & 1]
+
+
+def rank_enhancements(assessment):
+    """현재 입력 기준 4096개 조합 전체의 예상 선행지표 점수와 파레토 최적 조합 (입력/규칙별 캐시)."""
+    return _rank_enhancements(assessment, get_rules())
+
+
+@lru_cache(maxsize=256)
+def _rank_enhancements(assessment, rules):
+    lut = leading_lut(assessment.scheme, rules)
+    X0, _, F, S = encode_assessments([assessment])
+    X = np.repeat(X0, N_COMBOS, axis=0)
+    for k, j, target in _DELTAS:
+        rows = (_MASKS >> k & 1).astype(bool)
+        col = X[rows, j]
+        X[rows, j] = np.where(lut[j, target] < lut[j, col], target, col)
+    scores = management_scores(X, assessment.scheme, rules) + int(jsa_totals(F, S)[0])
+    grades = leading_grade_codes(scores, assessment.scheme, rules)
+
+    best, pareto, best_so_far = [], [], None
+    for size in range(len(OPTION_NAMES) + 1):
+        candidates = np.nonzero(_SIZES == size)[0]
+        mask = int(candidates[np.argmin(scores[candidates])])
+        best.append((size, mask, int(scores[mask])))
+        if best_so_far is None or scores[mask] < best_so_far:
+            pareto.append((size, mask, int(scores[mask])))
+            best_so_far = scores[mask]
+    return EnhancementRanking(scores, grades, tuple(best), tuple(pareto))
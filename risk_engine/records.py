@@ -0,0 +1,124 @@
+"""JSON/dict 레코드 ↔ 평가 입력 레코드 변환 및 입력값 검증."""
+import math
+
+from .scoring import (
+    CATEGORY_OPTIONS,
+    LAGGING_FIELDS,
+    LEADING_DOMAINS,
+    LEADING_FIELDS,
+    SCHEME_FS,
+    SCHEMES,
+    Assessment,
+    LaggingInputs,
+    LeadingInputs,
+)
+
+# 정수 입력 허용 범위 (양 끝 포함, None은 상한 없음)
+_RANGES = {name: LEADING_DOMAINS[name] for name in LEADING_FIELDS if name not in CATEGORY_OPTIONS}
+_RANGES["past_fatalities_count"] = (0, None)
+_RANGES["past_injuries_count"] = (0, None)
+
+
+def _check(name, value):
+    if name in CATEGORY_OPTIONS:
+        if not isinstance(value, str) or value not in CATEGORY_OPTIONS[name]:
+            raise ValueError(f"{name}: {value!r}는 허용된 선택지가 아닙니다 {list(CATEGORY_OPTIONS[name])}")
+        return value
+    # JSON의 1e999 → inf, 1.5 등은 정수로 바꾸지 않고 거부 (int(inf)는 OverflowError)
+    if isinstance(value, bool) or not (isinstance(value, int) or (isinstance(value, float) and math.isfinite(value) and value.is_integer())):
+        raise ValueError(f"{name}: 정수가 필요합니다 ({value!r})")
+    lo, hi = _RANGES[name]
+    if value < lo or (hi is not None and value > hi):
+        raise ValueError(f"{name}: {value}는 허용 범위({lo}~{hi if hi is not None else ''}) 밖입니다")
+    return int(value)
+
+
+def _check_fs(value, what):
+    if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= 5:
+        raise ValueError(f"{what}: 빈도/강도는 1~5 정수여야 합니다 ({value!r})")
+    return value
+
+
+def _jsa_factors(record):
+    factors = record.get("jsa_factors")
+    if factors is not None:
+        if not isinstance(factors, (list, tuple)):
+            raise ValueError(f"jsa_factors: 위험요인 목록이 필요합니다 ({factors!r})")
+        out = []
+        for i, f in enumerate(factors, 1):
+            if isinstance(f, dict):
+                name, rtype, freq, sev = f.get("name", f"요인{i}"), f.get("type", ""), f.get("freq"), f.get("sev")
+            elif isinstance(f, (list, tuple)) and len(f) == 4:
+                name, rtype, freq, sev = f
+            else:
+                raise ValueError(f"jsa_factors {i}번째: {{name, type, freq, sev}} 객체나 [이름, 유형, F, S]가 필요합니다 ({f!r})")
+            out.append((str(name), str(rtype), _check_fs(freq, f"{name} (F)"), _check_fs(sev, f"{name} (S)")))
+        return tuple(out)
+    # portfolio 파일과 같은 freq_N / sev_N 열 형식
+    out = []
+    i = 1
+    while f"freq_{i}" in record or f"sev_{i}" in record:
+        out.append((f"요인{i}", "", _check_fs(record.get(f"freq_{i}"), f"freq_{i}"), _check_fs(record.get(f"sev_{i}"), f"sev_{i}")))
+        i += 1
+    return tuple(out)
+
+
+def assessment_from_record(record, scheme=SCHEME_FS):
+    """평면 dict(LeadingInputs/LaggingInputs 필드명)를 검증하여 Assessment로 변환합니다. 없는 항목은 기본값을 사용합니다."""
+    scheme = record.get("scheme", scheme)
+    if scheme not in SCHEMES:
+        raise ValueError(f"scheme: 알 수 없는 평가 방식 {scheme!r} {list(SCHEMES)}")
+    leading = {name: _check(name, record[name]) for name in LEADING_FIELDS if name in record}
+    lagging = {name: _check(name, record[name]) for name in LAGGING_FIELDS if name in record}
+    return Assessment(
+        leading=LeadingInputs(jsa_factors=_jsa_factors(record), **leading),
+        lagging=LaggingInputs(**lagging),
+        scheme=scheme,
+        process=str(record.get("process", "")),
+    )
+
+
+def result_to_record(result, details=False):
+    out = {
+        "leading_score": result.leading_score,
+        "leading_grade": result.leading_grade,
+        "jsa_total": result.jsa_total,
+        "management_score": result.management_score,
+        "lagging_score": result.lagging_score,
+        "lagging_grade": result.lagging_grade,
+    }
+    if details:
+        out["jsa_details"] = result.jsa_records()
+    return out
+
+
+# --- 압축 코드 표현 (이력 저장용): [선행 코드 22개, [[F, S], ...], 후행 코드 9개] ---
+def _to_code(name, value):
+    return CATEGORY_OPTIONS[name].index(value) if name in CATEGORY_OPTIONS else value
+
+
+def _from_code(name, code):
+    return CATEGORY_OPTIONS[name][code] if name in CATEGORY_OPTIONS else code
+
+
+def assessment_to_codes(assessment):
+    li, lg = assessment.leading, assessment.lagging
+    return [
+        [_to_code(name, getattr(li, name)) for name in LEADING_FIELDS],
+        [[freq, sev] for _, _, freq, sev in li.jsa_factors],
+        [_to_code(name, getattr(lg, name)) for name in LAGGING_FIELDS],
+    ]
+
+
+def assessment_from_codes(codes, scheme=SCHEME_FS, process="", factor_names=()):
+    leading, fs, lagging = codes
+    names = list(factor_names) + [(f"요인{i + 1}", "") for i in range(len(factor_names), len(fs))]
+    return Assessment(
+        leading=LeadingInputs(
+            jsa_factors=tuple((name, rtype, freq, sev) for (name, rtype), (freq, sev) in zip(names, fs)),
+            **{name: _from_code(name, c) for name, c in zip(LEADING_FIELDS, leading)},
+        ),
+        lagging=LaggingInputs(**{name: _from_code(name, c) for name, c in zip(LAGGING_FIELDS, lagging)}),
+        scheme=scheme,
+        process=process,
+    )
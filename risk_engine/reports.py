@@ -0,0 +1,354 @@
+"""평가 보고서 내보내기 (PDF / XLSX): 한 건, 또는 저장된 평가 전체를 사업장별 보고서로.
+
+보고서 한 부는 한 사업장의 공정별 평가(한 건 이상)를 담습니다: 요약(선행/후행 점수와 등급), 선행 vs. 후행 비교 차트,
+공정 위험요인(F*S) 상세 표, 입력값. PDF는 matplotlib(PdfPages)으로, XLSX는 openpyxl로 씁니다 (openpyxl은 XLSX에만 필요).
+
+저장된 평가 전체(HistoryStore.latest)를 내보낼 때는 사업장별 보고서를 ProcessPoolExecutor로 나눠 그립니다.
+matplotlib 렌더링은 CPU를 쓰고 GIL을 잡으므로 스레드로는 빨라지지 않습니다. 작업자는 spawn으로 띄워 Streamlit 서버의
+스레드 / 잠금 상태를 물려받지 않고, 차트는 ChartStore(내용 주소 디스크 캐시)에 두어 점수 / 등급 / 공정이 같은 차트는
+어느 작업자든 한 번만 그립니다.
+    python -m risk_engine.reports --db risk_history.db --out reports/ --format pdf xlsx [--workers N]
+"""
+import argparse
+import csv
+import io
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+from .charts import ChartStore, comparison_chart, warm_up
+from .scoring import (
+    JSA_DETAIL_COLUMNS,
+    LAGGING_FIELD_LABELS,
+    LAGGING_STATUSES,
+    LEADING_FIELD_LABELS,
+    SCHEME_ARICELL,
+    SCHEME_FS,
+    evaluate,
+)
+
+REPORT_FORMATS = ("pdf", "xlsx")
+MIME_TYPES = {
+    "pdf": "application/pdf",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "zip": "application/zip",
+}
+DEFAULT_CHART_DIR = os.environ.get("RISK_CHART_STORE", os.path.join(tempfile.gettempdir(), "risk_chart_store"))
+DEFAULT_WORKERS = os.cpu_count() or 1
+A4_INCHES = (8.27, 11.69)
+SUMMARY_COLUMNS = ("사업장", "공정", "평가 방식", "평가 시각", "선행 점수", "선행 등급", "관리 수준 점수", "위험요인 합계", "후행 점수", "후행 등급/상태", "보고서")
+# 페이지와 같은 기준: 후행지표가 이 등급/상태이면 비교 차트에 아리셀 사고 부실 사례 주석
+ANNOTATE_LAGGING = {SCHEME_ARICELL: ("높음", "매우 높음"), SCHEME_FS: tuple(LAGGING_STATUSES[2:])}
+
+
+@dataclass(frozen=True, slots=True)
+class ReportEntry:
+    assessment: object # Assessment
+    ts: float = 0.0 # 평가 시각 (0이면 보고서를 만든 시각)
+
+
+@dataclass(frozen=True, slots=True)
+class ReportJob:
+    site: str
+    entries: tuple # ReportEntry, 공정 순
+
+
+def xlsx_available():
+    try:
+        import openpyxl # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def jobs_from_history(store, since=None):
+    """이력 저장소의 사업장+공정별 최근 평가를 사업장별 ReportJob으로 묶습니다."""
+    jobs, entries, site = [], [], None
+    for rec in store.latest(since):
+        if entries and rec["site"] != site:
+            jobs.append(ReportJob(site, tuple(entries)))
+            entries = []
+        site = rec["site"]
+        entries.append(ReportEntry(rec["assessment"], rec["ts"]))
+    if entries:
+        jobs.append(ReportJob(site, tuple(entries)))
+    return jobs
+
+
+# --- 보고서 한 부 그리기 ---
+_store = None # 작업자 프로세스의 ChartStore (_init_worker), 없으면 프로세스 메모리 캐시만 사용
+
+
+def _init_worker(chart_dir):
+    global _store
+    _store = ChartStore(chart_dir) if chart_dir else None
+    warm_up()
+
+
+def _comparison_png(assessment, result):
+    title = f"'{assessment.process}' 공정 위험도 비교" + (" (등급 기반)" if assessment.scheme == SCHEME_ARICELL else "")
+    annotate = result.lagging_grade in ANNOTATE_LAGGING.get(assessment.scheme, ())
+    args = (title, result.leading_score, result.leading_grade, result.lagging_score, result.lagging_grade, annotate)
+    if _store is None:
+        return comparison_chart(*args)
+    return _store.get_or_render(("comparison", "png") + args, lambda: comparison_chart(*args))
+
+
+def _summary_row(site, entry, result, ts, file_name=""):
+    a = entry.assessment
+    return (
+        site or "(미지정)", a.process, a.scheme, time.strftime("%Y-%m-%d %H:%M", time.localtime(ts)),
+        result.leading_score, result.leading_grade, result.management_score, result.jsa_total,
+        result.lagging_score, result.lagging_grade, file_name,
+    )
+
+
+def _input_rows(assessment):
+    li, lg = assessment.leading, assessment.lagging
+    rows = [("선행", label, getattr(li, field)) for field, label in LEADING_FIELD_LABELS.items()]
+    rows += [("후행", label, getattr(lg, field)) for field, label in LAGGING_FIELD_LABELS.items()]
+    return rows
+
+
+def _evaluated(job, now):
+    """(평가, 결과, 시각, 비교 차트 PNG) 목록. 차트는 PDF / XLSX가 함께 씁니다."""
+    out = []
+    for entry in job.entries:
+        result = evaluate(entry.assessment)
+        out.append((entry, result, entry.ts or now, _comparison_png(entry.assessment, result)))
+    return out
+
+
+def _render_pdf(job, evaluated):
+    import numpy as np
+    from PIL import Image
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+
+    buf = io.BytesIO()
+    with PdfPages(buf) as pdf:
+        for entry, result, ts, png in evaluated:
+            a = entry.assessment
+            fig = Figure(figsize=A4_INCHES)
+            fig.text(0.07, 0.95, "배터리 공정 위험성 평가 보고서", fontsize=16, weight="bold")
+            fig.text(0.07, 0.925, f"사업장: {job.site or '(미지정)'} · 공정: {a.process} · 평가 방식: {a.scheme} · "
+                                  f"평가 시각: {time.strftime('%Y-%m-%d %H:%M', time.localtime(ts))}", fontsize=9, color="dimgray")
+            fig.text(0.07, 0.885, f"선행지표: {result.leading_score}점 · 등급 {result.leading_grade}"
+                                  f" (관리 수준 {result.management_score}점 + 공정 위험요인 합계 {result.jsa_total}점)", fontsize=11)
+            fig.text(0.07, 0.86, f"후행지표: {result.lagging_score}점 · {result.lagging_grade}", fontsize=11)
+            chart = fig.add_axes((0.07, 0.47, 0.86, 0.37))
+            with Image.open(io.BytesIO(png)) as image: # uint8 그대로 (imread는 float32로 4배)
+                chart.imshow(np.asarray(image))
+            chart.axis("off")
+            details = fig.add_axes((0.07, 0.05, 0.86, 0.38))
+            details.axis("off")
+            details.set_title("공정별 위험요인 상세 (빈도 x 강도)", loc="left", fontsize=11)
+            if result.jsa_details:
+                table = details.table(cellText=[list(map(str, row)) for row in result.jsa_details], colLabels=JSA_DETAIL_COLUMNS,
+                                      colWidths=(0.46, 0.18, 0.12, 0.12, 0.12), loc="upper center", cellLoc="left")
+                table.auto_set_font_size(False)
+                table.set_fontsize(8)
+            else:
+                details.text(0, 0.95, "공정 위험요인 F/S 입력 없음", fontsize=9, va="top")
+            pdf.savefig(fig)
+            fig.clear()
+
+            fig = Figure(figsize=A4_INCHES)
+            inputs = fig.add_axes((0.07, 0.04, 0.86, 0.9))
+            inputs.axis("off")
+            inputs.set_title(f"입력값 — {a.process}", loc="left", fontsize=11)
+            table = inputs.table(cellText=[[kind, label, str(value)] for kind, label, value in _input_rows(a)],
+                                 colLabels=("구분", "항목", "값"), colWidths=(0.1, 0.55, 0.35), loc="upper center", cellLoc="left")
+            table.auto_set_font_size(False)
+            table.set_fontsize(8)
+            pdf.savefig(fig)
+            fig.clear()
+    return buf.getvalue()
+
+
+def _sheet_title(name, used):
+    title = re.sub(r"[\[\]:*?/\\]", "_", name)[:28] or "평가"
+    base, n = title, 2
+    while title in used:
+        title, n = f"{base}_{n}", n + 1
+    used.add(title)
+    return title
+
+
+def _render_xlsx(job, evaluated):
+    try:
+        from openpyxl import Workbook
+        from openpyxl.drawing.image import Image
+        from openpyxl.styles import Font
+    except ImportError as e:
+        raise ImportError("XLSX 보고서를 만들려면 openpyxl이 필요합니다: pip install openpyxl") from e
+
+    wb = Workbook()
+    summary = wb.active
+    summary.title = "요약"
+    summary.append(SUMMARY_COLUMNS[:-1])
+    for entry, result, ts, _ in evaluated:
+        summary.append(_summary_row(job.site, entry, result, ts)[:-1])
+    bold = Font(bold=True)
+    for cell in summary[1]:
+        cell.font = bold
+
+    used = {"요약"}
+    for entry, result, _, png in evaluated:
+        a = entry.assessment
+        ws = wb.create_sheet(_sheet_title(a.process, used))
+        ws.append(JSA_DETAIL_COLUMNS)
+        for row in result.jsa_details:
+            ws.append(list(row))
+        ws.append(())
+        start = ws.max_row + 1
+        ws.append(("구분", "항목", "값"))
+        for row in _input_rows(a):
+            ws.append(row)
+        for cell in (*ws[1], *ws[start]):
+            cell.font = bold
+        ws.column_dimensions["A"].width = 36
+        ws.column_dimensions["B"].width = 34
+        image = Image(io.BytesIO(png))
+        scale = 560 / image.width # 200 dpi 원본을 시트에서 읽기 좋은 폭으로
+        image.width, image.height = image.width * scale, image.height * scale
+        ws.add_image(image, "G2")
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+_RENDERERS = {"pdf": _render_pdf, "xlsx": _render_xlsx}
+
+
+def render_report(job, fmt="pdf"):
+    """보고서 한 부를 바이트로 만듭니다 (호출한 프로세스에서 바로 그림). 페이지의 다운로드 버튼용."""
+    if fmt not in _RENDERERS:
+        raise ValueError(f"지원하지 않는 보고서 형식: {fmt!r} (가능: {REPORT_FORMATS})")
+    warm_up()
+    return _RENDERERS[fmt](job, _evaluated(job, time.time()))
+
+
+def report_for(assessment, site="", ts=0.0):
+    """평가 한 건짜리 ReportJob."""
+    return ReportJob(site, (ReportEntry(assessment, ts),))
+
+
+# --- 일괄 내보내기 (프로세스 풀) ---
+def _file_stem(index, site):
+    return f"{index:04d}_{re.sub(r'[^0-9A-Za-z가-힣._-]+', '_', site).strip('_') or '사업장미지정'}"
+
+
+def _write_report(index, job, out_dir, formats):
+    """작업자 프로세스에서 실행: 보고서 파일을 쓰고 (파일 이름들, 요약 행들, 차트 캐시 적중/생성 수)를 돌려줍니다."""
+    hits, misses = (_store.hits, _store.misses) if _store is not None else (0, 0)
+    evaluated = _evaluated(job, time.time())
+    stem = _file_stem(index, job.site)
+    names = []
+    for fmt in formats:
+        name = f"{stem}.{fmt}"
+        with open(os.path.join(out_dir, name), "wb") as f:
+            f.write(_RENDERERS[fmt](job, evaluated))
+        names.append(name)
+    rows = [_summary_row(job.site, entry, result, ts, " / ".join(names)) for entry, result, ts, _ in evaluated]
+    if _store is not None:
+        hits, misses = _store.hits - hits, _store.misses - misses
+    return names, rows, hits, misses
+
+
+@dataclass(frozen=True, slots=True)
+class ExportResult:
+    files: tuple
+    summary_path: str
+    reports: int
+    workers: int
+    elapsed: float
+    chart_hits: int
+    chart_misses: int
+
+
+def export_portfolio(jobs, out_dir, formats=REPORT_FORMATS, workers=DEFAULT_WORKERS, chart_dir=DEFAULT_CHART_DIR, progress=None):
+    """사업장별 보고서를 out_dir에 쓰고 전체 요약(summary.csv)을 남깁니다. workers가 1이면 풀 없이 이 프로세스에서 그립니다.
+    progress(완료 수, 전체 수)는 보고서 한 부가 끝날 때마다 불립니다."""
+    for fmt in formats:
+        if fmt not in _RENDERERS:
+            raise ValueError(f"지원하지 않는 보고서 형식: {fmt!r} (가능: {REPORT_FORMATS})")
+    if "xlsx" in formats and not xlsx_available():
+        raise ImportError("XLSX 보고서를 만들려면 openpyxl이 필요합니다: pip install openpyxl")
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = list(jobs)
+    workers = max(1, min(workers, len(jobs)))
+    started = time.perf_counter()
+    results = [None] * len(jobs)
+    if workers == 1:
+        _init_worker(chart_dir)
+        for i, job in enumerate(jobs):
+            results[i] = _write_report(i + 1, job, out_dir, formats)
+            if progress:
+                progress(i + 1, len(jobs))
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(chart_dir,)) as pool:
+            futures = {pool.submit(_write_report, i + 1, job, out_dir, formats): i for i, job in enumerate(jobs)}
+            for done, future in enumerate(as_completed(futures), 1):
+                results[futures[future]] = future.result()
+                if progress:
+                    progress(done, len(jobs))
+
+    summary_path = os.path.join(out_dir, "summary.csv")
+    with open(summary_path, "w", encoding="utf-8-sig", newline="") as f: # Excel에서 바로 열리도록 BOM
+        writer = csv.writer(f)
+        writer.writerow(SUMMARY_COLUMNS)
+        for _, rows, _, _ in results:
+            writer.writerows(rows)
+    return ExportResult(
+        files=tuple(name for names, _, _, _ in results for name in names), summary_path=summary_path, reports=len(jobs),
+        workers=workers, elapsed=time.perf_counter() - started,
+        chart_hits=sum(r[2] for r in results), chart_misses=sum(r[3] for r in results),
+    )
+
+
+def export_portfolio_zip(jobs, formats=REPORT_FORMATS, workers=DEFAULT_WORKERS, chart_dir=DEFAULT_CHART_DIR):
+    """export_portfolio 결과(보고서 + summary.csv)를 ZIP 바이트로. 페이지의 다운로드 버튼용."""
+    with tempfile.TemporaryDirectory() as tmp:
+        result = export_portfolio(jobs, tmp, formats, workers, chart_dir)
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name in result.files + (os.path.basename(result.summary_path),):
+                zf.write(os.path.join(tmp, name), name)
+    return buf.getvalue()
+
+
+def main(argv=None):
+    from .history import DEFAULT_PATH, HistoryStore
+
+    parser = argparse.ArgumentParser(prog="python -m risk_engine.reports", description="저장된 평가를 사업장별 PDF / XLSX 보고서로 내보냅니다.")
+    parser.add_argument("--db", default=DEFAULT_PATH, help="평가 이력 DB (기본: RISK_HISTORY_DB 또는 risk_history.db)")
+    parser.add_argument("--out", default="reports", help="보고서를 쓸 디렉터리")
+    parser.add_argument("--format", nargs="+", choices=REPORT_FORMATS, default=list(REPORT_FORMATS))
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="보고서를 그릴 프로세스 수 (기본: CPU 코어 수)")
+    parser.add_argument("--since-days", type=float, help="최근 N일 안의 평가만")
+    parser.add_argument("--chart-dir", default=DEFAULT_CHART_DIR, help="차트 디스크 캐시 (기본: RISK_CHART_STORE 또는 임시 디렉터리)")
+    args = parser.parse_args(argv)
+
+    since = time.time() - args.since_days * 86400 if args.since_days else None
+    with HistoryStore(args.db) as store:
+        jobs = jobs_from_history(store, since)
+    if not jobs:
+        print("내보낼 평가가 없습니다.", file=sys.stderr)
+        return 1
+    result = export_portfolio(jobs, args.out, tuple(args.format), args.workers, args.chart_dir,
+                              progress=lambda done, total: print(f"\r{done}/{total}", end="", file=sys.stderr))
+    print(f"\n보고서 {result.reports}부 ({len(result.files)}개 파일) {result.elapsed:.1f}s · 작업자 {result.workers}개 · "
+          f"차트 캐시 적중 {result.chart_hits} / 새로 그림 {result.chart_misses} → {os.path.abspath(args.out)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
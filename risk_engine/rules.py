@@ -0,0 +1,83 @@
+"""평가 규칙 파일 로더 (변경 시 자동 재컴파일).
+
+가중치 / 범주 점수 / 등급 경계는 버전이 붙은 규칙 파일(JSON, PyYAML이 있으면 YAML도 가능)에 두고,
+읽을 때 한 번 compiler 함수로 점수표(LUT)로 변환합니다. 파일 수정 시각이 바뀌면 다음 get() 호출에서
+다시 컴파일해 교체하므로 서버를 재시작하지 않아도 됩니다. 수정 시각 확인은 check_interval 초에
+한 번만 하므로 평가 경로의 부담은 거의 없습니다. 새 파일이 잘못되었으면 경고를 남기고 직전 규칙을 계속 씁니다.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import warnings
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json")
+DEFAULT_CHECK_INTERVAL = 1.0 # 초
+
+
+def load_document(path):
+    """규칙 파일을 읽어 (문서, 내용 해시)를 반환합니다."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ImportError("YAML 규칙 파일을 읽으려면 PyYAML이 필요합니다: pip install pyyaml") from e
+        doc = yaml.safe_load(raw)
+    else:
+        doc = json.loads(raw)
+    if not isinstance(doc, dict):
+        raise ValueError(f"{path}: 규칙 파일 최상위는 객체(매핑)여야 합니다.")
+    return doc, hashlib.sha256(raw).hexdigest()[:12]
+
+
+class RuleFile:
+    """규칙 파일 하나와 그 컴파일 결과. get()은 여러 스레드에서 동시에 불러도 안전합니다."""
+
+    def __init__(self, path, compiler, check_interval=DEFAULT_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._compiler = compiler
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._compiled = None
+        self._next_check = 0.0
+        self.reload()
+
+    def _file_stamp(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def reload(self):
+        """파일을 다시 읽어 컴파일합니다. 처음 읽을 때의 오류는 그대로 올립니다."""
+        with self._lock:
+            stamp = self._file_stamp()
+            doc, digest = load_document(self.path)
+            self._compiled = self._compiler(doc, digest, self.path)
+            self._stamp = stamp
+            self._next_check = time.monotonic() + self.check_interval
+            return self._compiled
+
+    def get(self):
+        now = time.monotonic()
+        if now >= self._next_check:
+            with self._lock:
+                if now >= self._next_check:
+                    self._next_check = now + self.check_interval
+                    self._maybe_reload()
+        return self._compiled
+
+    def _maybe_reload(self):
+        try:
+            stamp = self._file_stamp()
+            if stamp == self._stamp:
+                return
+            doc, digest = load_document(self.path)
+            compiled = self._compiler(doc, digest, self.path)
+        except (OSError, ValueError, ImportError) as e:
+            warnings.warn(f"규칙 파일 재적용 실패, 이전 규칙을 계속 사용합니다: {e}", RuntimeWarning, stacklevel=3)
+            return
+        self._stamp = stamp
+        self._compiled = compiled
@@ -0,0 +1,454 @@
+"""순수 위험성 평가 엔진 (Streamlit 의존성 없음).
+
+두 페이지(riskkk.py, risk final.py)의 선행/후행지표 계산 로직을 위젯 전역변수 대신
+불변 입력 레코드를 받는 순수 함수로 제공합니다. 결과는 입력 기준으로 LRU 캐시됩니다.
+가중치 / 범주 점수 / 등급 경계는 rules.json에서 읽어 항목별 점수표로 컴파일한 것을 사용합니다.
+"""
+import os
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from operator import attrgetter, getitem
+
+from .rules import DEFAULT_RULES_PATH, RuleFile
+
+# --- 평가 방식 ---
+# "aricell": riskkk.py (아리셀 JSA 선행 vs 후행, 공정별 F/S 없음)
+# "fs": risk final.py (공정별 위험요인 F/S 직접 입력 + 선행/후행 통합)
+SCHEME_ARICELL = "aricell"
+SCHEME_FS = "fs"
+SCHEMES = (SCHEME_ARICELL, SCHEME_FS)
+
+# --- 범주형 입력 선택지 (페이지 위젯과 공유) ---
+WORKER_SKILL_OPTIONS = ("미숙련", "보통", "숙련")
+EQUIP_BREAKDOWN_OPTIONS = ("없음", "1~2회", "3회 이상")
+SAFETY_INSPECTION_OPTIONS = ("정기점검 완벽", "샘플점검 위주", "점검 미흡/미실시")
+FIRE_FACILITY_OPTIONS = ("기준 초과 설치", "법적 기준 준수", "설치 미흡/대상 아님")
+SPECIAL_EXTINGUISHER_OPTIONS = ("보유", "미보유")
+
+MAJOR_INCIDENT_OPTIONS = ("없음", "있음")
+FINE_HISTORY_OPTIONS = ("없음", "있음 (1회성)", "상습적/중요 위반 (2회 이상)")
+OVER_STORAGE_OPTIONS = ("없음", "있음")
+HIDDEN_REPORTS_OPTIONS = ("없음", "의혹 있음", "확인됨")
+TRAINING_ADEQUACY_OPTIONS = ("매우 적절", "보통", "부적절/불법 논란")
+AUDIT_COMPLIANCE_OPTIONS = ("모두 개선 완료", "일부 개선", "개선 미흡/형식적")
+GOVT_INTERVENTION_OPTIONS = ("모두 이행", "일부 이행", "이행 미흡")
+
+GRADES = ("매우 낮음", "낮음", "보통", "높음", "매우 높음")
+LAGGING_STATUSES = (
+    "주목할 문제 없음 (No Significant Issues)",
+    "경고 필요 (Warning Required)",
+    "주요 시스템 부실 (Major System Failure)",
+    "심각한 결함 이력 (Critical Failure History)",
+)
+
+JSA_DETAIL_COLUMNS = ("위험요인", "유형", "빈도(F)", "강도(S)", "위험도(F*S)")
+
+# --- 입력 항목 표시 이름 (F/S 통합 페이지 기준) ---
+LEADING_FIELD_LABELS = {
+    "env_cleanliness": "작업장 청결도",
+    "env_ventilation": "작업장 환기 상태",
+    "env_orderliness": "작업장 정리정돈 상태",
+    "env_chemical_exposure": "화학물질 노출 관리 수준",
+    "env_dust_level": "분진 관리 수준",
+    "worker_skill": "작업자 평균 숙련도",
+    "worker_safety_compliance": "작업자 안전수칙 준수도",
+    "worker_ppe_compliance": "작업자 PPE 착용 준수도",
+    "worker_fatigue_mgmt": "작업자 피로 관리 시스템",
+    "worker_safety_education_freq": "정기 안전 교육 빈도 (월)",
+    "equip_condition": "설비 평균 건전성",
+    "equip_inspection_cycle": "설비 점검 주기 준수율",
+    "equip_breakdown_history": "설비 고장 이력 (6개월)",
+    "equip_maintenance_quality": "설비 유지보수 품질",
+    "safety_inspection_status": "안전점검 체계",
+    "fire_facility_adequacy": "소방시설 법적 기준 준수",
+    "special_extinguisher_presence": "특수 소화기 보유 여부",
+    "chemical_mgmt_msds": "화학물질 MSDS 관리 및 교육",
+    "chemical_mgmt_storage": "화학물질 저장/취급 관리",
+    "jsa_performance": "JSA 수행 완성도",
+    "sops_compliance": "작업표준서(SOP) 준수도",
+    "ptw_compliance": "작업허가제(PTW) 준수도",
+}
+LAGGING_FIELD_LABELS = {
+    "past_fatalities_count": "과거 사망자 수 (명)",
+    "past_injuries_count": "과거 부상자 수 (명)",
+    "has_major_incident": "과거 대형/중대 재해",
+    "past_fine_history_level": "과거 안전 관련 벌금 부과 이력",
+    "past_hazard_over_storage": "과거 위험물질 기준 초과 보관 적발",
+    "past_hidden_accident_reports": "과거 경미 사고 보고 누락/은폐 정황",
+    "past_safety_training_adequacy": "과거 안전 교육 및 인력 관리 적절성",
+    "past_safety_audit_compliance": "과거 안전 감사 지적사항 개선 실적",
+    "past_government_intervention": "과거 작업중지/강력 권고 이행 여부",
+}
+
+
+# --- 입력 레코드 ---
+# 모든 슬라이더는 '관리 수준'(1:불량 ~ 5:우수) 기준으로 저장합니다.
+# riskkk.py의 화학물질 노출 농도/분진 농도/피로도처럼 높을수록 위험한 입력은 페이지에서 6 - 값으로 변환해 넘깁니다.
+@dataclass(frozen=True, slots=True)
+class LeadingInputs:
+    env_cleanliness: int = 3
+    env_ventilation: int = 3
+    env_orderliness: int = 3
+    env_chemical_exposure: int = 4
+    env_dust_level: int = 4
+    worker_skill: str = "미숙련"
+    worker_safety_compliance: int = 3
+    worker_ppe_compliance: int = 3
+    worker_fatigue_mgmt: int = 3
+    worker_safety_education_freq: int = 1
+    equip_condition: int = 3
+    equip_inspection_cycle: int = 4
+    equip_breakdown_history: str = "없음"
+    equip_maintenance_quality: int = 3
+    safety_inspection_status: str = "정기점검 완벽"
+    fire_facility_adequacy: str = "기준 초과 설치"
+    special_extinguisher_presence: str = "보유"
+    chemical_mgmt_msds: int = 3
+    chemical_mgmt_storage: int = 3
+    jsa_performance: int = 3
+    sops_compliance: int = 3
+    ptw_compliance: int = 3
+    # 공정별 위험요인: ((위험요인, 유형, 빈도(F), 강도(S)), ...)
+    jsa_factors: tuple = ()
+
+
+@dataclass(frozen=True, slots=True)
+class LaggingInputs:
+    past_fatalities_count: int = 0
+    past_injuries_count: int = 0
+    has_major_incident: str = "없음"  # "fs" 방식에서만 사용
+    past_fine_history_level: str = "없음"
+    past_hazard_over_storage: str = "없음"
+    past_hidden_accident_reports: str = "없음"
+    past_safety_training_adequacy: str = "매우 적절"
+    past_safety_audit_compliance: str = "모두 개선 완료"
+    past_government_intervention: str = "모두 이행"
+
+
+@dataclass(frozen=True, slots=True)
+class Assessment:
+    leading: LeadingInputs = LeadingInputs()
+    lagging: LaggingInputs = LaggingInputs()
+    scheme: str = SCHEME_FS
+    process: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class AssessmentResult:
+    leading_score: int
+    leading_grade: str
+    jsa_total: int
+    management_score: int
+    # ((위험요인, 유형, 빈도(F), 강도(S), 위험도(F*S)), ...)
+    jsa_details: tuple
+    lagging_score: int
+    # "aricell": 등급 / "fs": 위험 상태
+    lagging_grade: str
+
+    def jsa_records(self):
+        return [dict(zip(JSA_DETAIL_COLUMNS, row)) for row in self.jsa_details]
+
+
+# --- 입력 항목 순서 / 범주형 선택지 / 값의 허용 범위 (규칙 컴파일과 일괄 평가 행렬이 공유) ---
+LEADING_FIELDS = tuple(f.name for f in fields(LeadingInputs) if f.name != "jsa_factors")
+LAGGING_FIELDS = tuple(f.name for f in fields(LaggingInputs))
+CATEGORY_OPTIONS = {
+    "worker_skill": WORKER_SKILL_OPTIONS,
+    "equip_breakdown_history": EQUIP_BREAKDOWN_OPTIONS,
+    "safety_inspection_status": SAFETY_INSPECTION_OPTIONS,
+    "fire_facility_adequacy": FIRE_FACILITY_OPTIONS,
+    "special_extinguisher_presence": SPECIAL_EXTINGUISHER_OPTIONS,
+    "has_major_incident": MAJOR_INCIDENT_OPTIONS,
+    "past_fine_history_level": FINE_HISTORY_OPTIONS,
+    "past_hazard_over_storage": OVER_STORAGE_OPTIONS,
+    "past_hidden_accident_reports": HIDDEN_REPORTS_OPTIONS,
+    "past_safety_training_adequacy": TRAINING_ADEQUACY_OPTIONS,
+    "past_safety_audit_compliance": AUDIT_COMPLIANCE_OPTIONS,
+    "past_government_intervention": GOVT_INTERVENTION_OPTIONS,
+}
+# 값의 허용 범위 (양 끝 포함). 범주형은 선택지 순서(코드) 기준
+LEADING_DOMAINS = {
+    name: (0, len(CATEGORY_OPTIONS[name]) - 1) if name in CATEGORY_OPTIONS
+    else (0, 4) if name == "worker_safety_education_freq"
+    else (1, 5)
+    for name in LEADING_FIELDS
+}
+# 후행지표 중 선택지별 점수를 받는 항목 (사망자/부상자 수는 human_damage 규칙으로 계산)
+LAGGING_CATEGORY_FIELDS = (
+    "past_fine_history_level", "past_hazard_over_storage", "past_hidden_accident_reports",
+    "past_safety_training_adequacy", "past_safety_audit_compliance", "past_government_intervention",
+)
+LAGGING_LABELS = {SCHEME_ARICELL: GRADES, SCHEME_FS: LAGGING_STATUSES}
+LUT_WIDTH = 6 # 점수표 열 수 = 가장 큰 코드(슬라이더 5) + 1
+
+_leading_values = attrgetter(*LEADING_FIELDS)
+_lagging_category_values = attrgetter(*LAGGING_CATEGORY_FIELDS)
+
+
+# --- 규칙 컴파일 (rules.json → 항목별 점수표) ---
+@dataclass(frozen=True, eq=False)
+class SchemeRules:
+    leading_points: tuple # LEADING_FIELDS 순서, 항목별 {입력값: 점수}
+    leading_lut: tuple # (항목 x 코드) 점수표. 코드 = 슬라이더 값 또는 선택지 순서
+    lagging_points: tuple # LAGGING_CATEGORY_FIELDS 순서, 항목별 {선택지: 점수}
+    lagging_lut: tuple
+    leading_kernel: object # li → 관리 점수 합계 (점수표로 생성한 함수)
+    lagging_kernel: object # lg → 후행 범주 항목 점수 합계
+    per_fatality: int
+    per_injury: int
+    human_tiers: tuple # ((필드명, 최소값, 점수), ...) 처음 만족하는 구간 하나만 적용
+    tiers_require_major_incident: bool
+    leading_edges: tuple
+    leading_edge_in_lower: bool
+    lagging_edges: tuple
+    lagging_edge_in_lower: bool
+
+
+# eq=False: 규칙 객체는 식별자로 해시되어 캐시 키에 쓰임 (규칙이 교체되면 캐시 키가 달라짐)
+@dataclass(frozen=True, eq=False)
+class CompiledRules:
+    version: str
+    digest: str # 규칙 파일 내용 해시
+    source: str
+    schemes: dict # 평가 방식 → SchemeRules
+
+
+def _rule_error(source, where, message):
+    return ValueError(f"{source}: {where}: {message}")
+
+
+def _compile_item(source, where, name, spec, options, domain):
+    if not isinstance(spec, dict):
+        raise _rule_error(source, where, f"'{name}' 규칙은 객체여야 합니다.")
+    if options is not None:
+        points = spec.get("points")
+        if not isinstance(points, dict) or set(points) != set(options):
+            raise _rule_error(source, where, f"'{name}'의 points는 선택지 {list(options)} 전체를 정의해야 합니다.")
+        table = {option: int(points[option]) for option in options}
+        row = [table[option] for option in options]
+    else:
+        if "weight" not in spec:
+            raise _rule_error(source, where, f"'{name}'에는 weight가 필요합니다.")
+        weight, pivot = int(spec["weight"]), int(spec.get("pivot", 6))
+        lo, hi = domain
+        table = {v: (pivot - v) * weight for v in range(lo, hi + 1)}
+        row = [table.get(v, 0) for v in range(LUT_WIDTH)]
+    return table, tuple(row + [0] * (LUT_WIDTH - len(row)))
+
+
+def _compile_edges(source, where, spec, n_labels):
+    edges = spec.get("edges") if isinstance(spec, dict) else None
+    if not isinstance(edges, list) or len(edges) != n_labels - 1 or any(b <= a for a, b in zip(edges, edges[1:])):
+        raise _rule_error(source, where, f"edges는 오름차순 정수 {n_labels - 1}개여야 합니다.")
+    return tuple(int(e) for e in edges), bool(spec.get("edge_in_lower", True))
+
+
+def _table_sum_kernel(tables, names):
+    """항목별 점수표 합계 함수 t0[x.f0] + t1[x.f1] + ... 를 만듭니다 (규칙마다 한 번).
+
+    필드 값은 attrgetter로 한 번에 꺼내고 점수표와 짝지어 더하므로, 규칙 파일의 값은 점수표 객체로만 쓰입니다.
+    """
+    values = attrgetter(*names)
+    tables = tuple(tables)
+
+    def kernel(x):
+        return sum(map(getitem, tables, values(x)))
+
+    return kernel
+
+
+def _compile_scheme(source, scheme, base_leading, spec):
+    where = f"schemes.{scheme}"
+    leading = {**base_leading, **spec.get("leading", {})}
+    unknown = set(leading) - set(LEADING_FIELDS)
+    missing = set(LEADING_FIELDS) - set(leading)
+    if unknown or missing:
+        raise _rule_error(source, where, f"leading 항목 불일치 (알 수 없음: {sorted(unknown)}, 누락: {sorted(missing)})")
+    leading_items = [
+        _compile_item(source, where, name, leading[name], CATEGORY_OPTIONS.get(name), LEADING_DOMAINS[name])
+        for name in LEADING_FIELDS
+    ]
+
+    lagging = spec.get("lagging", {})
+    if set(lagging) != set(LAGGING_CATEGORY_FIELDS):
+        raise _rule_error(source, where, f"lagging은 {list(LAGGING_CATEGORY_FIELDS)} 항목을 모두 정의해야 합니다.")
+    lagging_items = [
+        _compile_item(source, where, name, lagging[name], CATEGORY_OPTIONS[name], None)
+        for name in LAGGING_CATEGORY_FIELDS
+    ]
+
+    human = spec.get("human_damage", {})
+    tiers = []
+    for tier in human.get("tiers", ()):
+        if tier.get("field") not in ("past_fatalities_count", "past_injuries_count"):
+            raise _rule_error(source, where, f"human_damage.tiers의 field가 올바르지 않습니다: {tier.get('field')!r}")
+        tiers.append((tier["field"], int(tier["min"]), int(tier["points"])))
+
+    leading_edges, leading_in_lower = _compile_edges(source, f"{where}.leading_grades", spec.get("leading_grades"), len(GRADES))
+    lagging_edges, lagging_in_lower = _compile_edges(
+        source, f"{where}.lagging_grades", spec.get("lagging_grades"), len(LAGGING_LABELS[scheme])
+    )
+    leading_points = tuple(table for table, _ in leading_items)
+    lagging_points = tuple(table for table, _ in lagging_items)
+    return SchemeRules(
+        leading_points=leading_points,
+        leading_lut=tuple(row for _, row in leading_items),
+        lagging_points=lagging_points,
+        lagging_lut=tuple(row for _, row in lagging_items),
+        leading_kernel=_table_sum_kernel(leading_points, LEADING_FIELDS),
+        lagging_kernel=_table_sum_kernel(lagging_points, LAGGING_CATEGORY_FIELDS),
+        per_fatality=int(human.get("per_fatality", 0)),
+        per_injury=int(human.get("per_injury", 0)),
+        human_tiers=tuple(tiers),
+        tiers_require_major_incident=bool(human.get("requires_major_incident", False)),
+        leading_edges=leading_edges,
+        leading_edge_in_lower=leading_in_lower,
+        lagging_edges=lagging_edges,
+        lagging_edge_in_lower=lagging_in_lower,
+    )
+
+
+RULES_SCHEMA = 1
+
+
+def compile_rules(doc, digest="", source="<rules>"):
+    """규칙 문서(dict)를 검증하고 평가 방식별 점수표로 컴파일합니다. 잘못된 문서는 ValueError."""
+    if not isinstance(doc, dict):
+        raise _rule_error(source, "문서", f"JSON 객체여야 합니다 ({type(doc).__name__})")
+    if doc.get("schema") != RULES_SCHEMA:
+        raise _rule_error(source, "schema", f"지원하지 않는 규칙 형식입니다: {doc.get('schema')!r} (지원: {RULES_SCHEMA})")
+    schemes = doc.get("schemes", {})
+    if not isinstance(schemes, dict) or set(schemes) != set(SCHEMES):
+        raise _rule_error(source, "schemes", f"평가 방식 {list(SCHEMES)}를 모두 정의해야 합니다.")
+    try:
+        compiled = {scheme: _compile_scheme(source, scheme, doc.get("leading", {}), schemes[scheme]) for scheme in SCHEMES}
+    except (KeyError, TypeError, AttributeError) as e: # 항목이 없거나, 객체 자리에 목록 / 숫자가 있는 경우 등
+        raise _rule_error(source, "규칙", f"형식 오류 ({e!r})") from None
+    return CompiledRules(str(doc.get("version", "")), digest, source, compiled)
+
+
+RULES = RuleFile(os.environ.get("RISK_RULES_PATH", DEFAULT_RULES_PATH), compile_rules)
+
+
+def get_rules():
+    """현재 적용 중인 컴파일된 규칙 (규칙 파일이 바뀌었으면 다시 컴파일된 것)."""
+    return RULES.get()
+
+
+# --- 점수 → 등급 변환 함수 ---
+# 경계값은 규칙 파일의 leading_grades / lagging_grades (edge_in_lower: 경계값 이하이면 해당 등급)
+def _grade_index(edges, edge_in_lower, score):
+    return (bisect_left if edge_in_lower else bisect_right)(edges, score)
+
+
+def leading_grade(score, scheme, rules=None):
+    sr = (rules or get_rules()).schemes[scheme]
+    return GRADES[_grade_index(sr.leading_edges, sr.leading_edge_in_lower, score)]
+
+
+def lagging_grade(score, scheme, rules=None):
+    sr = (rules or get_rules()).schemes[scheme]
+    return LAGGING_LABELS[scheme][_grade_index(sr.lagging_edges, sr.lagging_edge_in_lower, score)]
+
+
+def score_to_grade(score, score_type="leading"):
+    if score_type == "leading":
+        return leading_grade(score, SCHEME_ARICELL)
+    elif score_type == "lagging":
+        return lagging_grade(score, SCHEME_ARICELL)
+    return "알 수 없음"
+
+
+def get_risk_level(score):
+    return leading_grade(score, SCHEME_FS)
+
+
+def _invalid_value(names, tables, values):
+    name, value = next((n, v) for n, t, v in zip(names, tables, values) if v not in t)
+    return ValueError(f"{name}: 허용되지 않는 값 {value!r}")
+
+
+# --- 전사적 선행지표 점수 (각 지표의 관리 수준이 낮을수록(1점) 점수가 높아짐) ---
+def _management_score(sr, li):
+    try:
+        return sr.leading_kernel(li)
+    except (KeyError, TypeError):
+        raise _invalid_value(LEADING_FIELDS, sr.leading_points, _leading_values(li)) from None
+
+
+def management_score(li, scheme=SCHEME_FS, rules=None):
+    return _management_score((rules or get_rules()).schemes[scheme], li)
+
+
+# --- 공정별 위험요인 JSA 점수 (빈도 x 강도) ---
+def jsa_score(jsa_factors):
+    details = tuple((name, rtype, freq, sev, freq * sev) for name, rtype, freq, sev in jsa_factors)
+    return sum(row[4] for row in details), details
+
+
+# --- 후행지표 점수 (과거 실제 사고 결과 및 관리 부실) ---
+def _lagging_score(sr, lg):
+    try:
+        score = sr.lagging_kernel(lg)
+    except (KeyError, TypeError):
+        raise _invalid_value(LAGGING_CATEGORY_FIELDS, sr.lagging_points, _lagging_category_values(lg)) from None
+    # 과거 인명 피해 (가장 강력한 가중치)
+    if sr.per_fatality or sr.per_injury:
+        score += lg.past_fatalities_count * sr.per_fatality + lg.past_injuries_count * sr.per_injury
+    if sr.human_tiers and (not sr.tiers_require_major_incident or lg.has_major_incident == "있음"):
+        for field, minimum, points in sr.human_tiers:
+            if getattr(lg, field) >= minimum:
+                score += points
+                break
+    return score
+
+
+def lagging_score(lg, scheme, rules=None):
+    return _lagging_score((rules or get_rules()).schemes[scheme], lg)
+
+
+# riskkk.py 방식 후행지표 점수
+def aricell_lagging_score(lg):
+    return lagging_score(lg, SCHEME_ARICELL)
+
+
+# risk final.py 방식 후행지표 (위험 상태, 내부 점수)
+def get_lagging_status_and_score(lg):
+    score = lagging_score(lg, SCHEME_FS)
+    return lagging_status(score), score
+
+
+def lagging_status(score):
+    return lagging_grade(score, SCHEME_FS)
+
+
+# --- 평가 수행 (입력 레코드 + 규칙 기준 LRU 캐시) ---
+def evaluate(assessment):
+    # 규칙이 교체되면 캐시 키가 달라지므로 이전 규칙의 결과는 재사용되지 않음
+    return _evaluate(assessment, get_rules())
+
+
+@lru_cache(maxsize=4096)
+def _evaluate(assessment, rules):
+    scheme = assessment.scheme
+    sr = rules.schemes.get(scheme)
+    if sr is None:
+        raise ValueError(f"알 수 없는 평가 방식: {scheme!r}")
+    li, lg = assessment.leading, assessment.lagging
+    jsa_total, details = jsa_score(li.jsa_factors)
+    mgmt = _management_score(sr, li)
+    leading = jsa_total + mgmt
+    lagging = _lagging_score(sr, lg)
+    return AssessmentResult(
+        leading, GRADES[_grade_index(sr.leading_edges, sr.leading_edge_in_lower, leading)], jsa_total, mgmt, details,
+        lagging, LAGGING_LABELS[scheme][_grade_index(sr.lagging_edges, sr.lagging_edge_in_lower, lagging)],
+    )
+
+
+def cache_info():
+    return _evaluate.cache_info()
+
+
+def cache_clear():
+    _evaluate.cache_clear()
@@ -0,0 +1,171 @@
+"""민감도 분석: 현재 입력값을 중심으로 선행지표 입력을 허용 범위 전체에 걸쳐 바꿔 보며 점수 / 등급 변화를 계산합니다.
+
+- 2변수 격자 (heatmap): 입력 두 개를 각자의 허용 범위 전체로 바꾼 모든 조합. 나머지 입력은 현재값으로 고정
+- 1변수 (tornado): 선행지표 입력 각각(전사 관리 항목 + 공정 위험요인 F/S)을 허용 범위 전체로 바꿨을 때의 최저 / 최고 점수
+조합은 현재 입력 행을 broadcast한 행렬로 만들어 batch.score_batch 한 번으로 평가하므로 스칼라 평가(evaluate)와 항상 같은
+점수를 냅니다. 결과는 (선행 입력 레코드, 평가 방식, 규칙)별로 캐시되어 같은 입력으로 다시 그릴 때는 계산하지 않습니다.
+입력 키는 몬테카를로 편차 표와 같습니다: LEADING_FIELDS 이름, 위험요인 i번째의 빈도 / 강도는 "freq_i" / "sev_i".
+"""
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from .batch import encode_assessments, score_batch
+from .scoring import (
+    CATEGORY_OPTIONS,
+    GRADES,
+    LEADING_DOMAINS,
+    LEADING_FIELD_LABELS,
+    LEADING_FIELDS,
+    Assessment,
+    get_rules,
+)
+
+FS_DOMAIN = (1, 5)
+
+
+@dataclass(frozen=True, slots=True)
+class SweepParam:
+    key: str
+    label: str
+    values: tuple # 코드 (허용 범위 전체, 오름차순). 범주형은 선택지 순서
+    ticks: tuple # 표시값 (범주형은 선택지 이름)
+    current: int # 현재 코드
+
+
+@dataclass(frozen=True)
+class Heatmap:
+    x: SweepParam
+    y: SweepParam
+    scores: np.ndarray # (len(y.values), len(x.values)) 선행 점수
+    grades: np.ndarray # 같은 모양, GRADES 인덱스
+    current_score: int
+    edges: tuple # 선행 등급 경계 점수
+    elapsed: float
+
+    def grade_at(self, x_code, y_code):
+        return GRADES[self.grades[self.y.values.index(y_code), self.x.values.index(x_code)]]
+
+
+@dataclass(frozen=True, slots=True)
+class TornadoBar:
+    param: SweepParam
+    low: int # 이 입력만 바꿨을 때의 최저 점수
+    high: int # 최고 점수
+    low_tick: object # 최저 점수를 내는 표시값
+    high_tick: object
+    low_grade: str
+    high_grade: str
+
+    @property
+    def swing(self):
+        return self.high - self.low
+
+
+@dataclass(frozen=True)
+class Tornado:
+    bars: tuple # TornadoBar, 변화 폭(swing) 큰 순
+    current_score: int
+    current_grade: str
+    edges: tuple
+    elapsed: float
+
+
+def sweep_params(leading):
+    """선행지표 입력 전체의 SweepParam (전사 관리 항목, 이어서 공정 위험요인 F/S 순)."""
+    params = []
+    for name in LEADING_FIELDS:
+        lo, hi = LEADING_DOMAINS[name]
+        options = CATEGORY_OPTIONS.get(name)
+        value = getattr(leading, name)
+        params.append(SweepParam(
+            name, LEADING_FIELD_LABELS[name], tuple(range(lo, hi + 1)),
+            options if options is not None else tuple(range(lo, hi + 1)),
+            options.index(value) if options is not None else value,
+        ))
+    values = tuple(range(FS_DOMAIN[0], FS_DOMAIN[1] + 1))
+    for i, (name, _, freq, sev) in enumerate(leading.jsa_factors):
+        params.append(SweepParam(f"freq_{i}", f"{name} 빈도(F)", values, values, freq))
+        params.append(SweepParam(f"sev_{i}", f"{name} 강도(S)", values, values, sev))
+    return tuple(params)
+
+
+def _base(leading, scheme):
+    X, _, F, S = encode_assessments([Assessment(leading=leading, scheme=scheme)])
+    return X, F, S
+
+
+def _assign(X, F, S, key, codes):
+    """행렬 묶음에서 key 입력의 열을 codes로 바꿉니다."""
+    if key.startswith(("freq_", "sev_")):
+        kind, i = key.split("_")
+        (F if kind == "freq" else S)[:, int(i)] = codes
+    else:
+        X[:, LEADING_FIELDS.index(key)] = codes
+
+
+def _tile(rows, X0, F0, S0):
+    return (np.broadcast_to(X0, (rows, X0.shape[1])).copy(), np.broadcast_to(F0, (rows, F0.shape[1])).copy(),
+            np.broadcast_to(S0, (rows, S0.shape[1])).copy())
+
+
+def heatmap(assessment, x_key, y_key):
+    """x_key, y_key 두 입력을 허용 범위 전체로 바꾼 선행 점수 / 등급 격자."""
+    if x_key == y_key:
+        raise ValueError("서로 다른 두 입력을 골라야 합니다.")
+    return _heatmap(assessment.leading, assessment.scheme, x_key, y_key, get_rules())
+
+
+@lru_cache(maxsize=64)
+def _heatmap(leading, scheme, x_key, y_key, rules):
+    started = time.perf_counter()
+    params = {p.key: p for p in sweep_params(leading)}
+    try:
+        px, py = params[x_key], params[y_key]
+    except KeyError as e:
+        raise ValueError(f"알 수 없는 입력: {e.args[0]!r}") from None
+    X, F, S = _tile(len(px.values) * len(py.values), *_base(leading, scheme))
+    yy, xx = np.meshgrid(py.values, px.values, indexing="ij") # 행 = y, 열 = x
+    _assign(X, F, S, x_key, xx.ravel())
+    _assign(X, F, S, y_key, yy.ravel())
+    r = score_batch(X, None, F, S, scheme, rules)
+    shape = (len(py.values), len(px.values))
+    sr = rules.schemes[scheme]
+    current = int(r.leading_score.reshape(shape)[py.values.index(py.current), px.values.index(px.current)])
+    return Heatmap(px, py, r.leading_score.reshape(shape), r.leading_grade.reshape(shape), current, sr.leading_edges,
+                   time.perf_counter() - started)
+
+
+def tornado(assessment):
+    """선행지표 입력 각각을 (나머지는 현재값으로 두고) 허용 범위 전체로 바꿨을 때의 점수 범위."""
+    return _tornado(assessment.leading, assessment.scheme, get_rules())
+
+
+@lru_cache(maxsize=64)
+def _tornado(leading, scheme, rules):
+    started = time.perf_counter()
+    params = sweep_params(leading)
+    sizes = [len(p.values) for p in params]
+    X0, F0, S0 = _base(leading, scheme)
+    X, F, S = _tile(sum(sizes) + 1, X0, F0, S0) # 마지막 행 = 현재 입력
+    bounds = np.cumsum([0] + sizes)
+    for p, start, stop in zip(params, bounds[:-1], bounds[1:]):
+        block = (slice(start, stop),)
+        _assign(X[block], F[block], S[block], p.key, p.values)
+    r = score_batch(X, None, F, S, scheme, rules)
+    bars = []
+    for p, start, stop in zip(params, bounds[:-1], bounds[1:]):
+        scores, grades = r.leading_score[start:stop], r.leading_grade[start:stop]
+        lo, hi = int(scores.argmin()), int(scores.argmax())
+        bars.append(TornadoBar(p, int(scores[lo]), int(scores[hi]), p.ticks[lo], p.ticks[hi], GRADES[grades[lo]], GRADES[grades[hi]]))
+    bars.sort(key=lambda bar: -bar.swing)
+    return Tornado(tuple(bars), int(r.leading_score[-1]), GRADES[r.leading_grade[-1]], rules.schemes[scheme].leading_edges,
+                   time.perf_counter() - started)
+
+
+def cache_clear():
+    _heatmap.cache_clear()
+    _tornado.cache_clear()
+
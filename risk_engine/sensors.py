@@ -0,0 +1,454 @@
+"""보관 환경 센서(온도 / 습도 / 가스) 실시간 수집과 선행지표 자동 입력.
+
+센서 한 줄 형식: "센서id,종류,값" (종류: temperature / humidity / gas, 예: "wh1-t-0007,temperature,23.4")
+asyncio로 로컬 TCP 소켓(생산자가 접속해 줄을 보냄) 또는 계속 늘어나는 파일(tail)에서 읽고,
+센서마다 고정 크기 NumPy 링 버퍼에 최근 window개 값을 보관합니다.
+이동 구간 집계(평균 / 표준편차 / 경보 기준 초과 비율)는 합 / 제곱합 / 초과 수를 표본마다 갱신하므로 표본당 O(1)이며,
+한 번에 들어온 여러 줄은 종류별 배열 연산으로 한꺼번에 반영합니다.
+집계는 SENSOR_FIELDS 경계에 따라 선행지표 관리 수준(1~5)으로 바뀌어 페이지의 슬라이더 값을 대신합니다.
+
+페이지는 start_service()로 프로세스당 하나의 수집 스레드를 띄웁니다 (RISK_SENSOR_SOURCE 미설정 시 None → 기존 슬라이더).
+    RISK_SENSOR_SOURCE=tcp://127.0.0.1:8765   # 이 주소로 수신 대기
+    RISK_SENSOR_SOURCE=file:/var/log/sensors.csv   # 파일 끝을 따라 읽음
+    RISK_SENSOR_SOURCE=sim:2000@10   # 내장 시뮬레이터 (센서 2000개, 10 Hz)
+시뮬레이터 단독 실행: python -m risk_engine.sensors simulate --tcp 127.0.0.1:8765 --sensors 2000 --hz 10
+"""
+import argparse
+import asyncio
+import math
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+
+import numpy as np
+
+from .scoring import LEADING_FIELD_LABELS
+
+DEFAULT_HZ = 10
+DEFAULT_WINDOW_S = 60 # 이동 구간 길이 (초) → 센서당 window = DEFAULT_WINDOW_S * hz 표본
+STALE_AFTER_S = 30 # 이 시간 동안 새 표본이 없으면 센서 값을 쓰지 않고 슬라이더로 돌아감
+RESYNC_EVERY = 1 << 20 # 표본 수. 누적 합의 부동소수 오차를 버퍼 전체 재합산으로 주기적으로 바로잡음
+READ_CHUNK = 1 << 16
+PAGE_REFRESH_S = 5 # 페이지가 센서 집계를 다시 확인하는 주기 (관리 수준이 바뀌었을 때만 전체 재실행)
+
+
+@dataclass(frozen=True, slots=True)
+class SensorKind:
+    label: str
+    unit: str
+    alarm: float # 경보 기준 (초과 비율 집계용, 이 값을 넘으면 초과)
+    baseline: float # 시뮬레이터 평상시 값
+    spread: float # 시뮬레이터 평상시 흔들림 (표준편차)
+
+
+SENSOR_KINDS = MappingProxyType({
+    "temperature": SensorKind("보관 온도", "°C", 35.0, 23.0, 1.0),
+    "humidity": SensorKind("보관 습도", "%RH", 70.0, 45.0, 3.0),
+    "gas": SensorKind("가스 (전해액 증기/VOC)", "ppm", 25.0, 3.0, 1.0),
+})
+
+# 선행지표 항목 ← ((센서 종류, 집계, 경계), ...): 값이 경계를 하나 넘을 때마다 관리 수준 5에서 1씩 내려감, 여러 개면 가장 낮은 수준
+# worst_mean: 센서별 구간 평균 중 최댓값 / over_fraction: 전 센서 표본 중 경보 기준 초과 비율
+SENSOR_FIELDS = MappingProxyType({
+    "env_chemical_exposure": (("gas", "worst_mean", (5.0, 10.0, 25.0, 50.0)),),
+    "env_ventilation": (("gas", "over_fraction", (0.01, 0.05, 0.15, 0.30)),),
+    "chemical_mgmt_storage": (
+        ("temperature", "worst_mean", (25.0, 30.0, 35.0, 40.0)),
+        ("humidity", "worst_mean", (60.0, 65.0, 70.0, 80.0)),
+    ),
+})
+
+
+# --- 센서별 링 버퍼 + 이동 구간 누적값 ---
+class RollingBank:
+    """같은 종류 센서들의 최근 window개 표본. 행 = 센서, 새 센서가 오면 행을 두 배씩 늘립니다."""
+
+    def __init__(self, window, alarm, capacity=64):
+        self.window, self.alarm = window, alarm
+        self.n = 0
+        self.buf = np.zeros((capacity, window), dtype=np.float32)
+        self.pos = np.zeros(capacity, dtype=np.int64) # 다음에 쓸 칸
+        self.count = np.zeros(capacity, dtype=np.int64) # 채워진 칸 수 (≤ window)
+        self.total = np.zeros(capacity)
+        self.total_sq = np.zeros(capacity)
+        self.over = np.zeros(capacity, dtype=np.int64)
+        self._since_resync = 0
+
+    def add_sensor(self):
+        if self.n == len(self.pos):
+            grow = len(self.pos)
+            self.buf = np.vstack([self.buf, np.zeros((grow, self.window), dtype=np.float32)])
+            for name in ("pos", "count", "total", "total_sq", "over"):
+                arr = getattr(self, name)
+                setattr(self, name, np.concatenate([arr, np.zeros(grow, dtype=arr.dtype)]))
+        self.n += 1
+        return self.n - 1
+
+    def push(self, rows, values):
+        """rows[k] 센서에 values[k]를 도착 순서대로 넣습니다. 같은 센서가 여러 번 있으면 순번별로 나눠 반영."""
+        rows = np.asarray(rows, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float32)
+        if len(rows) == 0:
+            return
+        order = np.argsort(rows, kind="stable")
+        sorted_rows = rows[order]
+        starts = np.flatnonzero(np.r_[True, sorted_rows[1:] != sorted_rows[:-1]])
+        rank = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+        for r in range(int(rank.max()) + 1): # 대부분 한 번 (센서당 한 표본)
+            pick = order[rank == r]
+            self._push_unique(rows[pick], values[pick])
+        self._since_resync += len(rows)
+        if self._since_resync >= RESYNC_EVERY:
+            self.resync()
+
+    def _push_unique(self, rows, values):
+        pos = self.pos[rows]
+        old = self.buf[rows, pos].astype(np.float64)
+        full = self.count[rows] == self.window
+        old = np.where(full, old, 0.0) # 아직 안 찬 칸은 빼지 않음
+        new = values.astype(np.float64)
+        self.buf[rows, pos] = values
+        self.total[rows] += new - old
+        self.total_sq[rows] += new * new - old * old
+        self.over[rows] += (new > self.alarm).astype(np.int64) - (full & (old > self.alarm))
+        self.count[rows] = np.minimum(self.count[rows] + 1, self.window)
+        self.pos[rows] = (pos + 1) % self.window
+
+    def resync(self):
+        """누적 합 / 제곱합 / 초과 수를 버퍼에서 다시 계산합니다."""
+        n = self.n
+        live = self.buf[:n].astype(np.float64)
+        filled = np.arange(self.window) < self.count[:n, None]
+        self.total[:n] = np.where(filled, live, 0.0).sum(axis=1)
+        self.total_sq[:n] = np.where(filled, live * live, 0.0).sum(axis=1)
+        self.over[:n] = (filled & (live > self.alarm)).sum(axis=1)
+        self._since_resync = 0
+
+    def means(self):
+        n = self.n
+        count = self.count[:n]
+        return np.divide(self.total[:n], count, out=np.full(n, np.nan), where=count > 0)
+
+    def stds(self):
+        n = self.n
+        count = self.count[:n]
+        mean = self.means()
+        var = np.divide(self.total_sq[:n], count, out=np.full(n, np.nan), where=count > 0) - mean * mean
+        return np.sqrt(np.maximum(var, 0.0))
+
+    def aggregates(self):
+        """종류 전체 요약: 센서 수, 평균의 평균, 평균의 최댓값, 경보 기준 초과 비율."""
+        means = self.means()
+        means = means[~np.isnan(means)]
+        samples = int(self.count[:self.n].sum())
+        return {
+            "sensors": len(means),
+            "mean": float(means.mean()) if len(means) else None,
+            "worst_mean": float(means.max()) if len(means) else None,
+            "over_fraction": float(self.over[:self.n].sum()) / samples if samples else None,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class SensorSnapshot:
+    kinds: MappingProxyType # 종류 → aggregates()
+    samples: int # 지금까지 받은 표본 수
+    rejected: int # 형식이 잘못되어 버린 줄 수
+    age_s: float # 마지막 표본 이후 경과 시간 (받은 적 없으면 inf)
+
+    @property
+    def stale(self):
+        return self.age_s > STALE_AFTER_S
+
+
+def level_for(value, edges):
+    """경계를 넘은 수만큼 5에서 내린 관리 수준 (1~5)."""
+    return 5 - int(np.searchsorted(edges, value, side="left"))
+
+
+class SensorHub:
+    """센서 종류별 RollingBank 묶음. 수집 스레드가 ingest_text로 넣고, 페이지 스레드가 snapshot / leading_levels로 읽습니다."""
+
+    def __init__(self, window=DEFAULT_WINDOW_S * DEFAULT_HZ, kinds=SENSOR_KINDS):
+        self.kinds = kinds
+        self.banks = {kind: RollingBank(window, spec.alarm) for kind, spec in kinds.items()}
+        self._rows = {} # 센서 id → (종류, 행)
+        self._lock = threading.Lock()
+        self.samples = 0
+        self.rejected = 0
+        self.last_sample = None # time.monotonic()
+
+    def ingest_text(self, text):
+        """여러 줄을 한 번에 반영합니다. 반영한 표본 수를 반환."""
+        batches = {kind: ([], []) for kind in self.banks}
+        rejected = 0
+        rows = self._rows
+        with self._lock:
+            for line in text.splitlines():
+                parts = line.split(",")
+                try:
+                    sensor_id, kind, value = parts
+                    value = float(value)
+                    if not math.isfinite(value): # nan / inf는 이동 구간 합계를 영구히 망가뜨리므로 형식 오류로 버림
+                        raise ValueError(value)
+                    kind_row = rows.get(sensor_id)
+                    if kind_row is None:
+                        kind_row = rows[sensor_id] = (kind, self.banks[kind].add_sensor())
+                    elif kind_row[0] != kind:
+                        raise ValueError(kind)
+                except (ValueError, KeyError):
+                    rejected += line.strip() != ""
+                    continue
+                batch = batches[kind_row[0]]
+                batch[0].append(kind_row[1])
+                batch[1].append(value)
+            n = 0
+            for kind, (bank_rows, values) in batches.items():
+                if bank_rows:
+                    self.banks[kind].push(bank_rows, values)
+                    n += len(bank_rows)
+            self.samples += n
+            self.rejected += rejected
+            if n:
+                self.last_sample = time.monotonic()
+        return n
+
+    def snapshot(self):
+        with self._lock:
+            kinds = {kind: bank.aggregates() for kind, bank in self.banks.items()}
+            age = time.monotonic() - self.last_sample if self.last_sample is not None else float("inf")
+            return SensorSnapshot(MappingProxyType(kinds), self.samples, self.rejected, age)
+
+    def leading_levels(self, snapshot=None):
+        """센서 값으로 정할 수 있는 선행지표 항목 → 관리 수준 (1~5). 오래된 값이거나 해당 센서가 없으면 빠짐."""
+        snapshot = snapshot or self.snapshot()
+        if snapshot.stale:
+            return {}
+        levels = {}
+        for field, sources in SENSOR_FIELDS.items():
+            found = [level_for(value, edges) for kind, stat, edges in sources if (value := snapshot.kinds[kind][stat]) is not None]
+            if found:
+                levels[field] = min(found)
+        return levels
+
+
+# --- asyncio 입력원 ---
+async def ingest_stream(hub, reader):
+    """StreamReader에서 줄 단위 표본을 읽어 반영합니다 (덩어리로 읽고, 끊긴 마지막 줄은 다음 덩어리와 합침)."""
+    rest = b""
+    while chunk := await reader.read(READ_CHUNK):
+        data = rest + chunk
+        cut = data.rfind(b"\n") + 1
+        rest = data[cut:]
+        if cut:
+            hub.ingest_text(data[:cut].decode("utf-8", "replace"))
+    if rest:
+        hub.ingest_text(rest.decode("utf-8", "replace"))
+
+
+async def serve_tcp(hub, host, port):
+    """생산자(센서 게이트웨이 / 시뮬레이터)가 접속해 줄을 보내는 TCP 서버."""
+    async def handle(reader, writer):
+        try:
+            await ingest_stream(hub, reader)
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def tail_file(hub, path, poll_s=0.1, from_start=False):
+    """파일 끝에 붙는 줄을 계속 읽습니다. 파일이 잘리거나 교체되면(로그 회전) 처음부터 다시 읽습니다."""
+    while not os.path.exists(path):
+        await asyncio.sleep(poll_s)
+    f = open(path, "rb")
+    try:
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        rest = b""
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if chunk:
+                data = rest + chunk
+                cut = data.rfind(b"\n") + 1
+                rest = data[cut:]
+                if cut:
+                    hub.ingest_text(data[:cut].decode("utf-8", "replace"))
+                continue
+            await asyncio.sleep(poll_s)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if st.st_ino != os.fstat(f.fileno()).st_ino or st.st_size < f.tell():
+                f.close()
+                f = open(path, "rb")
+                rest = b""
+    finally:
+        f.close()
+
+
+# --- 시뮬레이터 ---
+def simulated_sensor_ids(sensors):
+    """종류를 번갈아 배정한 센서 id 목록과 종류 목록."""
+    kinds = tuple(SENSOR_KINDS)
+    ids = [f"sim-{i:05d}" for i in range(sensors)]
+    return ids, [kinds[i % len(kinds)] for i in range(sensors)]
+
+
+class Simulator:
+    """평상시 값 주변을 천천히 흔들리다 가끔 이상 구간(가스 누출 / 온도 상승)이 생기는 센서 묶음."""
+
+    def __init__(self, sensors, seed=0, excursion_rate=2e-6):
+        self.ids, self.kinds = simulated_sensor_ids(sensors)
+        self.rng = np.random.default_rng(seed)
+        self.base = np.array([SENSOR_KINDS[k].baseline for k in self.kinds])
+        self.spread = np.array([SENSOR_KINDS[k].spread for k in self.kinds])
+        self.alarm = np.array([SENSOR_KINDS[k].alarm for k in self.kinds])
+        self.drift = np.zeros(sensors)
+        self.excursion = np.zeros(sensors, dtype=np.int64) # 남은 이상 구간 틱 수
+        self.excursion_rate = excursion_rate
+        self.prefix = [f"{sensor_id},{kind}," for sensor_id, kind in zip(self.ids, self.kinds)]
+
+    def tick(self):
+        n = len(self.ids)
+        self.drift = 0.995 * self.drift + self.rng.normal(0, 0.05, n) * self.spread
+        start = (self.excursion == 0) & (self.rng.random(n) < self.excursion_rate)
+        self.excursion[start] = self.rng.integers(50, 600, start.sum())
+        values = self.base + self.drift + self.rng.normal(0, 0.2, n) * self.spread
+        hot = self.excursion > 0
+        values[hot] = self.alarm[hot] * 1.2 + self.rng.normal(0, 1, hot.sum()) * self.spread[hot]
+        self.excursion[hot] -= 1
+        return "".join(f"{p}{v:.2f}\n" for p, v in zip(self.prefix, values.tolist()))
+
+
+async def run_simulator(sink, sensors, hz=DEFAULT_HZ, duration=None, seed=0):
+    """hz 주기로 모든 센서 값을 한 줄씩 sink(text)에 넘깁니다 (코루틴이면 await). 주기를 못 맞추면 밀린 만큼 바로 이어서 보냄."""
+    sim = Simulator(sensors, seed)
+    period = 1.0 / hz
+    next_tick = time.monotonic()
+    end = None if duration is None else next_tick + duration
+    while end is None or next_tick < end:
+        result = sink(sim.tick())
+        if asyncio.iscoroutine(result):
+            await result
+        next_tick += period
+        await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+
+
+# --- 페이지용 수집 서비스 (프로세스당 한 번) ---
+_service_lock = threading.Lock()
+_services = {}
+
+
+def parse_source(source):
+    """"tcp://호스트:포트" / "file:경로" (또는 경로) / "sim:센서수[@Hz]" → (종류, 인자)."""
+    if source.startswith("tcp://"):
+        host, _, port = source[len("tcp://"):].rpartition(":")
+        return "tcp", (host or "127.0.0.1", int(port))
+    if source.startswith("sim:"):
+        sensors, _, hz = source[len("sim:"):].partition("@")
+        return "sim", (int(sensors), float(hz or DEFAULT_HZ))
+    return "file", (source[len("file:"):] if source.startswith("file:") else source,)
+
+
+def start_service(source=None, window_s=DEFAULT_WINDOW_S, hz=DEFAULT_HZ):
+    """입력원별로 한 번만 수집 스레드(asyncio 루프)를 띄우고 SensorHub를 반환합니다. 입력원이 없으면 None."""
+    source = source if source is not None else os.environ.get("RISK_SENSOR_SOURCE", "")
+    if not source:
+        return None
+    with _service_lock:
+        hub = _services.get(source)
+        if hub is not None:
+            return hub
+        kind, args = parse_source(source)
+        if kind == "sim":
+            hz = args[1]
+        hub = _services[source] = SensorHub(window=max(1, int(window_s * hz)))
+
+    async def run():
+        if kind == "tcp":
+            server = await serve_tcp(hub, *args)
+            async with server:
+                await server.serve_forever()
+        elif kind == "file":
+            await tail_file(hub, *args)
+        else:
+            await run_simulator(hub.ingest_text, args[0], args[1])
+
+    threading.Thread(target=asyncio.run, args=(run(),), name=f"sensor-ingest {source}", daemon=True).start()
+    return hub
+
+
+def describe(snapshot, levels=None):
+    """사이드바 / CLI 표시용 한 줄 요약들. levels를 주면 선행지표에 반영한 관리 수준도 덧붙입니다."""
+    lines = []
+    for kind, agg in snapshot.kinds.items():
+        spec = SENSOR_KINDS[kind]
+        if agg["sensors"]:
+            lines.append(
+                f"{spec.label}: 센서 {agg['sensors']:,}개 · 평균 {agg['mean']:.1f}{spec.unit} · 최고 {agg['worst_mean']:.1f}{spec.unit}"
+                f" · 경보 초과 {agg['over_fraction']:.1%}"
+            )
+    if levels:
+        lines.append("선행지표 반영: " + " · ".join(f"{LEADING_FIELD_LABELS[field]} {level}" for field, level in levels.items()))
+    return lines
+
+
+# --- CLI: 시뮬레이터 / 수집 확인 ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m risk_engine.sensors", description="보관 환경 센서 시뮬레이터 / 수집 확인")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sim = sub.add_parser("simulate", help="시뮬레이터 값을 TCP 수집기로 보내거나 파일에 덧붙임")
+    target = sim.add_mutually_exclusive_group(required=True)
+    target.add_argument("--tcp", metavar="HOST:PORT")
+    target.add_argument("--file", metavar="PATH")
+    sim.add_argument("--sensors", type=int, default=1000)
+    sim.add_argument("--hz", type=float, default=DEFAULT_HZ)
+    sim.add_argument("--duration", type=float, help="초 (기본: 계속)")
+    sim.add_argument("--seed", type=int, default=0)
+    watch = sub.add_parser("watch", help="입력원(RISK_SENSOR_SOURCE 형식)을 수집하며 집계와 선행지표 수준을 주기적으로 출력")
+    watch.add_argument("source")
+    watch.add_argument("--every", type=float, default=5.0, help="출력 주기 (초)")
+    args = parser.parse_args(argv)
+
+    if args.command == "simulate":
+        async def simulate():
+            if args.tcp:
+                host, _, port = args.tcp.rpartition(":")
+                _, writer = await asyncio.open_connection(host or "127.0.0.1", int(port))
+
+                async def send(text):
+                    writer.write(text.encode())
+                    await writer.drain()
+                await run_simulator(send, args.sensors, args.hz, args.duration, args.seed)
+                writer.close()
+            else:
+                with open(args.file, "a", encoding="utf-8") as f:
+                    def append(text):
+                        f.write(text)
+                        f.flush()
+                    await run_simulator(append, args.sensors, args.hz, args.duration, args.seed)
+        try:
+            asyncio.run(simulate())
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    hub = start_service(args.source)
+    try:
+        while True:
+            time.sleep(args.every)
+            snapshot = hub.snapshot()
+            print(f"표본 {snapshot.samples:,}개 (버림 {snapshot.rejected:,}) · 마지막 표본 {snapshot.age_s:.1f}초 전")
+            for line in describe(snapshot, hub.leading_levels(snapshot)) or ["(아직 수신한 표본 없음)"]:
+                print(f"  {line}", flush=True)
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
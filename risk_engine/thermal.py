@@ -0,0 +1,377 @@
+"""셀 원격 계측(전압 / 온도) 기반 열폭주 전조 감지.
+
+활성화(충방전) 공정의 셀마다 1 Hz로 들어오는 전압과 온도를 받아, 셀별 상태 배열만으로 증분 통계를 갱신합니다.
+- 온도 상승률(°C/s)과 전압 하강률(V/s)의 EWMA 평균 / 분산을 기준선으로 삼고
+- 표준화한 편차를 한쪽 방향 CUSUM으로 누적해 기준선보다 꾸준히 빠른 승온 / 전압 강하(내부 단락)를 잡습니다.
+- 절대 온도 상한(ABS_TEMP_C)을 넘으면 바로 경보합니다.
+CUSUM이 CUSUM_FREEZE를 넘으면 기준선을 고정해 전조 자체를 '정상'으로 학습하지 않습니다.
+셀 수만큼의 고정 크기 배열과 최근 경보 기록(상한 있는 deque)만 보관하므로 메모리는 셀 수에 비례하고 시간에 따라 늘지 않습니다.
+프레임(같은 시각의 여러 셀) 하나는 배열 연산 한 번으로 처리합니다 (100k 셀 x 1 Hz 기준 benchmarks/bench_thermal.py).
+
+감지한 경보 수는 frequency_floor()로 "활성화 공정 / 불량 셀 열폭주/발화" 위험요인의 빈도(F) 하한이 되어
+risk final.py의 F 슬라이더를 자동으로 올립니다.
+계측 한 줄 형식: "셀번호,전압,온도" (셀번호는 0부터의 정수). 입력원은 sensors와 같은 형식을 RISK_CELL_TELEMETRY로 지정합니다.
+    RISK_CELL_TELEMETRY=tcp://127.0.0.1:8766 / file:/var/log/cells.csv / sim:100000@1
+합성 계측 발생기: python -m risk_engine.thermal simulate --tcp 127.0.0.1:8766 --cells 100000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+import warnings
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+
+from .catalog import FS_PROCESS_CATALOG
+from .sensors import parse_source, serve_tcp, tail_file
+
+THERMAL_PROCESS = "활성화 공정"
+THERMAL_FACTOR = "불량 셀 열폭주/발화"
+THERMAL_FACTOR_INDEX = next(i for i, f in enumerate(FS_PROCESS_CATALOG[THERMAL_PROCESS].risk_factors) if f.name == THERMAL_FACTOR)
+
+# --- 감지 파라미터 ---
+EWMA_ALPHA = 0.02 # 기준선(변화율 평균/분산) 갱신 비율, 약 50초 기억
+WARMUP_SAMPLES = 30 # 셀별 이 수만큼 받기 전에는 CUSUM 경보 없음 (절대 온도 상한은 예외)
+CUSUM_K = 1.0 # 표준편차 단위 허용 폭
+CUSUM_H_TEMP = 8.0 # 경보 기준 (누적 표준편차)
+CUSUM_H_VOLT = 8.0
+CUSUM_FREEZE = 2.0 # CUSUM이 이 값 이상이면 그 셀의 기준선 학습을 멈춤
+MIN_TEMP_RATE_SD = 0.02 # °C/s. 분산이 아주 작은 셀에서 잡음 하나로 경보가 나지 않도록 하는 하한
+MIN_VOLT_RATE_SD = 0.002 # V/s
+ABS_TEMP_C = 60.0
+MAX_EVENTS = 10_000 # 보관하는 최근 경보 수
+# 경보한 셀은 이 시간(계측 시각 기준) 동안 다시 경보하지 않음. 지나면 자동 해제되어, 전조가 계속되거나 다시 생기면 또 경보.
+# 조치를 마치면 clear(셀)로 바로 해제 (페이지 사이드바의 '조치 완료')
+ALERT_LATCH_S = 3600
+# 셀 번호 상한: 셀 상태 배열은 가장 큰 셀 번호만큼 잡히므로, 엉뚱한 번호 한 줄이 수십 GB를 할당하지 않도록 그 이상은 버림
+MAX_CELLS = int(os.environ.get("RISK_MAX_CELLS", "1000000"))
+
+# 경보 사유 (비트)
+REASON_TEMP_RISE, REASON_VOLTAGE_DROP, REASON_ABS_TEMP = 1, 2, 4
+REASON_LABELS = {REASON_TEMP_RISE: "승온 가속", REASON_VOLTAGE_DROP: "전압 강하", REASON_ABS_TEMP: f"{ABS_TEMP_C:.0f}°C 초과"}
+
+# 최근 FREQUENCY_WINDOW_S 동안의 경보 수 → 위험요인 빈도(F) 하한: 경계 이상이면 (F 하한)
+FREQUENCY_WINDOW_S = 24 * 3600
+FREQUENCY_FLOORS = ((1, 3), (3, 4), (10, 5))
+
+
+@dataclass(frozen=True, slots=True)
+class ThermalEvent:
+    at: float # 경보 시각 (time.time())
+    cell: int
+    reasons: int # REASON_* 비트 합
+    temperature: float
+    voltage: float
+
+    def describe(self):
+        reasons = ", ".join(label for bit, label in REASON_LABELS.items() if self.reasons & bit)
+        return f"셀 {self.cell}: {reasons} ({self.temperature:.1f}°C, {self.voltage:.3f} V)"
+
+
+class ThermalDetector:
+    """셀별 증분 EWMA/CUSUM 상태. update()는 한 프레임(셀 번호 배열, 전압, 온도, 시각)을 한 번에 반영하고 새 경보를 반환합니다."""
+
+    def __init__(self, cells=0, max_cells=MAX_CELLS):
+        self.n = 0
+        self.max_cells = max(max_cells, cells)
+        self._lock = threading.Lock()
+        self.events = deque(maxlen=MAX_EVENTS)
+        self.samples = 0
+        self.rejected = 0
+        self.last_sample = None # time.monotonic()
+        self.t_now = None # 마지막 프레임의 계측 시각
+        self._alloc(max(cells, 1024))
+
+    def _alloc(self, capacity):
+        old = getattr(self, "temp", None)
+        grow = capacity - (0 if old is None else len(old))
+        fields = {
+            "temp": np.float64, "volt": np.float64, "t_last": np.float64,
+            "temp_mean": np.float64, "temp_var": np.float64, "volt_mean": np.float64, "volt_var": np.float64,
+            "cusum_temp": np.float64, "cusum_volt": np.float64, "seen": np.int32, "alerted": np.uint8, "alerted_at": np.float64,
+        }
+        for name, dtype in fields.items():
+            pad = np.zeros(grow, dtype=dtype)
+            setattr(self, name, pad if old is None else np.concatenate([getattr(self, name), pad]))
+
+    def _ensure(self, max_cell):
+        if max_cell >= len(self.temp):
+            self._alloc(max(max_cell + 1, 2 * len(self.temp)))
+        self.n = max(self.n, max_cell + 1)
+
+    def _valid(self, cells, voltage, temperature):
+        """반영할 수 있는 행: 셀 번호 0 ~ max_cells-1, 전압 / 온도가 유한한 값 (nan이 들어가면 그 셀의 변화율과 CUSUM이 계속 nan)."""
+        return (cells >= 0) & (cells < self.max_cells) & np.isfinite(voltage) & np.isfinite(temperature)
+
+    def update(self, cells, voltage, temperature, t):
+        """셀 번호는 프레임 안에서 겹치지 않아야 합니다 (1 Hz 계측의 한 시각). 새로 경보된 ThermalEvent 목록을 반환.
+        범위 밖 셀 번호나 유한하지 않은 전압 / 온도 행은 반영하지 않고 rejected에 셉니다."""
+        cells = np.asarray(cells, dtype=np.int64)
+        voltage = np.asarray(voltage, dtype=np.float64)
+        temperature = np.asarray(temperature, dtype=np.float64)
+        ok = self._valid(cells, voltage, temperature)
+        if not ok.all():
+            self.rejected += int((~ok).sum())
+            cells, voltage, temperature = cells[ok], voltage[ok], temperature[ok]
+        if len(cells) == 0:
+            return []
+        with self._lock:
+            self._ensure(int(cells.max()))
+            seen = self.seen[cells]
+            dt = np.where(seen > 0, t - self.t_last[cells], 0.0)
+            valid = dt > 0
+            dt = np.where(valid, dt, 1.0)
+            temp_rate = (temperature - self.temp[cells]) / dt
+            volt_rate = (voltage - self.volt[cells]) / dt
+
+            # 표준화 편차 (기준선 대비): 승온은 빠를수록, 전압은 빨리 떨어질수록 양수
+            temp_mean, temp_var = self.temp_mean[cells], self.temp_var[cells]
+            volt_mean, volt_var = self.volt_mean[cells], self.volt_var[cells]
+            z_temp = (temp_rate - temp_mean) / np.maximum(np.sqrt(temp_var), MIN_TEMP_RATE_SD)
+            z_volt = (volt_mean - volt_rate) / np.maximum(np.sqrt(volt_var), MIN_VOLT_RATE_SD)
+            cusum_temp = np.where(valid, np.maximum(0.0, self.cusum_temp[cells] + z_temp - CUSUM_K), self.cusum_temp[cells])
+            cusum_volt = np.where(valid, np.maximum(0.0, self.cusum_volt[cells] + z_volt - CUSUM_K), self.cusum_volt[cells])
+
+            # 준비 구간(WARMUP_SAMPLES)에는 CUSUM을 쌓지 않고 기준선만 배움 (누적 평균 1/n → EWMA로 이어짐)
+            warm = seen >= WARMUP_SAMPLES
+            cusum_temp = np.where(warm, cusum_temp, 0.0)
+            cusum_volt = np.where(warm, cusum_volt, 0.0)
+            # 기준선은 CUSUM이 CUSUM_FREEZE 아래인 셀만 갱신 (0일 때만 배우면 낮은 값만 골라 배워 분산이 줄어듦)
+            learn = valid & (cusum_temp < CUSUM_FREEZE) & (cusum_volt < CUSUM_FREEZE)
+            a = np.maximum(EWMA_ALPHA, 1.0 / np.maximum(seen, 1))
+            for mean, var, rate, name in ((temp_mean, temp_var, temp_rate, "temp"), (volt_mean, volt_var, volt_rate, "volt")):
+                delta = rate - mean
+                getattr(self, f"{name}_mean")[cells] = np.where(learn, mean + a * delta, mean)
+                getattr(self, f"{name}_var")[cells] = np.where(learn, (1 - a) * (var + a * delta * delta), var)
+
+            reasons = (
+                ((warm & (cusum_temp > CUSUM_H_TEMP)) * REASON_TEMP_RISE)
+                | ((warm & (cusum_volt > CUSUM_H_VOLT)) * REASON_VOLTAGE_DROP)
+                | ((temperature > ABS_TEMP_C) * REASON_ABS_TEMP)
+            )
+            latched = (self.alerted[cells] == 1) & (t - self.alerted_at[cells] < ALERT_LATCH_S)
+            fired = (reasons > 0) & ~latched
+
+            self.cusum_temp[cells] = cusum_temp
+            self.cusum_volt[cells] = cusum_volt
+            self.temp[cells] = temperature
+            self.volt[cells] = voltage
+            self.t_last[cells] = t
+            self.seen[cells] = np.minimum(seen + 1, np.iinfo(np.int32).max)
+            self.samples += len(cells)
+            self.last_sample = time.monotonic()
+            self.t_now = t
+            if not fired.any():
+                return []
+            hit = np.flatnonzero(fired)
+            self.alerted[cells[hit]] = 1
+            self.alerted_at[cells[hit]] = t
+            now = time.time()
+            new = [
+                ThermalEvent(now, int(c), int(r), float(tc), float(v))
+                for c, r, tc, v in zip(cells[hit], reasons[hit], temperature[hit], voltage[hit])
+            ]
+            self.events.extend(new)
+            return new
+
+    def ingest_text(self, text, t=None):
+        """"셀번호,전압,온도" 줄들을 한 프레임으로 반영합니다 (sensors의 TCP / 파일 입력원과 함께 사용)."""
+        t = time.time() if t is None else t
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            flat = np.fromstring(text.replace("\n", ","), sep=",")
+        if len(flat) % 3 == 0 and text.count("\n") + (not text.endswith("\n")) == len(flat) // 3:
+            rows = flat.reshape(-1, 3)
+        else: # 잘못된 줄이 섞였으면 줄 단위로 걸러냄
+            good = []
+            for line in text.splitlines():
+                try:
+                    cell, volt, temp = line.split(",")
+                    good.append((int(cell), float(volt), float(temp)))
+                except ValueError:
+                    self.rejected += line.strip() != ""
+            rows = np.array(good, dtype=np.float64).reshape(-1, 3)
+        if len(rows) == 0:
+            return 0
+        with np.errstate(invalid="ignore"):
+            cells = rows[:, 0].astype(np.int64)
+        # 중복 셀은 마지막 값만 쓰므로, 잘못된 행은 중복을 고르기 전에 걸러냄 (앞의 정상 값이 가려지지 않도록)
+        ok = (cells == rows[:, 0]) & self._valid(cells, rows[:, 1], rows[:, 2])
+        self.rejected += int((~ok).sum())
+        rows, cells = rows[ok], cells[ok]
+        # 같은 덩어리에 한 셀이 여러 번 있으면(프레임 경계가 덩어리 안에 있음) 마지막 값만 이번 시각으로 반영
+        cells_rev = cells[::-1]
+        _, last = np.unique(cells_rev, return_index=True)
+        pick = len(cells) - 1 - last
+        self.update(cells[pick], rows[pick, 1], rows[pick, 2], t)
+        return len(pick)
+
+    def clear(self, cell=None):
+        """경보 해제 (조치 완료). cell이 없으면 모든 셀."""
+        with self._lock:
+            target = slice(None) if cell is None else cell
+            self.alerted[target] = 0
+            self.cusum_temp[target] = 0.0
+            self.cusum_volt[target] = 0.0
+
+    def latched_cells(self):
+        """경보 후 재경보가 막혀 있는 셀 번호 (ALERT_LATCH_S가 지나지 않았고 clear()하지 않은 셀)."""
+        with self._lock:
+            if self.t_now is None:
+                return []
+            n = self.n
+            latched = (self.alerted[:n] == 1) & (self.t_now - self.alerted_at[:n] < ALERT_LATCH_S)
+            return np.flatnonzero(latched).tolist()
+
+    def recent_events(self, window_s=FREQUENCY_WINDOW_S):
+        cutoff = time.time() - window_s
+        with self._lock:
+            return [e for e in self.events if e.at >= cutoff]
+
+    def frequency_floor(self, window_s=FREQUENCY_WINDOW_S):
+        """최근 경보 수로 정한 열폭주 위험요인 빈도(F) 하한. 경보가 없으면 None (슬라이더 값 그대로)."""
+        count = len(self.recent_events(window_s))
+        floor = None
+        for at_least, level in FREQUENCY_FLOORS:
+            if count >= at_least:
+                floor = level
+        return floor
+
+    def state_bytes(self):
+        return sum(getattr(self, name).nbytes for name in (
+            "temp", "volt", "t_last", "temp_mean", "temp_var", "volt_mean", "volt_var", "cusum_temp", "cusum_volt", "seen", "alerted",
+            "alerted_at",
+        ))
+
+
+# --- 합성 계측 발생기 ---
+class CellSimulator:
+    """충방전 중인 셀들의 1 Hz 계측. 평소에는 완만한 승온 / 전압 변화와 잡음뿐이고,
+    runaway_rate 확률로 셀 하나가 열폭주 전조(가속 승온 + 전압 강하)에 들어갑니다. onset[셀] = 전조 시작 틱 (-1이면 정상)."""
+
+    def __init__(self, cells, seed=0, runaway_rate=2e-7):
+        self.cells = cells
+        self.rng = np.random.default_rng(seed)
+        self.runaway_rate = runaway_rate
+        self.tick_no = 0
+        self.temp = 25.0 + self.rng.normal(0, 1.0, cells)
+        self.volt = 3.6 + self.rng.normal(0, 0.02, cells)
+        self.charging = self.rng.random(cells) < 0.5
+        self.onset = np.full(cells, -1, dtype=np.int64)
+        self.ids = np.arange(cells)
+
+    def inject(self, cells):
+        self.onset[np.asarray(cells)] = self.tick_no
+
+    def tick(self):
+        """(셀 번호, 전압, 온도) 배열."""
+        rng, n = self.rng, self.cells
+        flip = rng.random(n) < 1 / 1800 # 약 30분마다 충전/방전 전환
+        self.charging ^= flip
+        start = (self.onset < 0) & (rng.random(n) < self.runaway_rate)
+        self.onset[start] = self.tick_no
+        self.temp += np.where(self.charging, 0.004, -0.004) + rng.normal(0, 0.01, n)
+        self.temp += (25.0 - self.temp) * 0.001
+        self.volt += np.where(self.charging, 0.0002, -0.0002) + rng.normal(0, 0.0005, n)
+        self.volt = np.clip(self.volt, 3.0, 4.2)
+        bad = self.onset >= 0
+        if bad.any():
+            age = (self.tick_no - self.onset[bad]).astype(np.float64)
+            self.temp[bad] += 0.03 * np.exp(age / 60.0) # 약 1분마다 e배로 빨라지는 승온
+            self.volt[bad] -= 0.0005 * (1 + age / 30.0) # 점점 빨라지는 전압 강하 (내부 단락)
+        self.tick_no += 1
+        return self.ids, self.volt + rng.normal(0, 0.001, n), self.temp + rng.normal(0, 0.02, n)
+
+    def lines(self):
+        cells, volt, temp = self.tick()
+        return "".join(f"{c},{v:.4f},{t:.2f}\n" for c, v, t in zip(cells.tolist(), volt.tolist(), temp.tolist()))
+
+
+async def run_cell_simulator(sink, cells, hz=1.0, duration=None, seed=0, text=True):
+    """hz 주기로 전 셀 계측을 sink에 넘깁니다. text면 줄 문자열, 아니면 (셀, 전압, 온도) 배열. sink가 코루틴이면 await."""
+    sim = CellSimulator(cells, seed)
+    period = 1.0 / hz
+    next_tick = time.monotonic()
+    end = None if duration is None else next_tick + duration
+    while end is None or next_tick < end:
+        result = sink(sim.lines() if text else sim.tick())
+        if asyncio.iscoroutine(result):
+            await result
+        next_tick += period
+        await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+
+
+# --- 페이지용 감지 서비스 (프로세스당 한 번) ---
+_service_lock = threading.Lock()
+_services = {}
+
+
+def start_service(source=None):
+    """입력원별로 한 번만 수집 스레드를 띄우고 ThermalDetector를 반환합니다. RISK_CELL_TELEMETRY 미설정 시 None."""
+    source = source if source is not None else os.environ.get("RISK_CELL_TELEMETRY", "")
+    if not source:
+        return None
+    with _service_lock:
+        detector = _services.get(source)
+        if detector is not None:
+            return detector
+        kind, args = parse_source(source)
+        detector = _services[source] = ThermalDetector(args[0] if kind == "sim" else 0)
+
+    async def run():
+        if kind == "tcp":
+            server = await serve_tcp(detector, *args)
+            async with server:
+                await server.serve_forever()
+        elif kind == "file":
+            await tail_file(detector, *args)
+        else:
+            await run_cell_simulator(lambda frame: detector.update(*frame, time.time()), args[0], args[1], text=False)
+
+    threading.Thread(target=asyncio.run, args=(run(),), name=f"thermal-detector {source}", daemon=True).start()
+    return detector
+
+
+# --- CLI: 합성 계측 발생기 ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m risk_engine.thermal", description="셀 계측 합성 발생기 (열폭주 전조 감지 시험용)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sim = sub.add_parser("simulate", help="합성 계측을 TCP 수집기로 보내거나 파일에 덧붙임")
+    target = sim.add_mutually_exclusive_group(required=True)
+    target.add_argument("--tcp", metavar="HOST:PORT")
+    target.add_argument("--file", metavar="PATH")
+    sim.add_argument("--cells", type=int, default=10_000)
+    sim.add_argument("--hz", type=float, default=1.0)
+    sim.add_argument("--duration", type=float, help="초 (기본: 계속)")
+    sim.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    async def simulate():
+        if args.tcp:
+            host, _, port = args.tcp.rpartition(":")
+            _, writer = await asyncio.open_connection(host or "127.0.0.1", int(port))
+
+            async def send(text):
+                writer.write(text.encode())
+                await writer.drain()
+            await run_cell_simulator(send, args.cells, args.hz, args.duration, args.seed)
+            writer.close()
+        else:
+            with open(args.file, "a", encoding="utf-8") as f:
+                def append(text):
+                    f.write(text)
+                    f.flush()
+                await run_cell_simulator(append, args.cells, args.hz, args.duration, args.seed)
+    try:
+        asyncio.run(simulate())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""페이지 구간별 소요 시간 측정 (선택 기능).
+
+Streamlit 페이지는 위에서 아래로 한 번에 실행되므로, 구간 시작 지점마다 timer.section("이름")을 부르면
+직전 구간이 닫히고 새 구간이 열립니다. 세션별 최근 기록으로 p50/p95를 계산하고, 프로세스 전체 누적은
+Prometheus 텍스트 형식(히스토그램)으로 로컬 파일에 내보낼 수 있습니다.
+측정을 끈 세션은 NULL_TIMER(아무 일도 하지 않는 객체)를 쓰므로 재실행 비용이 늘지 않습니다.
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+DEFAULT_WINDOW = 500 # 세션별로 구간당 보관하는 최근 측정 수
+DEFAULT_METRICS_PATH = os.environ.get("RISK_METRICS_PATH", "risk_metrics.prom")
+AUTO_EXPORT_INTERVAL = 5.0 # 초. RISK_METRICS_PATH가 설정되어 있으면 이 주기로 자동 내보내기
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0) # 초
+TOTAL = "전체 재실행"
+METRIC = "risk_section_duration_seconds"
+
+
+def timing_enabled_by_default():
+    return os.environ.get("RISK_TIMING", "").lower() in ("1", "true", "yes", "on")
+
+
+# --- 프로세스 전체 누적 (모든 세션, Prometheus 히스토그램) ---
+class TimingRegistry:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {} # (page, section) -> [버킷별 건수..., 합계, 건수]
+        self._next_export = 0.0
+
+    def observe(self, page, section, seconds):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get((page, section))
+            if series is None:
+                series = self._series[(page, section)] = [0] * (len(self.buckets) + 2)
+            series[i] += 1 # 누적 합은 내보낼 때 계산
+            series[-2] += seconds
+            series[-1] += 1
+
+    def prometheus_text(self):
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        lines = [f"# HELP {METRIC} 페이지 구간별 재실행 소요 시간", f"# TYPE {METRIC} histogram"]
+        for (page, section), series in sorted(snapshot.items()):
+            labels = f'page="{_escape(page)}",section="{_escape(section)}"'
+            cumulative = 0
+            for le, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{METRIC}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{METRIC}_bucket{{{labels},le="+Inf"}} {series[-1]}')
+            lines.append(f"{METRIC}_sum{{{labels}}} {series[-2]:.6f}")
+            lines.append(f"{METRIC}_count{{{labels}}} {series[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=DEFAULT_METRICS_PATH):
+        """임시 파일에 쓴 뒤 교체하므로 수집기가 반쯤 쓰인 파일을 읽지 않습니다 (node_exporter textfile 수집기와 호환)."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+        return path
+
+    def maybe_export(self):
+        path = os.environ.get("RISK_METRICS_PATH")
+        now = time.monotonic()
+        if path and now >= self._next_export:
+            self._next_export = now + AUTO_EXPORT_INTERVAL
+            self.export(path)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = TimingRegistry()
+
+
+# --- 세션별 구간 타이머 ---
+class SectionTimer:
+    """한 세션의 구간별 소요 시간. start_run() → section(...) ... → finish() 순서로 부릅니다."""
+
+    def __init__(self, page, window=DEFAULT_WINDOW, registry=REGISTRY):
+        self.page = page
+        self.window = window
+        self.registry = registry
+        self.samples = {} # 구간 이름 -> 최근 측정값(초) deque, 처음 기록된 순서 유지
+        self.reruns = 0
+        self._current = None
+        self._started = 0.0
+        self._run_started = None
+
+    def start_run(self, first_section="준비"):
+        # 직전 실행이 st.stop() 등으로 finish() 없이 끝났다면 열린 구간은 버림
+        self._current = None
+        self.reruns += 1
+        self._run_started = time.perf_counter()
+        self.section(first_section)
+
+    def section(self, name):
+        now = time.perf_counter()
+        self._close(now)
+        self._current, self._started = name, now
+
+    def finish(self):
+        if self._run_started is None:
+            return
+        now = time.perf_counter()
+        self._close(now)
+        self._record(TOTAL, now - self._run_started)
+        self._run_started = None
+        self.registry.maybe_export()
+
+    def fragment(self, name):
+        """st.fragment 함수용 데코레이터. 전체 재실행 중에는 감싼 구간에 그대로 포함되고,
+        fragment만 다시 실행될 때는 '{name} (부분 재실행)' 구간으로 따로 기록합니다."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if self._run_started is not None:
+                    return fn(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self._record(f"{name} (부분 재실행)", time.perf_counter() - started)
+                    self.registry.maybe_export()
+            return wrapper
+        return decorate
+
+    def _close(self, now):
+        if self._current is not None:
+            self._record(self._current, now - self._started)
+            self._current = None
+
+    def _record(self, name, seconds):
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.window)
+        samples.append(seconds)
+        self.registry.observe(self.page, name, seconds)
+
+    def stats(self):
+        """구간별 [{"구간", "횟수", "p50 (ms)", "p95 (ms)", "최근 (ms)", "비중 (%)"}], 전체 재실행은 맨 아래."""
+        total = self.samples.get(TOTAL)
+        total_p50 = float(np.median(total)) if total else 0.0
+        rows = []
+        for name, samples in self.samples.items():
+            arr = np.fromiter(samples, dtype=float, count=len(samples)) * 1000
+            p50, p95 = np.percentile(arr, [50, 95])
+            rows.append({
+                "구간": name, "횟수": len(arr), "p50 (ms)": round(float(p50), 1), "p95 (ms)": round(float(p95), 1),
+                "최근 (ms)": round(float(arr[-1]), 1), "비중 (%)": round(float(p50) / (total_p50 * 10), 1) if total_p50 else None,
+            })
+        rows.sort(key=lambda row: row["구간"] == TOTAL)
+        return rows
+
+
+class _NullTimer:
+    """측정을 끈 세션용: 모든 호출이 아무 일도 하지 않습니다."""
+    reruns = 0
+
+    def start_run(self, first_section="준비"):
+        pass
+
+    def section(self, name):
+        pass
+
+    def finish(self):
+        pass
+
+    def fragment(self, name):
+        return lambda fn: fn
+
+    def stats(self):
+        return []
+
+
+NULL_TIMER = _NullTimer()
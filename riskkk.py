@@ -1,28 +1,74 @@
 import streamlit as st
-import matplotlib.pyplot as plt
+import os
 import time
+from dataclasses import replace
+
+from risk_engine import SCHEME_ARICELL, Assessment, LaggingInputs, LeadingInputs, evaluate
+from risk_engine.catalog import ARICELL_PROCESS_STEPS
+from risk_engine.charts import comparison_chart, sensitivity_chart, start_warm_up, tornado_chart
+from risk_engine.contributions import LeadingContributions
+from risk_engine.history import HistoryStore
+from risk_engine.incidents import ALL_SITES, describe as describe_incidents, start_service as start_incident_service
+from risk_engine.rca import ENHANCE_OPTIONS, rank_enhancements
+from risk_engine.reports import MIME_TYPES, export_portfolio_zip, jobs_from_history, render_report, report_for, xlsx_available
+from risk_engine.sensitivity import heatmap, sweep_params, tornado
+from risk_engine.sensors import PAGE_REFRESH_S, describe as describe_sensors, start_service as start_sensor_service
+from risk_engine.timing import NULL_TIMER, REGISTRY, SectionTimer, timing_enabled_by_default
 
 st.set_page_config(layout="wide", page_title="AI 스마트 배터리 JSA - 아리셀 교훈")
+start_warm_up() # 차트용 matplotlib import / 한글 글꼴 준비를 백그라운드에서 (프로세스당 한 번)
+
+# --- 디버그: 구간별 소요 시간 측정 (사이드바에서 켜기, RISK_TIMING=1이면 기본 켜짐) ---
+timing_enabled = st.sidebar.toggle("⏱️ 구간별 소요 시간 측정 (디버그)", value=timing_enabled_by_default(), key="debug_timing")
+if timing_enabled and "section_timer" not in st.session_state:
+    st.session_state.section_timer = SectionTimer("riskkk")
+timer = st.session_state.section_timer if timing_enabled else NULL_TIMER
+timer.start_run()
+
+def render_timing_panel():
+    timer.finish()
+    if timing_enabled:
+        with st.sidebar.expander("⏱️ 구간별 소요 시간 (이 세션 p50 / p95)", expanded=True):
+            st.caption(f"재실행 {timer.reruns}회 기준 · 비중은 전체 재실행 p50 대비")
+            st.table(timer.stats())
+            if st.button("📤 Prometheus 텍스트로 내보내기", key="export_timing"):
+                st.success(f"저장: {os.path.abspath(REGISTRY.export())}")
 st.title("💡 아리셀 JSA (선행 vs 후행) 💡")
 st.markdown("---")
 st.write("**선행지표**와 **'과거의 실제 사고 결과 및 관리 부실'을 분석하는 후행지표**를 각각 평가합니다. 특히 **아리셀 배터리 공장 사고의 '교훈'을 후행지표 평가에 직접 반영**하여, 선행지표만으로는 파악하기 어려운 '숨겨진 위험'이 어떻게 존재했는지를 보여주며 실제 산업현장의 위험을 보다 정확하게 이해하고 효과적인 예방 전략을 수립할 수 있습니다. ✨")
 st.markdown("---")
 
 # --- 배터리 제조 공정 단계 정의 ---
-process_steps_info = {
-    "양극 혼합 및 코팅": "배터리 재료(화학물질)를 혼합하고 전극에 코팅하는 단계. 화학물질 취급, 분진, 슬러리, 화재/폭발 위험이 있습니다.",
-    "프레스 및 슬리팅": "코팅된 전극을 압착하여 밀도를 높이고(프레스) 폭에 맞춰 자르는(슬리팅) 단계. 기계적 끼임, 절단, 그리고 불량 제품(배터리)으로 인한 발열, 화재/폭발 위험이 내재되어 있습니다. 특히 이 공정은 **아리셀 배터리 공장 화재·폭발 사고가 발생한 핵심 '사고 발생 위치'**입니다.",
-    "셀 조립 및 전해액 주입": "양극, 음극, 분리막을 조립하고(권취, 스태킹) 배터리 핵심 물질인 전해액을 주입하는 단계. 화학물질 유출, 중독, 질식, 화재 위험이 높습니다.",
-    "밀봉 및 활성화": "전해액이 주입된 셀을 외부와 완벽히 차단하고(밀봉) 초기 충방전을 통해 셀의 성능을 깨우는(활성화) 단계. 밀봉 불량, 폭발(불량 셀), 화재, 과열 위험이 내재되어 있습니다.",
-    "충방전 테스트": "완성된 셀, 모듈, 팩의 성능을 검사하기 위해 반복적인 충방전을 수행하는 단계. 과열, 발화, 폭발, 전기적 위험이 높습니다.",
-    "모듈/팩 조립 및 최종 검사": "개별 셀들을 모듈 또는 팩 형태로 연결하고(배선, 용접) 최종 성능을 검사 후 포장하는 단계. 기계적 손상, 감전, 단락, 화재 위험이 내재되어 있습니다."
-}
+# 공정 단계 설명 카탈로그는 risk_engine.catalog에 한 벌만 두고 모든 세션이 공유 (재실행마다 새로 만들지 않음)
+process_steps_info = ARICELL_PROCESS_STEPS
 process_options = list(process_steps_info.keys())
 selected_process_step = st.selectbox("🔋 배터리 제조 공정 단계 선택", process_options)
 
 st.markdown("---")
 
+# --- 보관 환경 센서 연동 (RISK_SENSOR_SOURCE 설정 시): 환기 / 화학물질 노출 / 저장 관리 항목을 센서 이동 구간 집계로 자동 입력 ---
+sensor_hub = start_sensor_service() # 프로세스당 수집 스레드 하나, 모든 세션이 공유
+use_sensors = sensor_hub is not None and st.sidebar.toggle("📡 센서 실측값으로 환경 항목 자동 입력", value=True, key="use_sensors")
+sensor_levels = sensor_hub.leading_levels() if use_sensors else {}
+
+@st.fragment(run_every=PAGE_REFRESH_S)
+def sensor_panel():
+    """센서 집계를 주기적으로 보여 주고, 관리 수준이 바뀌었을 때만 페이지 전체를 다시 평가합니다."""
+    snapshot = sensor_hub.snapshot()
+    st.caption(f"📡 센서 표본 {snapshot.samples:,}개 · 마지막 수신 {snapshot.age_s:.0f}초 전")
+    for line in describe_sensors(snapshot, sensor_levels):
+        st.caption(line)
+    if snapshot.stale:
+        st.warning("센서 값이 끊겨 슬라이더 입력을 사용합니다.")
+    if sensor_hub.leading_levels(snapshot) != sensor_levels:
+        st.rerun()
+
+if use_sensors:
+    with st.sidebar:
+        sensor_panel()
+
 # --- 1. 선행지표 입력 ---
+timer.section("1️⃣ 선행지표 입력")
 st.subheader("1️⃣ 선행지표 입력 (현재 작업환경 및 관리 시스템 건전성 평가 - 예방 노력)")
 st.markdown("현재 시점에서 작업장 환경, 설비 관리 상태, 작업자의 안전 행동, 그리고 전반적인 안전 관리 시스템의 **잠재적 위험 요인과 예방 노력**을 평가합니다.")
 
@@ -31,9 +77,9 @@ col1, col2 = st.columns(2)
 with col1:
     st.write("### 👷 작업 환경")
     env_cleanliness = st.slider("작업장 청결도 (1:불량 ~ 5:우수)", 1, 5, 3, key="s_env_c")
-    env_ventilation = st.slider("작업장 환기 상태 (1:불량 ~ 5:우수)", 1, 5, 3, key="s_env_v")
+    env_ventilation = st.slider("작업장 환기 상태 (1:불량 ~ 5:우수)", 1, 5, 3, key="s_env_v", disabled="env_ventilation" in sensor_levels)
     env_orderliness = st.slider("작업장 정리정돈 상태 (1:불량 ~ 5:우수)", 1, 5, 3, key="s_env_o")
-    env_chemical_exposure = st.slider("환경 화학물질 노출 농도 (1:낮음 ~ 5:높음)", 1, 5, 2, key="s_env_ce")
+    env_chemical_exposure = st.slider("환경 화학물질 노출 농도 (1:낮음 ~ 5:높음)", 1, 5, 2, key="s_env_ce", disabled="env_chemical_exposure" in sensor_levels)
     env_dust_level = st.slider("환경 분진 농도 (1:낮음 ~ 5:높음)", 1, 5, 2, key="s_env_d")
 
     st.write("### 👨‍🏭 작업자 안전 행동")
@@ -54,7 +100,7 @@ with col2:
     fire_facility_adequacy = st.selectbox("소방시설 법적 기준 준수", ["기준 초과 설치", "법적 기준 준수", "설치 미흡/대상 아님"], key="s_sm_ffa")
     special_extinguisher_presence = st.radio("특수 소화기(배터리 전용) 보유 여부", ["보유", "미보유"], key="s_sm_sep")
     chemical_mgmt_msds = st.slider("화학물질 MSDS 관리 및 교육 (1:불량 ~ 5:우수)", 1, 5, 3, key="s_c_msds")
-    chemical_mgmt_storage = st.slider("화학물질 저장/취급 관리 (1:불량 ~ 5:우수)", 1, 5, 3, key="s_c_st")
+    chemical_mgmt_storage = st.slider("화학물질 저장/취급 관리 (1:불량 ~ 5:우수)", 1, 5, 3, key="s_c_st", disabled="chemical_mgmt_storage" in sensor_levels)
     jsa_performance = st.slider("JSA(작업안전분석) 수행 완성도 (1:낮음 ~ 5:높음)", 1, 5, 3, key="s_j_p")
     sops_compliance = st.slider("작업표준서(SOP) 준수도 (1:불량 ~ 5:우수)", 1, 5, 3, key="s_s_c")
     worker_safety_education_freq = st.slider("정기 안전 교육 빈도 (월)", 0, 4, 1, key="s_w_sef")
@@ -62,7 +108,32 @@ with col2:
 
 st.markdown("---")
 
+# --- 사고/점검/과태료 기록 연동 (RISK_INCIDENT_LOGS 설정 시): 인명 피해 / 벌금 / 초과 보관 / 보고 누락 항목을 기록 집계로 자동 입력 ---
+incident_ledger = start_incident_service() # 프로세스당 수집 스레드 하나, 모든 세션이 공유 (덧붙은 기록만 증분 수집)
+use_records = incident_ledger is not None and st.sidebar.toggle("🗂️ 사고/점검/과태료 기록으로 후행지표 자동 입력", value=True, key="use_records")
+record_site, incident_fields = ALL_SITES, {}
+if use_records and incident_ledger.last_refresh is not None: # 첫 수집이 끝나기 전에는 직접 입력값 사용
+    record_site = st.sidebar.selectbox("기록 집계 사업장", [ALL_SITES] + incident_ledger.sites(), format_func=lambda site: site or "전체", key="record_site")
+    incident_fields = incident_ledger.lagging_fields(record_site)
+incident_version = incident_ledger.version if use_records else None
+
+@st.fragment(run_every=PAGE_REFRESH_S)
+def incident_panel():
+    """기록 집계를 보여 주고, 새 기록이 반영됐을 때만 페이지 전체를 다시 평가합니다."""
+    if incident_ledger.last_refresh is None:
+        st.info("🗂️ 기록 파일을 처음 수집하는 중입니다. 끝날 때까지 직접 입력값을 사용합니다.")
+    else:
+        for line in describe_incidents(incident_ledger.counts(record_site), incident_fields):
+            st.caption(line)
+    if incident_ledger.version != incident_version:
+        st.rerun()
+
+if use_records:
+    with st.sidebar:
+        incident_panel()
+
 # --- 2. 후행지표 입력 ---
+timer.section("2️⃣ 후행지표 입력")
 st.subheader("2️⃣ 후행지표 입력 (과거 사고 결과 및 관리 시스템의 '실질적 부실' 평가)")
 st.markdown("과거에 실제로 발생했던 사고/사건, 법규 위반, 관리 시스템의 누적된 부실 등을 통해 **'시스템의 진정한 취약성'**을 평가합니다.")
 st.markdown("💡 **만약 '아리셀 공장'의 사고 전 상태를 시뮬레이션한다면, 아래 항목들을 해당 사고가 발생할만한 상태로 설정해보세요! (특히 '예', '있음', '확인됨', '부적절/불법 논란', '미흡' 등을 선택)**")
@@ -71,116 +142,62 @@ col_lag1, col_lag2 = st.columns(2)
 
 with col_lag1:
     st.write("### 💥 과거 인명 피해 발생")
-    past_fatalities_count = st.number_input("과거 사망자 수 (명)", min_value=0, value=0, key="l_f_c")
-    past_injuries_count = st.number_input("과거 부상자 수 (명)", min_value=0, value=0, key="l_i_c")
+    past_fatalities_count = st.number_input("과거 사망자 수 (명)", min_value=0, value=0, key="l_f_c", disabled="past_fatalities_count" in incident_fields)
+    past_injuries_count = st.number_input("과거 부상자 수 (명)", min_value=0, value=0, key="l_i_c", disabled="past_injuries_count" in incident_fields)
 
     st.write("### 💸 과거 법규 위반 및 행정 처분")
-    past_fine_history_level = st.selectbox("과거 안전 관련 벌금 부과 이력 (정성적 수준)", ["없음", "있음 (1회성)", "상습적/중요 위반 (2회 이상)"], key="l_pf_h")
-    past_hazard_over_storage = st.selectbox("과거 위험물질 기준 초과 보관 적발 이력", ["없음", "있음"], key="l_ph_os") # 아리셀 리튬 초과 보관 반영
+    past_fine_history_level = st.selectbox("과거 안전 관련 벌금 부과 이력 (정성적 수준)", ["없음", "있음 (1회성)", "상습적/중요 위반 (2회 이상)"], key="l_pf_h", disabled="past_fine_history_level" in incident_fields)
+    past_hazard_over_storage = st.selectbox("과거 위험물질 기준 초과 보관 적발 이력", ["없음", "있음"], key="l_ph_os", disabled="past_hazard_over_storage" in incident_fields) # 아리셀 리튬 초과 보관 반영
 
 with col_lag2:
     st.write("### 📝 과거 안전 관리 시스템의 허점")
-    past_hidden_accident_reports = st.selectbox("과거 경미 사고 보고 누락/은폐 정황이 있었습니까?", ["없음", "의혹 있음", "확인됨"], key="l_ph_ar")
+    past_hidden_accident_reports = st.selectbox("과거 경미 사고 보고 누락/은폐 정황이 있었습니까?", ["없음", "의혹 있음", "확인됨"], key="l_ph_ar", disabled="past_hidden_accident_reports" in incident_fields)
     past_safety_training_adequacy = st.selectbox("과거 안전 교육 및 인력 관리 적절성 (특히 파견직)", ["매우 적절", "보통", "부적절/불법 논란"], key="l_pst_a")
     past_safety_audit_compliance = st.selectbox("과거 안전 감사 지적사항 개선 실적", ["모두 개선 완료", "일부 개선", "개선 미흡/형식적"], key="l_psa_c")
     past_government_intervention = st.selectbox("과거 정부/기관으로부터의 작업중지 또는 강력 권고 이행 여부", ["모두 이행", "일부 이행", "이행 미흡"], key="l_pg_i")
 
 st.markdown("---")
 
-# --- 점수 → 등급 변환 함수 ---
-def score_to_grade(score, score_type="leading"):
-    # 선행지표 점수 범위 (가정: 0~100점 내외)
-    if score_type == "leading":
-        if score <= 20: return "매우 낮음"
-        elif score <= 40: return "낮음"
-        elif score <= 60: return "보통"
-        elif score <= 80: return "높음"
-        else: return "매우 높음"
-    # 후행지표 점수 범위 (사망자수 포함하여 최대 300점 정도로 재조정)
-    elif score_type == "lagging":
-        if score <= 40: return "매우 낮음"   # 이전 50점 이하 (벌금 없음, 사망 0)
-        elif score <= 90: return "낮음"    # 이전 100점 이하 (벌금 1회, 사망 0-1)
-        elif score <= 180: return "보통"   # 이전 180점 이하 (초과 보관 등, 사망 1-3)
-        elif score <= 280: return "높음"   # 이전 250점 이하 (인명사고, 시스템 부실 다수)
-        else: return "매우 높음"  # 280점 초과 (아리셀급 대참사, 28명 사망 등)
-    return "알 수 없음"
-
-# --- 3. 선행지표 평가 함수 (Current Potential Risk) ---
-def evaluate_leading_risk_score():
-    score = 0
-    # 작업 환경 (값이 낮을수록 위험)
-    score += (6 - env_cleanliness) * 2
-    score += (6 - env_ventilation) * 2
-    score += (6 - env_orderliness) * 2
-    score += env_chemical_exposure * 3 # 높을수록 위험
-    score += env_dust_level * 3 # 높을수록 위험
-
-    # 작업자 안전 행동
-    if worker_skill == "미숙련": score += 5
-    elif worker_skill == "보통": score += 2
-    score += (6 - worker_safety_compliance) * 4 # 낮을수록 위험
-    score += (6 - worker_ppe_compliance) * 4 # 낮을수록 위험
-    score += (6 - worker_fatigue) * 2 # 피로도 높을수록 위험
-    
-    # 정기 안전 교육 빈도: 월 0~4회 (0이면 5점, 4이면 1점)
-    score += (5 - worker_safety_education_freq) * 2 
-
-    # 설비 건전성 및 관리
-    score += (6 - equip_condition) * 4 # 낮을수록 위험
-    score += (6 - equip_inspection_cycle) * 3 # 낮을수록 위험
-    if equip_breakdown_history == "3회 이상": score += 5
-    elif equip_breakdown_history == "1~2회": score += 2
-    score += (6 - equip_maintenance_quality) * 3 # 낮을수록 위험
-
-    # 안전 관리 시스템 (선행적 요소)
-    if safety_inspection_status == "점검 미흡/미실시": score += 5
-    elif safety_inspection_status == "샘플점검 위주": score += 3 # 아리셀 사례
-    if fire_facility_adequacy == "설치 미흡/대상 아님": score += 4 # 아리셀 스프링클러 사례
-    elif fire_facility_adequacy == "법적 기준 준수": score += 1
-    if special_extinguisher_presence == "미보유": score += 5 # 아리셀 특수소화기 사례
-    score += (6 - chemical_mgmt_msds) * 3 # 낮을수록 위험
-    score += (6 - chemical_mgmt_storage) * 4 # 낮을수록 위험
-    score += (6 - jsa_performance) * 3 # JSA 미흡시 위험
-    score += (6 - sops_compliance) * 2 # SOP 준수 미흡시 위험
-    score += (6 - ptw_compliance) * 3 # PTW 미준수시 위험
-
-    return round(score, 2)
-
-# --- 4. 후행지표 평가 함수 (Past Actual Risk & Systemic Failures) ---
-def evaluate_lagging_risk_score():
-    score = 0
-    # 과거 인명 피해 발생 (가장 강력한 가중치)
-    score += past_fatalities_count * 50 # 사망자 1명당 50점 (28명 사망시 1400점. 다른 요소들과 균형을 위해 조정)
-    score += past_injuries_count * 10 # 부상자 1명당 10점
-
-    # 과거 법규 위반 및 행정 처분 (아리셀 총체적 부실 반영)
-    if past_fine_history_level == "있음 (1회성)": score += 20
-    elif past_fine_history_level == "상습적/중요 위반 (2회 이상)": score += 40 # 벌금 이력이 많으면 심각성 증대
-    if past_hazard_over_storage == "있음": score += 60 # 위험물질 초과 보관은 매우 심각 (아리셀)
-
-    # 과거 안전 관리 시스템의 허점 (아리셀 총체적 부실 반영)
-    if past_hidden_accident_reports == "의혹 있음": score += 30
-    elif past_hidden_accident_reports == "확인됨": score += 60 # 확정된 문제 (아리셀)
-    
-    if past_safety_training_adequacy == "부적절/불법 논란": score += 50 # 아리셀 파견직 교육 부실 등 강력 가중
-    
-    if past_safety_audit_compliance == "50% 미만 (개선 미흡)": score += 50 # 감사 지적 개선 미흡 (강력 반영)
-    elif past_safety_audit_compliance == "50~99%": score += 25
-    
-    if past_government_intervention == "이행 미흡": score += 40 # 정부 권고 무시 심각
-
-    return round(score, 2)
-
-# --- 5. 평가 수행 ---
-with st.spinner('위험성 평가를 분석 중입니다... 🧐'):
-    time.sleep(1.5)
-    leading_score_raw = evaluate_leading_risk_score()
-    lagging_score_raw = evaluate_lagging_risk_score()
-
-    leading_grade = score_to_grade(leading_score_raw, "leading")
-    lagging_grade = score_to_grade(lagging_score_raw, "lagging")
+# --- 3~5. 평가 수행 (risk_engine: 입력 레코드 기준 캐시) ---
+timer.section("평가 수행")
+# 노출 농도/분진 농도/피로도는 높을수록 위험하므로 엔진의 '관리 수준'(6 - 값)으로 변환
+assessment = Assessment(
+    leading=replace(LeadingInputs(
+        env_cleanliness=env_cleanliness, env_ventilation=env_ventilation, env_orderliness=env_orderliness,
+        env_chemical_exposure=6 - env_chemical_exposure, env_dust_level=6 - env_dust_level,
+        worker_skill=worker_skill, worker_safety_compliance=worker_safety_compliance,
+        worker_ppe_compliance=worker_ppe_compliance, worker_fatigue_mgmt=6 - worker_fatigue,
+        worker_safety_education_freq=worker_safety_education_freq,
+        equip_condition=equip_condition, equip_inspection_cycle=equip_inspection_cycle,
+        equip_breakdown_history=equip_breakdown_history, equip_maintenance_quality=equip_maintenance_quality,
+        safety_inspection_status=safety_inspection_status, fire_facility_adequacy=fire_facility_adequacy,
+        special_extinguisher_presence=special_extinguisher_presence,
+        chemical_mgmt_msds=chemical_mgmt_msds, chemical_mgmt_storage=chemical_mgmt_storage,
+        jsa_performance=jsa_performance, sops_compliance=sops_compliance, ptw_compliance=ptw_compliance,
+    ), **sensor_levels), # 센서 연동 항목은 센서 값으로 덮어씀
+    lagging=replace(LaggingInputs(
+        past_fatalities_count=int(past_fatalities_count), past_injuries_count=int(past_injuries_count),
+        past_fine_history_level=past_fine_history_level, past_hazard_over_storage=past_hazard_over_storage,
+        past_hidden_accident_reports=past_hidden_accident_reports,
+        past_safety_training_adequacy=past_safety_training_adequacy,
+        past_safety_audit_compliance=past_safety_audit_compliance,
+        past_government_intervention=past_government_intervention,
+    ), **incident_fields), # 기록 연동 항목은 기록 집계 값으로 덮어씀
+    scheme=SCHEME_ARICELL,
+    process=selected_process_step,
+)
+result = evaluate(assessment)
+# 선행 점수 기여 벡터는 세션에 두고 재실행마다 값이 바뀐 항목의 기여만 고침 (입력 하나 변경 → 총점 O(1) 갱신)
+if "leading_contributions" in st.session_state:
+    st.session_state.leading_contributions.update(assessment)
+else:
+    st.session_state.leading_contributions = LeadingContributions(assessment)
+contributions = st.session_state.leading_contributions
+leading_score_raw, leading_grade = result.leading_score, result.leading_grade
+lagging_score_raw, lagging_grade = result.lagging_score, result.lagging_grade
 
 # --- 6. 결과 출력 ---
+timer.section("6. 결과 출력 / 이력")
 st.subheader("✅ 위험성 평가 결과")
 st.markdown("---")
 
@@ -192,6 +209,16 @@ with col_res1:
     - **의미**: 현재 시점의 안전 관리 노력과 시스템의 건전성을 반영한 위험도. 잠재적인 사고 가능성을 예측합니다.
     - **활용**: 예방 활동 계획 수립 및 현재 관리 시스템 개선 방향 설정에 활용됩니다.
     """)
+    grade_margin = contributions.margin()
+    st.caption("다음 등급 경계까지: " + " · ".join(filter(None, [
+        f"'{grade_margin.better_grade}'까지 -{grade_margin.points_to_better}점" if grade_margin.better_grade else None,
+        f"'{grade_margin.worse_grade}'까지 +{grade_margin.points_to_worse}점" if grade_margin.worse_grade else None,
+    ])))
+    with st.expander("항목별 점수 기여 (선행 총점 = 기여의 합)"):
+        st.table([
+            {"항목": c.label, "입력값": str(c.value), "기여 점수": c.points, "줄일 수 있는 점수": c.reducible}
+            for c in sorted(contributions.contributions(), key=lambda c: -c.reducible)
+        ])
 with col_res2:
     st.warning("### 🕰️ 후행지표 등급 (과거 시스템의 실질적 부실)")
     st.write(f"과거 사고/부실 반영 실질 위험도 등급: **{lagging_grade}** (내부 점수: {lagging_score_raw}점)")
@@ -201,40 +228,99 @@ with col_res2:
     """)
 st.markdown("---")
 
+# --- 6-1. 평가 이력 저장 (로컬 SQLite) ---
+@st.cache_resource
+def get_history_store():
+    return HistoryStore()
+
+col_hist_btn, col_hist_info = st.columns([0.3, 0.7])
+with col_hist_btn:
+    if st.button("💾 이번 평가를 이력에 저장", key="save_history"):
+        get_history_store().add(assessment, result)
+        get_history_store().flush()
+        st.success("평가 이력이 저장되었습니다.")
+with col_hist_info:
+    with st.expander(f"🗂️ '{selected_process_step}' 최근 90일 평가 이력"):
+        history_rows = get_history_store().query(process=selected_process_step, since=time.time() - 90 * 86400, limit=50)
+        if history_rows:
+            st.table([
+                {"평가 시각": time.strftime("%Y-%m-%d %H:%M", time.localtime(row["ts"])), "선행 점수": row["leading_score"], "선행 등급": row["leading_grade"],
+                 "후행 점수": row["lagging_score"], "후행 등급/상태": row["lagging_grade"]}
+                for row in history_rows
+            ])
+        else:
+            st.write("저장된 이력이 없습니다.")
+st.markdown("---")
+
+# --- 보고서 내보내기 (PDF / XLSX) ---
+# 보고서는 버튼을 누를 때만 그림 (data에 함수를 넘기면 클릭 시 실행). 저장된 평가 전체는 사업장별 보고서를 프로세스 풀에서 나눠 그림
+st.write("#### 📑 보고서 내보내기")
+report_formats = ("pdf", "xlsx") if xlsx_available() else ("pdf",)
+report_stamp = time.strftime("%Y%m%d_%H%M")
+report_cols = st.columns(len(report_formats) + 1)
+for report_col, report_fmt in zip(report_cols, report_formats):
+    with report_col:
+        st.download_button(
+            f"⬇️ 이번 평가 {report_fmt.upper()}", data=lambda fmt=report_fmt: render_report(report_for(assessment, record_site), fmt),
+            file_name=f"risk_report_{selected_process_step}_{report_stamp}.{report_fmt}", mime=MIME_TYPES[report_fmt], key=f"report_{report_fmt}",
+        )
+with report_cols[-1]:
+    st.download_button(
+        "⬇️ 저장된 평가 전체 (사업장별, ZIP)", data=lambda: export_portfolio_zip(jobs_from_history(get_history_store()), report_formats),
+        file_name=f"risk_reports_{report_stamp}.zip", mime=MIME_TYPES["zip"], key="report_portfolio",
+    )
+if not xlsx_available():
+    st.caption("XLSX 보고서는 openpyxl이 설치되어 있어야 합니다 (pip install openpyxl).")
+st.markdown("---")
+
+# --- 6-2. 민감도 분석 (입력 2개 격자 / 입력별 tornado) ---
+timer.section("6-2. 민감도 분석")
+st.subheader("🧭 민감도 분석 (어디까지 나빠지면 등급이 바뀌는가)")
+st.markdown("현재 입력을 기준으로 **입력 두 개를 허용 범위 전체로 바꾼 모든 조합**의 선행 점수/등급과, **입력 하나씩만 바꿨을 때의 점수 범위**를 보여 줍니다. 나머지 입력은 현재값으로 고정합니다.")
+if st.toggle("민감도 분석 보기", key="sens_mode"):
+    sweep = {p.key: p for p in sweep_params(assessment.leading)}
+    sweep_keys = list(sweep)
+    col_sens_heat, col_sens_tornado = st.columns(2)
+    with col_sens_heat:
+        col_sens_x, col_sens_y = st.columns(2)
+        sens_x = col_sens_x.selectbox("가로축 입력", sweep_keys, index=sweep_keys.index("ptw_compliance"), format_func=lambda k: sweep[k].label, key="sens_x")
+        sens_y_keys = [k for k in sweep_keys if k != sens_x]
+        sens_y = col_sens_y.selectbox("세로축 입력", sens_y_keys, index=sens_y_keys.index("chemical_mgmt_storage") if "chemical_mgmt_storage" in sens_y_keys else 0,
+                                      format_func=lambda k: sweep[k].label, key="sens_y")
+        grid = heatmap(assessment, sens_x, sens_y) # 입력 레코드별 캐시
+        st.image(sensitivity_chart(
+            f"'{selected_process_step}' 선행 등급 격자", grid.x.label, grid.x.ticks, grid.y.label, grid.y.ticks, grid.scores.tolist(), grid.grades.tolist(),
+            (grid.y.values.index(grid.y.current), grid.x.values.index(grid.x.current)),
+        ), width="stretch")
+        st.caption(f"칸 안의 숫자: 선행 총점 · 굵은 선: 등급 경계 · 파란 테두리: 현재 입력 ({grid.current_score}점) · 계산 {grid.elapsed * 1000:.1f} ms")
+    with col_sens_tornado:
+        sens = tornado(assessment)
+        bars = [bar for bar in sens.bars if bar.swing > 0]
+        st.image(tornado_chart(
+            f"'{selected_process_step}' 입력별 점수 범위 (현재 {sens.current_grade})", [bar.param.label for bar in bars],
+            [bar.low for bar in bars], [bar.high for bar in bars], sens.current_score, sens.edges,
+        ), width="stretch")
+        with st.expander("입력별 최저/최고 점수와 등급"):
+            st.table([
+                {"입력": bar.param.label, "최저 (값)": f"{bar.low}점 ({bar.low_tick})", "최저 등급": bar.low_grade,
+                 "최고 (값)": f"{bar.high}점 ({bar.high_tick})", "최고 등급": bar.high_grade}
+                for bar in bars
+            ])
+st.markdown("---")
+
 # --- 7. 선행 vs. 후행 지표 비교 분석 ---
+timer.section("7. 비교 분석 차트")
 st.subheader("🔍 선행 vs. 후행 지표 비교 분석: 아리셀 사고의 심층 교훈")
 st.markdown("선행지표와 후행지표는 **본질적으로 다른 지표**이지만, 서로를 보완하며 **진정한 위험을 드러내고 미래의 안전을 설계하는 데 필수적**입니다. 후행지표(과거 데이터 및 관리 부실)를 통해 드러난 위험이 선행지표(현재의 관리 노력)를 어떻게 보완해야 하는지 비교합니다.")
 
 col_comp_chart, col_comp_text = st.columns([0.6, 0.4])
 
 with col_comp_chart:
-    fig, ax = plt.subplots(figsize=(7, 4))
-    # 등급별로 색상 조정
-    bar_colors = {'매우 낮음': 'lightgreen', '낮음': 'skyblue', '보통': 'lightyellow', '높음': 'salmon', '매우 높음': 'red'}
-    colors_for_bars = [bar_colors.get(leading_grade, 'gray'), bar_colors.get(lagging_grade, 'gray')]
-
-    bars = ax.bar(["선행지표", "후행지표"], [leading_score_raw, lagging_score_raw], color=colors_for_bars)
-    ax.set_ylim(0, max(leading_score_raw, lagging_score_raw) + 40) # y축 여유 공간 확보
-    ax.set_ylabel("위험도 점수 (내부 계산)")
-    ax.set_title(f"'{selected_process_step}' 공정 위험도 비교 (등급 기반)")
-
-    # 그래프 위에 등급 텍스트 표시
-    for bar, grade_text in zip(bars, [leading_grade, lagging_grade]):
-        yval = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width()/2, yval + 1, f"{grade_text}\n({yval:.0f}점)", ha='center', va='bottom', fontsize=10, weight='bold')
-    
-    # 아리셀 사고 부실 사례를 그래프 옆에 주석으로 표시
-    if lagging_grade in ["높음", "매우 높음"]: # 후행지표 등급이 높음/매우 높음일 경우
-        ax.text(1.05, 0.95, "⚠️ **아리셀 사고와 같은 과거 문제점**", transform=ax.transAxes, fontsize=10, verticalalignment='top', bbox=dict(boxstyle='round,pad=0.5', fc='lightcoral', ec='firebrick', lw=1, alpha=0.5))
-        ax.text(1.05, 0.88, "- 사고 전 화재 은폐 의혹", transform=ax.transAxes, fontsize=8, verticalalignment='top')
-        ax.text(1.05, 0.81, "- 안전점검 체계의 허점", transform=ax.transAxes, fontsize=8, verticalalignment='top')
-        ax.text(1.05, 0.74, "- 특수 소화기 부재", transform=ax.transAxes, fontsize=8, verticalalignment='top')
-        ax.text(1.05, 0.67, "- 위험물질 초과 보관", transform=ax.transAxes, fontsize=8, verticalalignment='top')
-        ax.text(1.05, 0.60, "- 안전교육/인력관리 부실", transform=ax.transAxes, fontsize=8, verticalalignment='top')
-        ax.text(1.05, 0.53, "➡ **후행지표가 이를 강력히 경고!**", transform=ax.transAxes, fontsize=9, verticalalignment='top', color='red')
-        fig.tight_layout() # 그래프와 주석 겹치지 않게 레이아웃 조정
-    
-    st.pyplot(fig)
+    # 같은 점수/등급/공정의 차트는 렌더링 캐시(PNG 바이트)를 재사용. 후행지표 등급이 높음/매우 높음이면 아리셀 사고 부실 사례 주석 표시
+    st.image(comparison_chart(
+        f"'{selected_process_step}' 공정 위험도 비교 (등급 기반)", leading_score_raw, leading_grade, lagging_score_raw, lagging_grade,
+        annotate=lagging_grade in ["높음", "매우 높음"],
+    ), width="stretch")
 
 
 with col_comp_text:
@@ -281,78 +367,84 @@ with col_comp_text:
         st.markdown("---")
 
 # --- 7. 후행지표 기반 선행지표 보완 루틴 ---
+timer.section("7. 보완 루틴 (RCA)")
 st.subheader("🔁 후행지표 기반 선행지표 보완 루틴: 사고의 교훈을 미래 안전으로")
 st.markdown("아리셀 사고와 같은 중대 재해의 **'과거 데이터(후행지표)'를 분석**하여, **미래의 사고를 막을 수 있는 '선행지표'를 어떻게 강화**할 수 있는지 보여주는 루틴입니다.")
 
-# Streamlit Session State 초기화
-if 'show_rca' not in st.session_state:
-    st.session_state.show_rca = False
-if 'rca_applied' not in st.session_state:
-    st.session_state.rca_applied = False
+# 체크박스/버튼을 눌러도 이 루틴만 다시 실행 (st.fragment). 평가 결과는 전체 재실행 때 계산한 값을 인자로 받아 재사용
+@st.fragment
+@timer.fragment("7. 보완 루틴 (RCA)")
+def rca_section(assessment, leading_score_raw, leading_grade):
+    # Streamlit Session State 초기화
+    if 'show_rca' not in st.session_state:
+        st.session_state.show_rca = False
+    if 'rca_applied' not in st.session_state:
+        st.session_state.rca_applied = False
+
+    # 사고 발생 버튼
+    if st.button("🚨 사고 발생! (후행지표 인지 & 보완 루틴 시작)"):
+        st.session_state.show_rca = True
+        st.session_state.rca_applied = False # 새로운 사고 발생 시 루틴 초기화
+
+    if st.session_state.show_rca:
+        st.markdown("---")
+        st.success("### ✅ 사고 데이터 수집 및 원인 분석 (RCA)")
+        st.markdown("""
+        **사고 시나리오**: 2024년 6월, 화성 아리셀 공장 '프레스 및 슬리팅' 공정에서 불량 리튬이온 배터리 처리 중 폭발, 대규모 인명 피해 발생 (사망 23명). 
+        """)
+        st.markdown("""
+        **RCA (Root Cause Analysis) 결과**:
+        - **직접 원인**: 불량 배터리 열폭주, 초기 화재 진압 실패 (일반 소화기 사용, 특수 소화기 부재)
+        - **간접 원인**: 과밀 적재, 통풍 불량, 정전기 등 발화 조건, 불량품 관리 미흡, **사고 전 경미 화재 은폐, 안전점검 부실, 위험물질 초과 보관**
+        - **근본 원인**: **안전 관리 시스템 총체적 부실** (명목상 '우수사업장'이었으나 실제로는 JSA, SOP, PTW 등 형식적 관리, 교육 미흡, 인력관리 문제, 비상 대응 훈련 미흡)
+        """)
+        st.markdown("---")
+        st.warning("### 🛠️ 미흡했던 선행지표 도출 및 강화된 선행지표 제안")
+        st.markdown("""
+        위 RCA 결과에 따라, 사고 이전에 '작동했어야 할' 선행지표들이 무엇이었고, 앞으로 어떻게 강화되어야 할지 도출합니다.
+        """)
 
-# 사고 발생 버튼
-if st.button("🚨 사고 발생! (후행지표 인지 & 보완 루틴 시작)"):
-    st.session_state.show_rca = True
-    st.session_state.rca_applied = False # 새로운 사고 발생 시 루틴 초기화
+        st.markdown("#### 🔍 미흡했던 과거 선행지표 (아리셀 사례):")
+        st.markdown("- **[관리 부실]** **안전점검 체계**: '샘플 점검'으로 실제 위험 간과.")
+        st.markdown("- **[안전 설비 부재]** **소방시설**: 스프링클러 설치 의무 대상 아님, **특수 소화기 부재**.")
+        st.markdown("- **[위험물 관리]** **화학물질 저장 관리**: 리튬 등 위험물질 규정 초과 보관 (벌금 이력).")
+        st.markdown("- **[행동 안전/교육]** **작업자 안전 교육**: 파견직 등 안전 교육 및 관리 부실 (불법 파견 논란).")
+        st.markdown("- **[절차/모니터링]** **JSA, SOP, PTW**: 수행 완성도 낮거나 형식적, 온도/습도 모니터링 부재.")
+        st.markdown("- **[비상 대응]** **대피 경로/훈련**: 피난유도등 미흡, 비상 훈련 부실 (작업자 전원 사망).")
+
+        st.markdown("#### ✅ 강화된 선행지표 제안 (선택하여 반영):")
+
+        selected_enhancements = [
+            option for option in ENHANCE_OPTIONS if st.checkbox(option, value=False, key=f"enhance_{option.replace(' ', '_')}")
+        ]
+
+        # 선택한 제안의 예상 효과 (제안별 입력 변화 반영) 및 4096개 조합 전수 평가 결과 (입력이 같으면 캐시 재사용)
+        enhancement_ranking = rank_enhancements(assessment)
+        st.write(f"선택한 {len(selected_enhancements)}개 제안 반영 시 예상 선행지표: **{enhancement_ranking.score_of(selected_enhancements)}점 ({enhancement_ranking.grade_of(selected_enhancements)})** (현재 {leading_score_raw}점, {leading_grade})")
+        with st.expander("📊 제안 개수별 최대 위험도 감소 (4096개 조합 전수 평가)"):
+            st.line_chart({"최소 예상 선행지표 점수": [score for _, _, score in enhancement_ranking.best_by_size]})
+            st.table([
+                {"제안 수": size, "예상 점수": score, "감소량": leading_score_raw - score, "최적 조합": ", ".join(enhancement_ranking.names(mask)) or "-"}
+                for size, mask, score in enhancement_ranking.pareto
+            ])
+            st.caption("제안 수를 늘려도 점수가 더 낮아지지 않는 조합은 표에서 제외됩니다.")
+
+        if st.button("✔ 선택된 선행지표 강화 제안 반영 (시뮬레이션)"):
+            st.session_state.rca_applied = True # 반영 트리거
+            st.success("**JSA 평가서 갱신 및 선행지표 강화 방안이 성공적으로 반영되었습니다!**")
+            st.markdown("""
+            - **JSA 자동 업데이트**: 관련 작업 JSA 항목에 선택된 강화된 선행지표가 추가/업데이트됩니다.
+            - **관리자 알림**: 안전 관리자에게 변경된 JSA 및 강화 방안이 자동 통보됩니다.
+            - **작업자 교육**: 변경된 내용에 대한 작업자 교육 일정이 자동 등록되고, 교육 이수 후 적용됩니다.
+            - **주기적 모니터링**: 강화된 선행지표의 실제 적용 및 효과에 대한 모니터링이 시작됩니다.
+            """)
 
-if st.session_state.show_rca:
-    st.markdown("---")
-    st.success("### ✅ 사고 데이터 수집 및 원인 분석 (RCA)")
-    st.markdown("""
-    **사고 시나리오**: 2024년 6월, 화성 아리셀 공장 '프레스 및 슬리팅' 공정에서 불량 리튬이온 배터리 처리 중 폭발, 대규모 인명 피해 발생 (사망 23명). 
-    """)
-    st.markdown("""
-    **RCA (Root Cause Analysis) 결과**:
-    - **직접 원인**: 불량 배터리 열폭주, 초기 화재 진압 실패 (일반 소화기 사용, 특수 소화기 부재)
-    - **간접 원인**: 과밀 적재, 통풍 불량, 정전기 등 발화 조건, 불량품 관리 미흡, **사고 전 경미 화재 은폐, 안전점검 부실, 위험물질 초과 보관**
-    - **근본 원인**: **안전 관리 시스템 총체적 부실** (명목상 '우수사업장'이었으나 실제로는 JSA, SOP, PTW 등 형식적 관리, 교육 미흡, 인력관리 문제, 비상 대응 훈련 미흡)
-    """)
-    st.markdown("---")
-    st.warning("### 🛠️ 미흡했던 선행지표 도출 및 강화된 선행지표 제안")
-    st.markdown("""
-    위 RCA 결과에 따라, 사고 이전에 '작동했어야 할' 선행지표들이 무엇이었고, 앞으로 어떻게 강화되어야 할지 도출합니다.
-    """)
+        if st.session_state.rca_applied:
+            st.info("💡 이제 선행지표 입력 부분으로 돌아가, **선택된 강화 방안에 맞춰 입력 값을 변경하여 재평가**하면, 위험도가 어떻게 낮아지는지 확인할 수 있습니다.")
 
-    st.markdown("#### 🔍 미흡했던 과거 선행지표 (아리셀 사례):")
-    st.markdown("- **[관리 부실]** **안전점검 체계**: '샘플 점검'으로 실제 위험 간과.")
-    st.markdown("- **[안전 설비 부재]** **소방시설**: 스프링클러 설치 의무 대상 아님, **특수 소화기 부재**.")
-    st.markdown("- **[위험물 관리]** **화학물질 저장 관리**: 리튬 등 위험물질 규정 초과 보관 (벌금 이력).")
-    st.markdown("- **[행동 안전/교육]** **작업자 안전 교육**: 파견직 등 안전 교육 및 관리 부실 (불법 파견 논란).")
-    st.markdown("- **[절차/모니터링]** **JSA, SOP, PTW**: 수행 완성도 낮거나 형식적, 온도/습도 모니터링 부재.")
-    st.markdown("- **[비상 대응]** **대피 경로/훈련**: 피난유도등 미흡, 비상 훈련 부실 (작업자 전원 사망).")
-
-    st.markdown("#### ✅ 강화된 선행지표 제안 (선택하여 반영):")
-    
-    enhance_options = {
-        "JSA(작업안전분석) 수행 완성도 높임": False,
-        "작업표준서(SOP) 준수도 강화": False,
-        "작업허가제(PTW) 엄격 적용": False,
-        "배터리 보관 온도/습도 자동 센서 및 경고 시스템 도입": False,
-        "정전기 발생 가능성 평가 및 방지 대책 강화": False,
-        "방폭 환기 시스템 점검 및 보강": False,
-        "리튬 특성 및 비상 대응 훈련 강화 (월 1회 이상)": False,
-        "피난 유도등 및 비상 대피 경로 확보/훈련 강화": False,
-        "전사적 정기 안전점검 의무화 및 실질 점검 강화": False,
-        "배터리 전용 특수 소화기 비치 및 소방 시설 보강": False,
-        "위험물질 저장/취급 규정 준수 및 실시간 모니터링": False,
-        "파견직 포함 전 직원에 대한 철저한 안전 교육 실시": False
-    }
-
-    for option, _ in enhance_options.items():
-        enhance_options[option] = st.checkbox(option, value=False, key=f"enhance_{option.replace(' ', '_')}")
-
-    if st.button("✔ 선택된 선행지표 강화 제안 반영 (시뮬레이션)"):
-        st.session_state.rca_applied = True # 반영 트리거
-        st.success("**JSA 평가서 갱신 및 선행지표 강화 방안이 성공적으로 반영되었습니다!**")
-        st.markdown("""
-        - **JSA 자동 업데이트**: 관련 작업 JSA 항목에 선택된 강화된 선행지표가 추가/업데이트됩니다.
-        - **관리자 알림**: 안전 관리자에게 변경된 JSA 및 강화 방안이 자동 통보됩니다.
-        - **작업자 교육**: 변경된 내용에 대한 작업자 교육 일정이 자동 등록되고, 교육 이수 후 적용됩니다.
-        - **주기적 모니터링**: 강화된 선행지표의 실제 적용 및 효과에 대한 모니터링이 시작됩니다.
-        """)
-    
-    if st.session_state.rca_applied:
-        st.info("💡 이제 선행지표 입력 부분으로 돌아가, **선택된 강화 방안에 맞춰 입력 값을 변경하여 재평가**하면, 위험도가 어떻게 낮아지는지 확인할 수 있습니다.")
+rca_section(assessment, leading_score_raw, leading_grade)
 
 st.markdown("---")
 st.info("⭐안전은 언제나 최우선입니다! ⭐")
+
+render_timing_panel()